@@ -0,0 +1,190 @@
+"""
+Memory benchmark for holding and writing out a run's results.
+
+Builds a synthetic run (1M rows by default) and keeps its results in two
+layouts, each in its own subprocess so peak RSS is measured separately:
+
+- ``dicts``: the former layout, one dictionary per row with a timestamp
+  formatted per row, copied into a list of row lists for the sheet
+- ``store``: results.ResultStore, with one timestamp per batch and the
+  sheet rows built slice by slice the way SheetWriter requests them
+
+Both start from the same synthetic companies and summaries, so the
+difference in peak RSS is the cost of the result layout:
+
+    python -m benchmarks.bench_memory --rows 1000000 --output memory.json
+    python -m benchmarks.bench_memory --baseline memory.json
+
+Needs nothing beyond the standard library and results.py.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmarks.bench_throughput import peak_rss_mb
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAYOUTS = ['dicts', 'store']
+
+# Rows per updateCells/appendCells request, as in sheet_writer
+ROWS_PER_REQUEST = 500
+
+
+def synthetic_run(count: int):
+    """Companies as read_companies returns them, and one summary per company."""
+    companies = [{'Company Name': f"Benchmark Company {i}", 'Website': f"https://www.company{i}.com",
+                  'Source': 'Benchmark'} for i in range(count)]
+    summaries = [f"Benchmark Company {i} makes synthetic products for benchmark customers." for i in range(count)]
+    return companies, summaries
+
+
+def current_rss_mb() -> float:
+    """Current resident set size of this process in MiB (Linux; falls back to the peak)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def run_dicts(companies: List[Dict], summaries: List[str], batch_size: int) -> int:
+    from results import OUTPUT_HEADERS
+
+    results = []
+    for company, summary in zip(companies, summaries):
+        results.append({
+            'Company Name': company.get('Company Name', ''),
+            'Website': company.get('Website', ''),
+            'Source': company.get('Source', ''),
+            'Summary': summary,
+            'Status': 'ok',
+            'Processed Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        })
+    rows = [[result.get(header, '') for header in OUTPUT_HEADERS] for result in results]
+    for offset in range(0, len(rows), ROWS_PER_REQUEST):
+        rows[offset:offset + ROWS_PER_REQUEST]
+    return len(rows)
+
+
+def run_store(companies: List[Dict], summaries: List[str], batch_size: int) -> int:
+    from results import ResultStore
+
+    results = ResultStore(len(companies))
+    for start in range(0, len(companies), batch_size):
+        stamp = results.stamp()
+        for index in range(start, min(start + batch_size, len(companies))):
+            results.set(index, companies[index], summaries[index], 'ok', stamp)
+    rows = results.rows()
+    for offset in range(0, len(rows), ROWS_PER_REQUEST):
+        rows[offset:offset + ROWS_PER_REQUEST]
+    return len(rows)
+
+
+def run_single(layout: str, rows: int, batch_size: int) -> Dict:
+    """Measure one layout in this process."""
+    companies, summaries = synthetic_run(rows)
+    inputs_mb = current_rss_mb()
+
+    start = time.perf_counter()
+    written = (run_dicts if layout == 'dicts' else run_store)(companies, summaries, batch_size)
+    seconds = time.perf_counter() - start
+
+    peak = peak_rss_mb()
+    return {
+        'layout': layout,
+        'rows': written,
+        'seconds': round(seconds, 3),
+        'inputs_rss_mb': round(inputs_mb, 1),
+        'peak_rss_mb': round(peak, 1),
+        'results_peak_mb': round(peak - inputs_mb, 1)
+    }
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare results against a baseline report.
+
+    Returns:
+        List[str]: Regressions found (result memory worse than the tolerance)
+    """
+    previous = {(entry['layout'], entry['rows']): entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        base = previous.get((entry['layout'], entry['rows']))
+        if base and base['results_peak_mb'] > 0 and \
+                entry['results_peak_mb'] > base['results_peak_mb'] * (1 + tolerance):
+            regressions.append(f"{entry['layout']} @ {entry['rows']} rows: {entry['results_peak_mb']} MiB "
+                               f"vs baseline {base['results_peak_mb']} MiB")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Memory benchmark for result storage")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Synthetic rows per run")
+    parser.add_argument('--batch-size', type=int, default=1, help="Rows per request (one timestamp each)")
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=LAYOUTS)
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--baseline', help="Compare against a previous JSON report")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument('--single', choices=LAYOUTS, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single is not None:
+        result = run_single(args.single, args.rows, args.batch_size)
+        with open(args.result_file, 'w') as result_file:
+            json.dump(result, result_file)
+        return 0
+
+    results = []
+    for layout in args.layouts:
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as result_file:
+            result_path = result_file.name
+        command = [sys.executable, '-m', 'benchmarks.bench_memory', '--rows', str(args.rows),
+                   '--batch-size', str(args.batch_size), '--single', layout, '--result-file', result_path]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, cwd=REPO_ROOT)
+        with open(result_path) as result_file:
+            result = json.load(result_file)
+        os.remove(result_path)
+        print(f"{layout:>6}: {result['results_peak_mb']} MiB for results (peak RSS {result['peak_rss_mb']} MiB), "
+              f"{result['seconds']} s", file=sys.stderr)
+        results.append(result)
+
+    report = {
+        'benchmark': 'memory',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'config': {'rows': args.rows, 'batch_size': args.batch_size},
+        'results': results
+    }
+    by_layout = {result['layout']: result for result in results}
+    if 'dicts' in by_layout and 'store' in by_layout and by_layout['dicts']['results_peak_mb'] > 0:
+        report['results_memory_saved'] = round(
+            1 - by_layout['store']['results_peak_mb'] / by_layout['dicts']['results_peak_mb'], 3)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Startup-time benchmark for the command-line entry points.
+
+Times fresh interpreter runs of ``import company_summarizer`` and of
+``--help`` for cli.py and job_runner.py, and checks that none of the heavy
+provider/backend packages are imported just to start up:
+
+    python -m benchmarks.bench_startup --output startup.json
+    python -m benchmarks.bench_startup --baseline startup.json
+
+Reports the median and minimum wall time per command as JSON; with
+``--baseline`` it exits non-zero when a command got slower than the
+tolerance allows or a heavy module is imported eagerly again.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that must only be imported once a run actually needs them
+HEAVY_MODULES = ['pandas', 'numpy', 'groq', 'openai', 'httpx', 'gspread', 'google.auth',
+                 'google.oauth2', 'openpyxl', 'pyarrow']
+
+COMMANDS = {
+    'import': ['-c', 'import company_summarizer'],
+    'help': ['cli.py', '--help'],
+    'job_runner_help': ['job_runner.py', '--help']
+}
+
+
+def time_command(arguments: List[str], repeat: int) -> Dict:
+    """Run ``python <arguments>`` ``repeat`` times and summarize the wall times."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *arguments], cwd=REPO_ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return {
+        'median_ms': round(statistics.median(timings) * 1000, 1),
+        'min_ms': round(min(timings) * 1000, 1)
+    }
+
+
+def eager_imports() -> List[str]:
+    """Heavy modules that ``import cli`` or ``import company_summarizer`` pulls in."""
+    probe = (
+        "import json, sys; import cli, company_summarizer; "
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+    )
+    output = subprocess.run([sys.executable, '-c', probe], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare results against a baseline report.
+
+    Returns:
+        List[str]: Regressions found (median time worse than the tolerance)
+    """
+    regressions = []
+    for name, entry in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base and base.get('median_ms') and entry['median_ms'] > base['median_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: {entry['median_ms']} ms vs baseline {base['median_ms']} ms")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Startup-time benchmark for the CLI entry points")
+    parser.add_argument('--repeat', type=int, default=10, help="Runs per command")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--baseline', help="Compare against a previous JSON report")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, arguments in COMMANDS.items():
+        results[name] = time_command(arguments, args.repeat)
+        print(f"{name:>16}: median {results[name]['median_ms']} ms, min {results[name]['min_ms']} ms",
+              file=sys.stderr)
+
+    report = {
+        'benchmark': 'startup',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'results': results,
+        'eager_imports': eager_imports()
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    print(text)
+
+    problems = [f"imported at startup: {name}" for name in report['eager_imports']]
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            problems += compare(results, json.load(baseline_file), args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION: {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Offline throughput benchmark for CompanySummarizer.run_full_analysis.
+
+Runs the real pipeline against local stand-ins instead of live services: a
+FakeChatServer for the Groq API (driven through the real Groq client) and an
+in-memory FakeSheetsClient for Google Sheets. Each sheet size runs in its own
+subprocess so peak RSS is measured per size.
+
+Reports rows/sec, p50/p99 per-row latency, peak RSS and request/API-call
+counts as JSON, which can be saved and used as a regression baseline:
+
+    python -m benchmarks.bench_throughput --rows 100 10000 100000 --output baseline.json
+    python -m benchmarks.bench_throughput --baseline baseline.json
+
+Requires the packages from requirements.txt (the summarizer itself is
+imported), but no credentials or network access.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_ROWS = [100, 10_000, 100_000]
+
+
+def synthetic_companies(count: int) -> List[List[str]]:
+    """Build an input sheet (header plus ``count`` rows) of distinct fake companies."""
+    rows = [['Company Name', 'Website', 'Source']]
+    for i in range(count):
+        rows.append([f"Benchmark Company {i}", f"https://www.company{i}.com", 'Benchmark'])
+    return rows
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _instrument(summarizer, latencies: List[float]):
+    """Record per-row latency of every summary the run generates."""
+    lock = threading.Lock()
+    local = threading.local()
+    single = summarizer.generate_company_summary
+    batch = summarizer.generate_batch_summaries
+
+    def timed_single(company):
+        start = time.perf_counter()
+        summary = single(company)
+        # Fallbacks inside a batch are covered by the batch's own timing
+        if not getattr(local, 'in_batch', False):
+            with lock:
+                latencies.append(time.perf_counter() - start)
+        return summary
+
+    def timed_batch(companies):
+        local.in_batch = True
+        start = time.perf_counter()
+        try:
+            summaries = batch(companies)
+        finally:
+            local.in_batch = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.extend([elapsed] * len(companies))
+        return summaries
+
+    summarizer.generate_company_summary = timed_single
+    summarizer.generate_batch_summaries = timed_batch
+
+
+def run_single(rows: int, args) -> Dict:
+    """Run one benchmark size in this process and return its measurements."""
+    from groq import Groq
+    from company_summarizer import CompanySummarizer
+    from rate_limiter import RateLimiter
+    from benchmarks.fake_llm_server import FakeChatServer, LatencyModel
+    from benchmarks.fake_sheets import FakeSheetsClient
+
+    logging.getLogger().setLevel(args.log_level)
+    os.chdir(tempfile.mkdtemp(prefix='bench-'))
+
+    sheets = FakeSheetsClient(latency=args.sheets_latency)
+    spreadsheet = sheets.create('Benchmark')
+    spreadsheet.data.load(synthetic_companies(rows))
+
+    latencies: List[float] = []
+    with FakeChatServer(LatencyModel.parse(args.latency, seed=args.seed), error_rate=args.error_rate,
+                        requests_per_minute=args.server_rpm, tokens_per_minute=args.server_tpm,
+                        retry_after=args.retry_after, seed=args.seed) as server:
+        summarizer = CompanySummarizer(
+            credentials_path='unused',
+            groq_api_key=None,
+            max_workers=args.concurrency,
+            rate_limiter=RateLimiter(args.rpm, args.tpm),
+            batch_size=args.batch_size,
+            llm_client=Groq(api_key='benchmark', base_url=server.base_url, max_retries=0),
+            sheets_client=sheets
+        )
+        _instrument(summarizer, latencies)
+
+        start = time.perf_counter()
+        summarizer.run_full_analysis(spreadsheet.url, streaming=args.streaming, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        server_stats = dict(server.stats)
+
+    return {
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(rows / elapsed, 2) if elapsed else None,
+        'latency_p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'llm_requests': server_stats['requests'],
+        'llm_rate_limited': server_stats['rate_limited'],
+        'prompt_tokens': server_stats['prompt_tokens'],
+        'completion_tokens': server_stats['completion_tokens'],
+        'sheets_api_calls': spreadsheet.api_calls
+    }
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare results against a baseline report.
+
+    Returns:
+        List[str]: Regressions found (throughput or p99 latency worse than the tolerance)
+    """
+    regressions = []
+    previous = {entry['rows']: entry for entry in baseline.get('results', [])}
+    for entry in results:
+        base = previous.get(entry['rows'])
+        if not base:
+            continue
+        if base.get('rows_per_sec') and entry['rows_per_sec'] < base['rows_per_sec'] * (1 - tolerance):
+            regressions.append(f"{entry['rows']} rows: {entry['rows_per_sec']} rows/s "
+                               f"vs baseline {base['rows_per_sec']}")
+        if base.get('latency_p99_ms') and entry['latency_p99_ms'] > base['latency_p99_ms'] * (1 + tolerance):
+            regressions.append(f"{entry['rows']} rows: p99 {entry['latency_p99_ms']} ms "
+                               f"vs baseline {base['latency_p99_ms']}")
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for CompanySummarizer")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="Sheet sizes to run")
+    parser.add_argument('--concurrency', type=int, default=16, help="max_workers for the summarizer")
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--streaming', action='store_true', help="Use the streaming pipeline")
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--latency', default='lognormal:0.05:0.5',
+                        help="Fake LLM latency: constant:S, uniform:LOW:HIGH or lognormal:MEAN:SIGMA")
+    parser.add_argument('--sheets-latency', type=float, default=0.0, help="Seconds per fake Sheets API call")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability of a random 429")
+    parser.add_argument('--server-rpm', type=float, default=None, help="Requests/minute enforced by the fake server")
+    parser.add_argument('--server-tpm', type=float, default=None, help="Tokens/minute enforced by the fake server")
+    parser.add_argument('--retry-after', type=float, default=0.5)
+    parser.add_argument('--rpm', type=float, default=1e6, help="Client-side rate limiter requests/minute")
+    parser.add_argument('--tpm', type=float, default=1e9, help="Client-side rate limiter tokens/minute")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--baseline', help="Compare against a previous JSON report")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument('--single', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.single is not None:
+        result = run_single(args.single, args)
+        with open(args.result_file, 'w') as result_file:
+            json.dump(result, result_file)
+        return 0
+
+    passthrough = list(argv if argv is not None else sys.argv[1:])
+    results = []
+    for rows in args.rows:
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as result_file:
+            result_path = result_file.name
+        command = [sys.executable, '-m', 'benchmarks.bench_throughput', *passthrough,
+                   '--single', str(rows), '--result-file', result_path]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL,
+                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        with open(result_path) as result_file:
+            result = json.load(result_file)
+        os.remove(result_path)
+        print(f"{rows:>8} rows: {result['rows_per_sec']} rows/s, p50 {result['latency_p50_ms']} ms, "
+              f"p99 {result['latency_p99_ms']} ms, peak RSS {result['peak_rss_mb']} MiB", file=sys.stderr)
+        results.append(result)
+
+    report = {
+        'benchmark': 'throughput',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'config': {
+            key: getattr(args, key) for key in (
+                'concurrency', 'batch_size', 'streaming', 'chunk_size', 'latency', 'sheets_latency',
+                'error_rate', 'server_rpm', 'server_tpm', 'rpm', 'tpm', 'seed'
+            )
+        },
+        'results': results
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
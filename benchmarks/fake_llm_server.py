@@ -0,0 +1,297 @@
+"""
+Local stand-in for an OpenAI/Groq-compatible chat-completions endpoint.
+
+FakeChatServer answers POST /openai/v1/chat/completions (Groq's path) and
+/v1/chat/completions (OpenAI's path) with canned summaries after a latency
+drawn from a configurable distribution. It can inject 429 responses, either
+at random or by enforcing request/token-per-minute limits, and keeps token
+accounting so benchmarks can report what a run would have cost.
+
+Batched prompts (one JSON object per company line) are answered with a JSON
+array, so the batched code path can be benchmarked too.
+
+Run standalone with ``python -m benchmarks.fake_llm_server --port 8089``.
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+CHAT_PATHS = ('/openai/v1/chat/completions', '/v1/chat/completions')
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under benchmark concurrency,
+    # which shows up as ~1s SYN-retry spikes in client latency
+    request_queue_size = 1024
+
+
+class LatencyModel:
+    """
+    Per-request latency distribution.
+
+    Supported kinds:
+
+    - ``constant``: always ``mean`` seconds
+    - ``uniform``: uniform between ``low`` and ``high``
+    - ``lognormal``: log-normal with the given ``mean`` and ``sigma``
+      (a long right tail, like real LLM latencies)
+    """
+
+    def __init__(self, kind: str = 'lognormal', mean: float = 0.05, sigma: float = 0.5,
+                 low: float = 0.0, high: float = 0.1, per_token: float = 0.0, seed: Optional[int] = None):
+        if kind not in ('constant', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution {kind!r}")
+        self.kind = kind
+        self.mean = mean
+        self.sigma = sigma
+        self.low = low
+        self.high = high
+        self.per_token = per_token
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> 'LatencyModel':
+        """
+        Build a model from a spec such as ``constant:0.05``, ``uniform:0.02:0.2``
+        or ``lognormal:0.05:0.6``.
+        """
+        kind, *params = spec.split(':')
+        values = [float(value) for value in params]
+        if kind == 'constant':
+            return cls('constant', mean=values[0] if values else 0.05, seed=seed)
+        if kind == 'uniform':
+            return cls('uniform', low=values[0], high=values[1], seed=seed)
+        return cls('lognormal', mean=values[0] if values else 0.05,
+                   sigma=values[1] if len(values) > 1 else 0.5, seed=seed)
+
+    def sample(self, completion_tokens: int = 0) -> float:
+        with self._lock:
+            if self.kind == 'constant':
+                base = self.mean
+            elif self.kind == 'uniform':
+                base = self._random.uniform(self.low, self.high)
+            else:
+                # Pick mu so the distribution's mean equals self.mean
+                mu = math.log(max(self.mean, 1e-9)) - self.sigma ** 2 / 2
+                base = self._random.lognormvariate(mu, self.sigma)
+        return base + self.per_token * completion_tokens
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _fake_summary(company: str) -> str:
+    return (f"{company} is a company that provides products and services to its customers. "
+            f"It operates in its primary market and is known for its core business activities.")
+
+
+class FakeChatServer:
+    """
+    Threaded HTTP server speaking the chat-completions protocol.
+
+    Use as a context manager; ``base_url`` is what the Groq client's
+    ``base_url`` should be set to.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, error_rate: float = 0.0,
+                 requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 retry_after: float = 1.0, host: str = '127.0.0.1', port: int = 0, seed: Optional[int] = None):
+        """
+        Args:
+            latency (Optional[LatencyModel]): Response latency distribution
+            error_rate (float): Probability of answering a request with a 429
+            requests_per_minute (Optional[float]): Enforced request limit (sliding minute)
+            tokens_per_minute (Optional[float]): Enforced token limit (sliding minute)
+            retry_after (float): Retry-After value sent with 429 responses
+            host (str): Interface to bind
+            port (int): Port to bind (0 picks a free one)
+            seed (Optional[int]): Seed for latency and error injection
+        """
+        self.latency = latency or LatencyModel(seed=seed)
+        self.error_rate = error_rate
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.retry_after = retry_after
+        self.stats = {'requests': 0, 'rate_limited': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = deque()  # (timestamp, tokens) of admitted requests in the last minute
+        self._window_tokens = 0
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeChatServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeChatServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _admit(self, tokens: int) -> Dict[str, str]:
+        """
+        Decide whether a request is rate limited.
+
+        Returns:
+            Dict[str, str]: Rate-limit headers; includes 'retry-after' if rejected
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._window and now - self._window[0][0] > 60:
+                self._window_tokens -= self._window.popleft()[1]
+            used_requests = len(self._window)
+            used_tokens = self._window_tokens
+
+            headers = {}
+            if self.tokens_per_minute:
+                headers['x-ratelimit-limit-tokens'] = str(int(self.tokens_per_minute))
+                headers['x-ratelimit-remaining-tokens'] = str(max(0, int(self.tokens_per_minute - used_tokens)))
+            if self.requests_per_minute:
+                headers['x-ratelimit-remaining-requests'] = str(max(0, int(self.requests_per_minute - used_requests)))
+
+            limited = (
+                self._random.random() < self.error_rate
+                or (self.requests_per_minute and used_requests + 1 > self.requests_per_minute)
+                or (self.tokens_per_minute and used_tokens + tokens > self.tokens_per_minute)
+            )
+            if limited:
+                self.stats['rate_limited'] += 1
+                headers['retry-after'] = str(self.retry_after)
+            else:
+                self._window.append((now, tokens))
+                self._window_tokens += tokens
+            self.stats['requests'] += 1
+            return headers
+
+    def _complete(self, body: Dict) -> Dict:
+        messages = body.get('messages', [])
+        prompt = '\n'.join(str(message.get('content', '')) for message in messages)
+        user = str(messages[-1].get('content', '')) if messages else ''
+
+        entries = []
+        for line in user.splitlines():
+            line = line.strip()
+            if line.startswith('{') and '"id"' in line:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    pass
+
+        if entries:
+            content = json.dumps([
+                {'id': entry['id'], 'summary': _fake_summary(entry.get('company', 'The company'))}
+                for entry in entries
+            ])
+        else:
+            company = 'The company'
+            for line in user.splitlines():
+                if line.strip().startswith('Company:'):
+                    company = line.split(':', 1)[1].strip()
+                    break
+            content = _fake_summary(company)
+
+        prompt_tokens = _count_tokens(prompt)
+        completion_tokens = min(_count_tokens(content), int(body.get('max_tokens') or 10 ** 6))
+        return {
+            'id': f"chatcmpl-fake-{self.stats['requests']}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, payload: Dict, headers: Dict[str, str]):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if self.path.split('?')[0] not in CHAT_PATHS:
+                    self._send(404, {'error': {'message': f"Unknown path {self.path}"}}, {})
+                    return
+
+                response = server._complete(body)
+                usage = response['usage']
+                headers = server._admit(usage['prompt_tokens'] + int(body.get('max_tokens') or 0))
+                if 'retry-after' in headers:
+                    self._send(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_exceeded'}},
+                               headers)
+                    return
+
+                time.sleep(server.latency.sample(usage['completion_tokens']))
+                with server._lock:
+                    server.stats['prompt_tokens'] += usage['prompt_tokens']
+                    server.stats['completion_tokens'] += usage['completion_tokens']
+                self._send(200, response, headers)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake chat-completions server")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', default='lognormal:0.05:0.5',
+                        help="constant:S, uniform:LOW:HIGH or lognormal:MEAN:SIGMA (seconds)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Probability of a random 429")
+    parser.add_argument('--rpm', type=float, default=None, help="Enforced requests per minute")
+    parser.add_argument('--tpm', type=float, default=None, help="Enforced tokens per minute")
+    args = parser.parse_args()
+
+    server = FakeChatServer(LatencyModel.parse(args.latency), args.error_rate, args.rpm, args.tpm, port=args.port)
+    print(f"Fake chat-completions server listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""
+In-memory stand-in for the parts of the gspread API used by CompanySummarizer.
+
+FakeSheetsClient mimics gspread.Client (create, open_by_url) and hands out
+FakeSpreadsheet / FakeWorksheet objects that keep their cells in Python
+lists. Every method that would be an HTTP request increments ``api_calls``
+on the spreadsheet and can optionally sleep for a fixed latency, so a
+benchmark sees a realistic call count and cost without Google credentials.
+"""
+
+import re
+import threading
+import time
+from typing import Dict, List, Sequence
+
+try:
+    from gspread import WorksheetNotFound
+except ImportError:  # gspread not installed; the summarizer isn't importable either
+    class WorksheetNotFound(Exception):
+        """Raised like gspread.WorksheetNotFound for unknown worksheet titles."""
+
+_A1_CELL = re.compile(r'^([A-Z]+)(\d+)?$')
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index
+
+
+def _parse_range(a1_range: str):
+    """Parse 'A1', 'B2:B10' or 'A:A' into zero-based (row0, col0, row1, col1) bounds (row1/col1 may be None)."""
+    a1_range = a1_range.split('!')[-1]
+    start, _, end = a1_range.partition(':')
+    start_match = _A1_CELL.match(start)
+    end_match = _A1_CELL.match(end or start)
+    if not start_match or not end_match:
+        raise ValueError(f"Unsupported range {a1_range!r}")
+    row0 = int(start_match.group(2) or 1) - 1
+    col0 = _column_index(start_match.group(1)) - 1
+    row1 = int(end_match.group(2)) if end_match.group(2) else None
+    col1 = _column_index(end_match.group(1))
+    return row0, col0, row1, col1
+
+
+def _cell_value(cell: Dict):
+    value = cell.get('userEnteredValue', {})
+    for key in ('stringValue', 'numberValue', 'boolValue'):
+        if key in value:
+            return value[key]
+    return ''
+
+
+class FakeWorksheet:
+    """In-memory worksheet supporting the gspread calls the summarizer makes."""
+
+    def __init__(self, spreadsheet: 'FakeSpreadsheet', sheet_id: int, title: str,
+                 rows: int = 1000, cols: int = 26):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self.cells: List[List] = []
+        self.formats: Dict[str, Dict] = {}
+
+    # -- helpers -------------------------------------------------------------
+
+    def _call(self):
+        self.spreadsheet._call()
+
+    def _set_row(self, row_index: int, col_index: int, values: Sequence):
+        while len(self.cells) <= row_index:
+            self.cells.append([])
+        row = self.cells[row_index]
+        while len(row) < col_index + len(values):
+            row.append('')
+        row[col_index:col_index + len(values)] = list(values)
+        self.row_count = max(self.row_count, row_index + 1)
+
+    def _trim(self):
+        while self.cells and not any(str(value) for value in self.cells[-1]):
+            self.cells.pop()
+
+    def load(self, rows: Sequence[Sequence]):
+        """Populate the worksheet without counting an API call (test setup)."""
+        self.cells = [list(row) for row in rows]
+        self.row_count = max(self.row_count, len(self.cells))
+
+    # -- gspread.Worksheet API ---------------------------------------------------
+
+    def get_all_records(self) -> List[Dict]:
+        self._call()
+        if not self.cells:
+            return []
+        header = self.cells[0]
+        return [
+            {name: row[i] if i < len(row) else '' for i, name in enumerate(header)}
+            for row in self.cells[1:]
+        ]
+
+    def get_all_values(self) -> List[List]:
+        self._call()
+        width = max((len(row) for row in self.cells), default=0)
+        return [[str(value) for value in row] + [''] * (width - len(row)) for row in self.cells]
+
+    def row_values(self, row: int) -> List:
+        self._call()
+        values = list(self.cells[row - 1]) if row - 1 < len(self.cells) else []
+        while values and values[-1] == '':
+            values.pop()
+        return [str(value) for value in values]
+
+    def col_values(self, col: int) -> List:
+        self._call()
+        values = [str(row[col - 1]) if col - 1 < len(row) else '' for row in self.cells]
+        while values and values[-1] == '':
+            values.pop()
+        return values
+
+    def _get_range(self, a1_range: str) -> List[List]:
+        row0, col0, row1, col1 = _parse_range(a1_range)
+        row1 = len(self.cells) if row1 is None else min(row1, len(self.cells))
+        values = []
+        for row in self.cells[row0:row1]:
+            cells = [str(value) for value in row[col0:col1]]
+            while cells and cells[-1] == '':
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get(self, a1_range: str) -> List[List]:
+        self._call()
+        return self._get_range(a1_range)
+
+    def batch_get(self, ranges: Sequence[str]) -> List[List[List]]:
+        self._call()
+        return [self._get_range(a1_range) for a1_range in ranges]
+
+    def update(self, a1_range, values=None, **kwargs):
+        self._call()
+        if values is None:
+            a1_range, values = 'A1', a1_range
+        row0, col0, _, _ = _parse_range(a1_range)
+        for offset, row in enumerate(values):
+            self._set_row(row0 + offset, col0, row)
+
+    def append_rows(self, values: Sequence[Sequence], **kwargs):
+        self._call()
+        self._trim()
+        for row in values:
+            self._set_row(len(self.cells), 0, row)
+
+    def clear(self):
+        self._call()
+        self.cells = []
+
+    def format(self, a1_range: str, cell_format: Dict):
+        self._call()
+        self.formats[a1_range] = cell_format
+
+    def columns_auto_resize(self, start: int, end: int):
+        self._call()
+
+    def _apply(self, request: Dict):
+        """Apply one spreadsheets.batchUpdate request (subset used by SheetWriter)."""
+        if 'updateCells' in request:
+            body = request['updateCells']
+            if 'range' in body and 'rows' not in body:
+                self.cells = []
+                return
+            start = body['start']
+            for offset, row in enumerate(body['rows']):
+                if start['rowIndex'] + offset >= self.row_count:
+                    raise ValueError("updateCells beyond the grid")
+                self._set_row(start['rowIndex'] + offset, start['columnIndex'],
+                              [_cell_value(cell) for cell in row['values']])
+        elif 'appendCells' in request:
+            self._trim()
+            for row in request['appendCells']['rows']:
+                self._set_row(len(self.cells), 0, [_cell_value(cell) for cell in row['values']])
+        elif 'updateSheetProperties' in request:
+            grid = request['updateSheetProperties']['properties'].get('gridProperties', {})
+            if 'rowCount' in grid:
+                self.row_count = grid['rowCount']
+                del self.cells[self.row_count:]
+        elif 'autoResizeDimensions' in request:
+            pass
+        else:
+            raise ValueError(f"Unsupported request {list(request)}")
+
+
+class FakeSpreadsheet:
+    """In-memory spreadsheet holding FakeWorksheets."""
+
+    def __init__(self, title: str, url: str, latency: float = 0.0):
+        self.title = title
+        self.url = url
+        self.id = url.rsplit('/', 1)[-1]
+        self.latency = latency
+        self.api_calls = 0
+        self._lock = threading.Lock()
+        self._worksheets: List[FakeWorksheet] = []
+        self.add_worksheet('data', rows=1000, cols=26, _count=False)
+
+    def _call(self):
+        with self._lock:
+            self.api_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def data(self) -> FakeWorksheet:
+        return self._worksheets[0]
+
+    @property
+    def sheet1(self) -> FakeWorksheet:
+        return self._worksheets[0]
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        self._call()
+        return list(self._worksheets)
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self._call()
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise WorksheetNotFound(title)
+
+    def add_worksheet(self, title: str, rows: int, cols: int, _count: bool = True) -> FakeWorksheet:
+        if _count:
+            self._call()
+        worksheet = FakeWorksheet(self, len(self._worksheets), title, rows, cols)
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def batch_update(self, body: Dict) -> Dict:
+        self._call()
+        by_id = {worksheet.id: worksheet for worksheet in self._worksheets}
+        for request in body['requests']:
+            inner = next(iter(request.values()))
+            sheet_id = (
+                inner.get('sheetId')
+                if 'sheetId' in inner else
+                (inner.get('start') or inner.get('range') or inner.get('dimensions')
+                 or inner.get('properties'))['sheetId']
+            )
+            by_id[sheet_id]._apply(request)
+        return {'replies': [{} for _ in body['requests']]}
+
+
+class FakeSheetsClient:
+    """Stand-in for gspread.Client."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.spreadsheets: Dict[str, FakeSpreadsheet] = {}
+
+    def create(self, title: str) -> FakeSpreadsheet:
+        url = f"https://docs.google.com/spreadsheets/d/fake-{len(self.spreadsheets) + 1}"
+        spreadsheet = FakeSpreadsheet(title, url, self.latency)
+        self.spreadsheets[url] = spreadsheet
+        return spreadsheet
+
+    def open_by_url(self, url: str) -> FakeSpreadsheet:
+        try:
+            return self.spreadsheets[url]
+        except KeyError:
+            raise ValueError(f"No fake spreadsheet at {url}")
@@ -0,0 +1,170 @@
+"""
+Company name and website canonicalization for de-duplicating input rows.
+
+Input sheets merged from several sources often list the same company more
+than once with small variations ("Alphabet Inc. (Google)" vs. "Google",
+"https://www.apple.com" vs. "apple.com/"). group_duplicates clusters such
+rows so that only one summary has to be generated per company. A shared
+domain alone is not enough: pages on hosts like github.io, myshopify.com or
+linkedin.com/company/... belong to different companies.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+# Legal-form and filler words dropped from the end of company names
+_NAME_SUFFIXES = {
+    'inc', 'incorporated', 'corp', 'corporation', 'co', 'company', 'companies',
+    'ltd', 'limited', 'llc', 'llp', 'lp', 'plc', 'gmbh', 'ag', 'sa', 'nv', 'bv',
+    'ab', 'oy', 'spa', 'srl', 'pty', 'pte', 'kk', 'holdings', 'holding', 'group', 'com'
+}
+
+# Second-level labels under which registrations happen one level deeper (example.co.uk)
+_SECOND_LEVEL_LABELS = {'co', 'com', 'net', 'org', 'ac', 'gov', 'edu', 'ne', 'or'}
+
+_PARENTHETICAL = re.compile(r'\(([^)]*)\)')
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def canonical_name(name: str) -> str:
+    """
+    Reduce a company name to a comparable form.
+
+    Strips accents, punctuation, parenthetical notes and trailing legal forms,
+    so "Amazon.com, Inc." and "amazon" both become "amazon".
+
+    Args:
+        name (str): Company name as written in the sheet
+
+    Returns:
+        str: Canonical name (empty if nothing meaningful is left)
+    """
+    name = unicodedata.normalize('NFKD', str(name or '')).encode('ascii', 'ignore').decode('ascii')
+    name = _PARENTHETICAL.sub(' ', name.lower()).replace('&', ' and ')
+    words = _NON_WORD.sub(' ', name).split()
+    while len(words) > 1 and words[-1] in _NAME_SUFFIXES:
+        words.pop()
+    if words and words[0] == 'the' and len(words) > 1:
+        words.pop(0)
+    return ' '.join(words)
+
+
+def name_aliases(name: str) -> List[str]:
+    """
+    Return the canonical names a company goes by.
+
+    Parenthetical notes are treated as aliases, so "Alphabet Inc. (Google)"
+    yields ["alphabet", "google"].
+
+    Args:
+        name (str): Company name as written in the sheet
+
+    Returns:
+        List[str]: Distinct, non-empty canonical names
+    """
+    aliases = []
+    for candidate in [name] + _PARENTHETICAL.findall(str(name or '')):
+        alias = canonical_name(candidate)
+        if len(alias) > 1 and alias not in aliases:
+            aliases.append(alias)
+    return aliases
+
+
+def canonical_domain(website: str) -> str:
+    """
+    Reduce a website to its registered domain.
+
+    "https://www.apple.com/iphone/", "apple.com/" and "shop.apple.com" all
+    become "apple.com".
+
+    Args:
+        website (str): Website or URL as written in the sheet
+
+    Returns:
+        str: Canonical domain, or an empty string if there is none
+    """
+    website = str(website or '').strip().lower()
+    if not website:
+        return ''
+    if '://' not in website:
+        website = '//' + website
+    try:
+        host = urlsplit(website).hostname or ''
+    except ValueError:
+        return ''
+
+    labels = [label for label in host.split('.') if label]
+    if len(labels) < 2:
+        return host
+    keep = 3 if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _SECOND_LEVEL_LABELS else 2
+    return '.'.join(labels[-keep:])
+
+
+def group_duplicates(companies: Sequence[Dict]) -> List[List[int]]:
+    """
+    Cluster rows that refer to the same company.
+
+    Rows are grouped when they have the same canonical domain and share a
+    name alias, so "Alphabet Inc. (Google)" and "Google" on google.com merge
+    while "Acme" and "Zeta" on github.io stay apart. Rows without a website
+    join the group whose names include one of their aliases, as long as that
+    match is unambiguous; otherwise they are grouped with other website-less
+    rows by name. Rows with different domains are never merged, so companies
+    that merely share a name stay apart.
+
+    Args:
+        companies (Sequence[Dict]): Company rows with 'Company Name' and 'Website'
+
+    Returns:
+        List[List[int]]: Groups of row indices, in order of first appearance;
+            the first index of each group is its representative
+    """
+    groups: List[List[int]] = []
+    group_by_domain_alias: Dict[Tuple[str, str], int] = {}
+    domain_groups_by_alias: Dict[str, set] = {}
+    domainless = []
+
+    for index, company in enumerate(companies):
+        domain = canonical_domain(company.get('Website', ''))
+        if not domain:
+            domainless.append(index)
+            continue
+        # Rows without a usable name only merge with each other
+        aliases = name_aliases(company.get('Company Name', '')) or ['']
+        group = next((group_by_domain_alias[(domain, alias)] for alias in aliases
+                      if (domain, alias) in group_by_domain_alias), None)
+        if group is None:
+            group = len(groups)
+            groups.append([])
+        groups[group].append(index)
+        for alias in aliases:
+            group_by_domain_alias.setdefault((domain, alias), group)
+            if alias:
+                domain_groups_by_alias.setdefault(alias, set()).add(group)
+
+    group_by_alias: Dict[str, int] = {}
+    for index in domainless:
+        aliases = name_aliases(companies[index].get('Company Name', ''))
+        target: Optional[int] = None
+        for alias in aliases:
+            candidates = domain_groups_by_alias.get(alias, set())
+            if len(candidates) == 1:
+                target = next(iter(candidates))
+                break
+            if alias in group_by_alias:
+                target = group_by_alias[alias]
+                break
+
+        if target is None:
+            target = len(groups)
+            groups.append([])
+        groups[target].append(index)
+        for alias in aliases:
+            group_by_alias.setdefault(alias, target)
+
+    for group in groups:
+        group.sort()
+    groups.sort(key=lambda group: group[0])
+    return groups
@@ -0,0 +1,303 @@
+"""
+Model cascade: try a small, fast model first and escalate only when needed.
+
+Most companies are summarized well by the cheapest model; only obscure ones
+come back with the "not readily available" fallback sentence or a badly
+formatted answer. A ModelCascade sends each single-company request to its
+first tier, checks the answer with a SummaryValidator, and moves up to the
+next, larger tier only if the check fails. The last tier's answer is always
+accepted. Multi-company (batched) requests go to the first tier, and each
+entry of the answer is checked the same way (see ModelCascade.accept).
+
+Each tier is a ProviderRouter of its own (so its endpoints keep their own
+rate limiters) plus a cap on its concurrent requests, so a slow large model
+can't take every worker. Per-tier request, acceptance, latency and cost
+figures show how often rows escalate and what that costs.
+
+Tiers are listed in a JSON file (MODEL_CASCADE); every tier takes endpoint
+entries in the LLM_ENDPOINTS format:
+
+    [
+        {"name": "small", "max_concurrency": 8,
+         "endpoints": [{"provider": "groq", "model": "llama-3.1-8b-instant"}]},
+        {"name": "large", "max_concurrency": 2,
+         "endpoints": [{"provider": "groq", "model": "llama3-70b-8192",
+                        "requests_per_minute": 30, "tokens_per_minute": 6000}]}
+    ]
+"""
+
+import json
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence
+
+from provider_router import Completion, ProviderRouter
+
+logger = logging.getLogger(__name__)
+
+# Keys a tier entry in the MODEL_CASCADE file may set
+TIER_OPTIONS = ('name', 'endpoints', 'max_concurrency')
+
+# The answer the prompt asks for when the model knows nothing about a company
+FALLBACK_PHRASE = "not readily available in public sources"
+
+# Words followed by a period that doesn't end the sentence ("Acme Inc. makes ...")
+_ABBREVIATIONS = {
+    'inc', 'corp', 'co', 'ltd', 'llc', 'plc', 'bros', 'intl', 'mfg', 'dept', 'est', 'approx', 'vs', 'no',
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'jr', 'sr', 'st', 'mt', 'ave', 'e.g', 'i.e', 'cf'
+}
+# Initials and dotted acronyms such as "J." or "U.S."
+_INITIALS = re.compile(r'(?:[a-z]\.)*[a-z]')
+_CLOSING = '"\')]\u201d\u2019'
+_FORMATTING = re.compile(r'^\s*(?:summary\s*:|[-*•#]|\d+[.)]\s)|\*\*|\n\s*\n', re.IGNORECASE | re.MULTILINE)
+
+
+def count_sentences(text: str) -> int:
+    """
+    Count the sentences of ``text``.
+
+    A word ending in ".", "!" or "?" ends a sentence, except for abbreviations
+    like "Inc." or "U.S." in the middle of the text.
+    """
+    words = text.split()
+    count = 0
+    for position, word in enumerate(words):
+        word = word.rstrip(_CLOSING)
+        if not word or word[-1] not in '.!?':
+            continue
+        stem = word[:-1].lstrip('"\'(\u201c\u2018').lower()
+        if word[-1] == '.' and position < len(words) - 1 and \
+                (stem in _ABBREVIATIONS or _INITIALS.fullmatch(stem)):
+            continue
+        count += 1
+    return count
+
+
+class SummaryValidator:
+    """
+    Checks a single-company summary against the prompt's rules.
+    """
+
+    def __init__(self, min_words: int = 8, max_words: int = 100, max_sentences: int = 4,
+                 reject_fallback: bool = True):
+        """
+        Args:
+            min_words (int): Fewer words than this fails as ``too_short``
+            max_words (int): More words than this fails as ``too_long``
+            max_sentences (int): More sentences than this fails as ``too_long``
+            reject_fallback (bool): Fail the "not readily available" fallback answer
+        """
+        self.min_words = min_words
+        self.max_words = max_words
+        self.max_sentences = max_sentences
+        self.reject_fallback = reject_fallback
+
+    def problems(self, summary: str) -> List[str]:
+        """
+        Return why ``summary`` fails validation.
+
+        Returns:
+            List[str]: Reasons among ``empty``, ``fallback``, ``too_short``,
+                ``too_long`` and ``formatting``; empty if the summary is fine
+        """
+        summary = (summary or '').strip()
+        if not summary:
+            return ['empty']
+        problems = []
+        if self.reject_fallback and FALLBACK_PHRASE in summary.lower():
+            problems.append('fallback')
+        words = len(summary.split())
+        if words < self.min_words and 'fallback' not in problems:
+            problems.append('too_short')
+        if words > self.max_words or count_sentences(summary) > self.max_sentences:
+            problems.append('too_long')
+        if _FORMATTING.search(summary):
+            problems.append('formatting')
+        return problems
+
+
+class Tier:
+    """
+    One cascade tier: a router, a concurrency cap and its statistics.
+    """
+
+    def __init__(self, name: str, router: ProviderRouter, max_concurrency: Optional[int] = None):
+        """
+        Args:
+            name (str): Tier name used in logs and stats
+            router (ProviderRouter): Endpoints of this tier
+            max_concurrency (Optional[int]): Requests this tier may have in flight (unlimited if None)
+        """
+        self.name = name
+        self.router = router
+        self.max_concurrency = max_concurrency
+        self.requests = 0
+        self.accepted = 0
+        self.escalated = 0
+        self.errors = 0
+        self.reasons: Counter = Counter()
+        self.latency_seconds = 0.0
+        self.cost_usd = 0.0
+
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._lock = threading.Lock()
+
+    @property
+    def models(self) -> List[str]:
+        return [endpoint.model for endpoint in self.router.endpoints]
+
+    def complete(self, messages: List[Dict], max_tokens: int, reserved_tokens: int, description: str,
+                 max_retries: int, request_slot: Callable[[], ContextManager]) -> Completion:
+        with self._slots or nullcontext():
+            try:
+                completion = self.router.complete(messages, max_tokens, reserved_tokens, description=description,
+                                                  max_retries=max_retries, request_slot=request_slot)
+            except Exception:
+                with self._lock:
+                    self.requests += 1
+                    self.errors += 1
+                raise
+
+        endpoint = next(endpoint for endpoint in self.router.endpoints if endpoint.name == completion.endpoint)
+        cost = endpoint.cost(completion.prompt_tokens or 0, completion.completion_tokens or 0)
+        with self._lock:
+            self.requests += 1
+            self.latency_seconds += completion.latency
+            self.cost_usd += cost or 0.0
+        return completion
+
+    def record(self, problems: Sequence[str]):
+        """Record whether this tier's answer was accepted or escalated, and why."""
+        with self._lock:
+            if problems:
+                self.escalated += 1
+                self.reasons.update(problems)
+            else:
+                self.accepted += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            answered = self.requests - self.errors
+            validated = self.accepted + self.escalated
+            return {
+                'name': self.name,
+                'models': self.models,
+                'requests': self.requests,
+                'accepted': self.accepted,
+                'escalated': self.escalated,
+                'errors': self.errors,
+                'hit_rate': round(self.accepted / validated, 3) if validated else None,
+                'escalation_reasons': dict(self.reasons),
+                'mean_latency': round(self.latency_seconds / answered, 4) if answered else None,
+                'cost_usd': round(self.cost_usd, 6)
+            }
+
+
+class ModelCascade:
+    """
+    Thread-safe tiered pipeline for single-company summaries.
+    """
+
+    def __init__(self, tiers: Sequence[Tier], validator: Optional[SummaryValidator] = None):
+        """
+        Args:
+            tiers (Sequence[Tier]): Tiers from the cheapest to the most capable model
+            validator (Optional[SummaryValidator]): Decides when to escalate
+        """
+        if not tiers:
+            raise ValueError("ModelCascade needs at least one tier")
+        self.tiers = list(tiers)
+        self.validator = validator or SummaryValidator()
+
+    @classmethod
+    def from_file(cls, path: str, hedge: bool = False, validator: Optional[SummaryValidator] = None) -> 'ModelCascade':
+        """Build a cascade from a tiers JSON file (see the module docstring)."""
+        with open(path, 'r', encoding='utf-8') as tiers_file:
+            entries = json.load(tiers_file)
+
+        tiers = []
+        for position, entry in enumerate(entries, start=1):
+            unknown = set(entry) - set(TIER_OPTIONS)
+            if unknown:
+                raise ValueError(f"Tier {position} in {path} has unknown keys: {', '.join(sorted(unknown))}")
+            if not entry.get('endpoints'):
+                raise ValueError(f"Tier {position} in {path} has no endpoints")
+            name = entry.get('name', f"tier-{position}")
+            router = ProviderRouter.from_entries(entry['endpoints'], source=f"{path} tier {name}", hedge=hedge)
+            max_concurrency = entry.get('max_concurrency')
+            tiers.append(Tier(name, router, int(max_concurrency) if max_concurrency else None))
+        return cls(tiers, validator)
+
+    @property
+    def key(self) -> str:
+        """Identifies the cascade's models, e.g. for summary cache keys."""
+        return 'cascade:' + '>'.join('+'.join(tier.models) for tier in self.tiers)
+
+    def complete(self, messages: List[Dict], max_tokens: int, reserved_tokens: int, description: str = 'request',
+                 max_retries: int = 3, request_slot: Callable[[], ContextManager] = nullcontext) -> Completion:
+        """
+        Send a single-company request up the tiers until an answer passes validation.
+
+        A tier whose request fails outright also escalates. The last tier's
+        answer is returned as is, and its errors are raised. Rejected answers
+        of lower tiers are attached as ``escalated`` to the returned completion.
+        Arguments are those of ProviderRouter.complete.
+        """
+        escalated = []
+        for position, tier in enumerate(self.tiers):
+            last = position == len(self.tiers) - 1
+            try:
+                completion = tier.complete(messages, max_tokens, reserved_tokens, description,
+                                           max_retries, request_slot)
+            except Exception as e:
+                if last:
+                    raise
+                logger.warning(f"Tier {tier.name} failed on {description} ({e}), escalating")
+                continue
+
+            # A cut-off answer is the caller's to retry with more tokens, not a reason to escalate
+            problems = [] if last or completion.finish_reason == 'length' \
+                else self.validator.problems(completion.content)
+            tier.record(problems)
+            if not problems:
+                completion.escalated = escalated
+                return completion
+            logger.debug(f"Tier {tier.name} answer for {description} failed validation "
+                         f"({', '.join(problems)}), escalating")
+            escalated.append(completion)
+
+    def complete_batch(self, messages: List[Dict], max_tokens: int, reserved_tokens: int,
+                       description: str = 'request', max_retries: int = 3,
+                       request_slot: Callable[[], ContextManager] = nullcontext) -> Completion:
+        """
+        Send a multi-company request to the first tier.
+
+        The request holds a slot of that tier and counts in its statistics
+        like a single-company one. It doesn't escalate as a whole; check each
+        entry of the answer with ``accept``. Arguments are those of
+        ProviderRouter.complete.
+        """
+        return self.tiers[0].complete(messages, max_tokens, reserved_tokens, description, max_retries, request_slot)
+
+    def accept(self, summary: str) -> bool:
+        """
+        Validate one entry of a batched first-tier answer and record the outcome.
+
+        Returns:
+            bool: True if the summary passes; otherwise the company should go
+                up the cascade on its own
+        """
+        problems = self.validator.problems(summary)
+        self.tiers[0].record(problems)
+        return not problems
+
+    def stats(self) -> Dict:
+        """Per-tier statistics."""
+        return {'tiers': [tier.stats() for tier in self.tiers]}
+
+    def close(self):
+        for tier in self.tiers:
+            tier.router.close()
@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+Command-line entry point for the company summarizer.
+
+    python cli.py [command] [options]
+
+Each command (run, resume, retry-failed, watch, validate, estimate,
+simulate, lookup, serve) has a handler here that parses nothing itself and
+calls into the library: CompanySummarizer in company_summarizer.py and the
+feature modules next to it. Handlers import what they use when they run, so
+``--help`` and commands that don't need a module never load it.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import List, Optional
+
+from sheet_writer import WRITE_MODES
+
+logger = logging.getLogger('company_summarizer')
+
+
+COMMANDS = ('run', 'resume', 'retry-failed', 'watch', 'validate', 'estimate', 'simulate', 'lookup', 'serve')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command-line parser.
+    
+    Option defaults come from the environment variables documented in the
+    README, so call load_dotenv() first if .env should apply.
+    """
+    parser = argparse.ArgumentParser(
+        prog='cli.py',
+        description="Summarize companies listed in a Google Sheet or a local file with Groq.",
+        epilog="Without a command, 'run' is assumed. Defaults come from environment variables (and .env)."
+    )
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--spreadsheet-url', default=os.getenv('SPREADSHEET_URL'),
+                        help="Google Spreadsheet URL (SPREADSHEET_URL)")
+    common.add_argument('--input', default=os.getenv('INPUT_SHEET', 'data'),
+                        help="Input worksheet or .csv/.xlsx/.parquet file (INPUT_SHEET)")
+    common.add_argument('--output', default=os.getenv('OUTPUT_SHEET', 'Company Summaries'),
+                        help="Output worksheet or .csv/.xlsx/.parquet file (OUTPUT_SHEET)")
+    common.add_argument('--credentials', default=os.getenv('GOOGLE_CREDENTIALS_PATH', 'credentials.json'),
+                        help="Google service account credentials file (GOOGLE_CREDENTIALS_PATH)")
+    common.add_argument('--write-mode', default=os.getenv('WRITE_MODE', 'replace'),
+                        help=f"One of {', '.join(WRITE_MODES)} (WRITE_MODE)")
+    common.add_argument('--batch-size', type=int, default=os.getenv('BATCH_SIZE', '1'),
+                        help="Companies per API request (BATCH_SIZE)")
+    common.add_argument('--no-dedupe', dest='dedupe', action='store_false', default=os.getenv('DEDUPE', '1') != '0',
+                        help="Summarize duplicate companies separately (DEDUPE=0)")
+    common.add_argument('--endpoints', default=os.getenv('LLM_ENDPOINTS'),
+                        help="JSON file of LLM endpoints to route between (LLM_ENDPOINTS)")
+    common.add_argument('--cascade', default=os.getenv('MODEL_CASCADE'),
+                        help="JSON file of model tiers to escalate single-company requests through (MODEL_CASCADE)")
+    common.add_argument('--hedge', action='store_true', default=os.getenv('HEDGE_REQUESTS', '0') == '1',
+                        help="Duplicate requests running past the p95 latency to a second endpoint (HEDGE_REQUESTS=1)")
+    common.add_argument('--log-level', default=os.getenv('LOG_LEVEL', 'INFO'), help="Logging level (LOG_LEVEL)")
+    
+    run_options = argparse.ArgumentParser(add_help=False)
+    run_options.add_argument('--max-concurrency', type=int, default=os.getenv('MAX_CONCURRENCY', '4'),
+                             help="Summary requests in flight (MAX_CONCURRENCY)")
+    run_options.add_argument('--stream', action='store_true', help="Read, summarize and append in chunks")
+    run_options.add_argument('--chunk-size', type=int, default=os.getenv('CHUNK_SIZE', '500'),
+                             help="Rows per chunk (CHUNK_SIZE)")
+    run_options.add_argument('--shard', action='store_true', help="Work on a sharded run with other processes")
+    run_options.add_argument('--shard-size', type=int, default=os.getenv('SHARD_SIZE', '1000'),
+                             help="Rows per shard (SHARD_SIZE)")
+    run_options.add_argument('--lease-seconds', type=float, default=os.getenv('SHARD_LEASE_SECONDS', '300'),
+                             help="Shard lease duration (SHARD_LEASE_SECONDS)")
+    run_options.add_argument('--worker-id', default=os.getenv('WORKER_ID'), help="Shard worker name (WORKER_ID)")
+    run_options.add_argument('--report', default=os.getenv('RUN_REPORT_PATH', os.path.join('.company_summarizer', 'run_report.json')),
+                             help="JSON run report path, empty to disable (RUN_REPORT_PATH)")
+    run_options.add_argument('--metrics-file', default=os.getenv('PROMETHEUS_METRICS_PATH'),
+                             help="Prometheus text-format metrics path (PROMETHEUS_METRICS_PATH)")
+    
+    run = subparsers.add_parser('run', parents=[common, run_options], help="Summarize the input and write the output")
+    run.add_argument('--resume', action='store_true', help="Continue an interrupted run")
+    subparsers.add_parser('resume', parents=[common, run_options],
+                          help="Continue an interrupted run (same as run --resume)").set_defaults(resume=True)
+    subparsers.add_parser('retry-failed', parents=[common, run_options],
+                          help="Re-process only the rows marked failed in the output worksheet"
+                          ).set_defaults(resume=False, retry_failed=True)
+    watch = subparsers.add_parser('watch', parents=[common],
+                                  help="Keep the output tab current by summarizing only added or edited rows")
+    watch.add_argument('--max-concurrency', type=int, default=os.getenv('MAX_CONCURRENCY', '4'),
+                       help="Summary requests in flight (MAX_CONCURRENCY)")
+    watch.add_argument('--interval', type=float, default=os.getenv('WATCH_INTERVAL_SECONDS', '60'),
+                       help="Seconds between polls (WATCH_INTERVAL_SECONDS)")
+    watch.add_argument('--once', action='store_true', help="Poll once and exit, e.g. from cron")
+    validate = subparsers.add_parser('validate', parents=[common],
+                                     help="Check the configuration without summarizing anything")
+    validate.add_argument('--online', action='store_true',
+                          help="Also open the spreadsheet and check the Groq API key")
+    estimate = subparsers.add_parser('estimate', parents=[common],
+                                     help="Estimate requests, tokens, cost and run time without calling the API")
+    estimate.add_argument('--max-concurrency', type=int, default=os.getenv('MAX_CONCURRENCY', '4'),
+                          help="Summary requests in flight (MAX_CONCURRENCY)")
+    estimate.add_argument('--latency', type=float, help="Seconds per request to assume (default: 1)")
+    simulate = subparsers.add_parser('simulate',
+                                     help="Predict run time for a sweep of concurrency and batch sizes "
+                                          "from a recorded request trace (see simulator.py)")
+    simulate.add_argument('--trace', default=os.getenv('LATENCY_TRACE_PATH'),
+                          help="Trace recorded by earlier runs (LATENCY_TRACE_PATH)")
+    simulate.add_argument('--rows', type=int, required=True, help="Input rows to simulate")
+    simulate.add_argument('--max-concurrency', type=int, nargs='+', help="Requests in flight to try (default: 1 to 32)")
+    simulate.add_argument('--batch-size', type=int, nargs='+', help="Companies per request to try (default: 1 to 20)")
+    simulate.add_argument('--requests-per-minute', type=float, default=os.getenv('GROQ_REQUESTS_PER_MINUTE', '30'),
+                          help="Client-side request limit (GROQ_REQUESTS_PER_MINUTE)")
+    simulate.add_argument('--tokens-per-minute', type=float, default=os.getenv('GROQ_TOKENS_PER_MINUTE', '6000'),
+                          help="Client-side token limit (GROQ_TOKENS_PER_MINUTE)")
+    simulate.add_argument('--provider-rpm', type=float,
+                          help="The provider's actual request quota; requests over it get 429s")
+    simulate.add_argument('--provider-tpm', type=float,
+                          help="The provider's actual token quota; requests over it get 429s")
+    simulate.add_argument('--duplicate-rate', type=float, default=0.0, help="Fraction of rows that are duplicates")
+    simulate.add_argument('--cache-hit-rate', type=float, default=0.0,
+                          help="Fraction of companies already in the summary cache")
+    simulate.add_argument('--seed', type=int, default=1, help="Seed for the random draws")
+    simulate.add_argument('--report', help="Also write the results as JSON to this file")
+    simulate.add_argument('--log-level', default=os.getenv('LOG_LEVEL', 'INFO'), help="Logging level (LOG_LEVEL)")
+    lookup = subparsers.add_parser('lookup',
+                                   help="Find past summaries in the local summary index (see summary_index.py)")
+    lookup.add_argument('name', nargs='*', help="Company name to look up")
+    lookup.add_argument('--domain', help="Website or domain to look up, e.g. acme.com")
+    lookup.add_argument('--prefix', action='store_true', help="Match names and domains starting with the given values")
+    lookup.add_argument('--text', help="Full-text search over summaries and names, e.g. 'battery recycling'")
+    lookup.add_argument('--export', help="Write the whole index to this .csv or .parquet file")
+    lookup.add_argument('--limit', type=int, default=20, help="Most results shown")
+    lookup.add_argument('--index', default=os.getenv('SUMMARY_INDEX_PATH'),
+                        help="Summary index database (SUMMARY_INDEX_PATH)")
+    lookup.add_argument('--log-level', default=os.getenv('LOG_LEVEL', 'INFO'), help="Logging level (LOG_LEVEL)")
+    serve = subparsers.add_parser('serve', parents=[common],
+                                  help="Answer summary requests over HTTP with warm clients (see service.py)")
+    serve.add_argument('--host', default=os.getenv('SERVICE_HOST', '127.0.0.1'), help="Interface to bind (SERVICE_HOST)")
+    serve.add_argument('--port', type=int, default=os.getenv('SERVICE_PORT', '8080'), help="Port to bind (SERVICE_PORT)")
+    serve.add_argument('--socket', default=os.getenv('SERVICE_SOCKET'),
+                       help="Listen on this Unix socket instead of a port (SERVICE_SOCKET)")
+    serve.add_argument('--max-concurrency', type=int, default=os.getenv('MAX_CONCURRENCY', '4'),
+                       help="Upstream requests in flight (MAX_CONCURRENCY)")
+    serve.add_argument('--max-batch', type=int, default=os.getenv('SERVICE_MAX_BATCH', '8'),
+                       help="Most companies per upstream request (SERVICE_MAX_BATCH)")
+    serve.add_argument('--batch-window-ms', type=float, default=os.getenv('SERVICE_BATCH_WINDOW_MS', '10'),
+                       help="How long a request waits for others to batch with (SERVICE_BATCH_WINDOW_MS)")
+    serve.add_argument('--timeout', type=float, default=os.getenv('SERVICE_TIMEOUT_SECONDS', '120'),
+                       help="Seconds a request waits for its summary (SERVICE_TIMEOUT_SECONDS)")
+    return parser
+
+
+def _files_only(args) -> bool:
+    """True if both input and output are local files, so no Google access is needed."""
+    from data_sources import file_format
+    
+    return bool(file_format(args.input) and file_format(args.output))
+
+
+def _build_summarizer(args, groq_api_key: Optional[str]):
+    from cascade import ModelCascade
+    from company_summarizer import CompanySummarizer
+    from provider_router import ProviderRouter
+    from summary_cache import SummaryCache
+    from summary_index import SummaryIndex
+    
+    return CompanySummarizer(
+        args.credentials,
+        groq_api_key,
+        max_workers=getattr(args, 'max_concurrency', 4),
+        cache=SummaryCache.from_env(),
+        index=SummaryIndex.from_env(),
+        batch_size=args.batch_size,
+        dedupe=args.dedupe,
+        router=ProviderRouter.from_file(args.endpoints, hedge=args.hedge) if args.endpoints else None,
+        cascade=ModelCascade.from_file(args.cascade, hedge=args.hedge) if args.cascade else None
+    )
+
+
+def _command_run(args) -> int:
+    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+    
+    if not GROQ_API_KEY and not (args.endpoints or args.cascade):
+        print("Error: GROQ_API_KEY environment variable not set")
+        print("Please set your Groq API key: export GROQ_API_KEY='your-api-key-here'")
+        return 1
+    
+    # Runs that only read and write local files don't need Google credentials
+    files_only = _files_only(args)
+    
+    if not files_only and not os.path.exists(args.credentials):
+        print(f"Error: Google credentials file not found at {args.credentials}")
+        print("Please download your Google Service Account credentials and save as 'credentials.json'")
+        return 1
+    
+    try:
+        # Initialize the summarizer
+        summarizer = _build_summarizer(args, GROQ_API_KEY)
+        
+        # If no spreadsheet URL provided, create a sample one
+        if not args.spreadsheet_url and not files_only:
+            print("No spreadsheet URL provided. Creating a sample spreadsheet...")
+            url = summarizer.create_sample_sheet("Company Analysis Sample")
+            print(f"Sample spreadsheet created: {url}")
+            print("You can now set SPREADSHEET_URL environment variable and run the analysis.")
+            return 0
+        
+        # Run the full analysis
+        summarizer.run_full_analysis(
+            args.spreadsheet_url,
+            input_sheet=args.input,
+            output_sheet=args.output,
+            resume=args.resume,
+            streaming=args.stream,
+            chunk_size=args.chunk_size,
+            write_mode=args.write_mode,
+            report_path=args.report or None,
+            metrics_path=args.metrics_file,
+            sharded=args.shard,
+            shard_size=args.shard_size,
+            lease_seconds=args.lease_seconds,
+            worker_id=args.worker_id,
+            retry_failed=getattr(args, 'retry_failed', False)
+        )
+        return 0
+        
+    except Exception as e:
+        logger.error(f"Application failed: {e}")
+        print(f"Error: {e}")
+        return 1
+
+
+def _command_validate(args) -> int:
+    from cascade import ModelCascade
+    from data_sources import file_format
+    from provider_router import ProviderRouter
+    
+    problems = []
+    
+    def check(ok: bool, message: str):
+        print(f"{'PASS' if ok else 'FAIL'}: {message}")
+        if not ok:
+            problems.append(message)
+    
+    files_only = _files_only(args)
+    if args.endpoints:
+        try:
+            router = ProviderRouter.from_file(args.endpoints)
+            check(True, f"{args.endpoints} lists {len(router.endpoints)} endpoint(s)")
+        except (OSError, ValueError) as e:
+            check(False, f"{args.endpoints} is a valid endpoints file ({e})")
+    if args.cascade:
+        try:
+            cascade = ModelCascade.from_file(args.cascade)
+            check(True, f"{args.cascade} lists {len(cascade.tiers)} tier(s)")
+        except (OSError, ValueError) as e:
+            check(False, f"{args.cascade} is a valid cascade file ({e})")
+    if not (args.endpoints or args.cascade):
+        check(bool(os.getenv('GROQ_API_KEY')), "GROQ_API_KEY is set")
+    check(args.write_mode in WRITE_MODES, f"write mode {args.write_mode!r} is one of {', '.join(WRITE_MODES)}")
+    if file_format(args.output):
+        check(args.write_mode == 'replace', f"write mode for output file {args.output} is replace")
+    check(args.batch_size >= 1, f"batch size {args.batch_size} is at least 1")
+    if file_format(args.input):
+        check(os.path.exists(args.input), f"input file {args.input} exists")
+    
+    if not files_only:
+        try:
+            with open(args.credentials, 'r', encoding='utf-8') as credentials_file:
+                credentials = json.load(credentials_file)
+            check('client_email' in credentials and 'private_key' in credentials,
+                  f"{args.credentials} is a service account key file")
+        except (OSError, ValueError) as e:
+            check(False, f"{args.credentials} is readable JSON ({e})")
+        check(bool(args.spreadsheet_url) and '/spreadsheets/d/' in args.spreadsheet_url,
+              "SPREADSHEET_URL is a Google Sheets URL")
+    
+    if args.online and not problems:
+        summarizer = _build_summarizer(args, os.getenv('GROQ_API_KEY'))
+        endpoints = list(summarizer.router.endpoints)
+        if summarizer.cascade is not None:
+            endpoints += [endpoint for tier in summarizer.cascade.tiers[1:] for endpoint in tier.router.endpoints]
+        for endpoint in endpoints:
+            try:
+                endpoint.client.models.list()
+                check(True, f"API key for endpoint {endpoint.name} is accepted")
+            except Exception as e:
+                check(False, f"API key for endpoint {endpoint.name} is accepted ({e})")
+        if not files_only:
+            try:
+                summarizer.open_spreadsheet(args.spreadsheet_url)
+                check(True, f"spreadsheet {summarizer.spreadsheet.title!r} can be opened")
+                if not file_format(args.input):
+                    summarizer._input_columns(summarizer.spreadsheet.worksheet(args.input))
+                    check(True, f"input worksheet {args.input!r} has a 'Company Name' column")
+            except Exception as e:
+                check(False, f"spreadsheet and input worksheet are accessible ({e})")
+    
+    print("Configuration is valid." if not problems else f"{len(problems)} problem(s) found.")
+    return 0 if not problems else 1
+
+
+def _command_estimate(args) -> int:
+    from company_summarizer import ASSUMED_LATENCY_SECONDS, INPUT_COLUMNS
+    from data_sources import file_format, open_source
+    
+    latency = ASSUMED_LATENCY_SECONDS if args.latency is None else args.latency
+    try:
+        summarizer = _build_summarizer(args, os.getenv('GROQ_API_KEY'))
+        if not file_format(args.input):
+            summarizer.open_spreadsheet(args.spreadsheet_url)
+        companies = open_source(args.input, INPUT_COLUMNS, summarizer=summarizer).read()
+        estimate = summarizer.estimate_run(companies, latency=latency)
+    except Exception as e:
+        logger.error(f"Estimate failed: {e}")
+        print(f"Error: {e}")
+        return 1
+    
+    print(f"Rows: {estimate['rows']} ({estimate['distinct_companies']} distinct companies, "
+          f"{estimate['cached']} already cached)")
+    print(f"Cache hit rate: {estimate['cache_hit_rate']:.0%}")
+    print(f"API requests: {estimate['requests']} (batch size {args.batch_size}, "
+          f"{args.max_concurrency} in flight)")
+    print(f"Tokens: ~{estimate['prompt_tokens']} prompt ({estimate['static_prefix_tokens']} in the shared static prefix), "
+          f"~{estimate['expected_completion_tokens']} completion (budget {estimate['max_completion_tokens']})")
+    if estimate['estimated_cost_usd'] is not None:
+        print(f"Cost: ~${estimate['estimated_cost_usd']:.4f} at {estimate['model']} list prices")
+    else:
+        print(f"Cost: unknown, no prices for {estimate['model']} (set input_price/output_price in LLM_ENDPOINTS)")
+    print(f"Minimum run time at the configured rate limits: {estimate['min_minutes']:.1f} minutes")
+    print(f"Estimated run time at ~{latency:g}s per request: {estimate['estimated_minutes']:.1f} minutes")
+    return 0
+
+
+def _command_simulate(args) -> int:
+    if not args.trace or not os.path.exists(args.trace):
+        print("Error: no request trace found; record one by running with LATENCY_TRACE_PATH set, "
+              "then pass it with --trace")
+        return 1
+    
+    from company_summarizer import prompt_overhead_tokens
+    from retry import RetryPolicy
+    from simulator import DEFAULT_BATCH_SIZES, DEFAULT_CONCURRENCY, TraceModel, sweep
+    
+    try:
+        model = TraceModel.load(args.trace, prompt_overhead=prompt_overhead_tokens())
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    trace = model.summary()
+    print(f"Trace: {trace['requests']} requests, p50 latency {trace['latency_p50']:.2f}s, "
+          f"{trace['rate_limit_rate']:.1%} of attempts rate limited, {trace['error_rate']:.1%} failed")
+    
+    # The simulated limiter reports every 429 it sees; the results table sums them up
+    logging.getLogger('rate_limiter').setLevel(logging.ERROR)
+    print(f"{'concurrency':>11} {'batch':>5} {'minutes':>9} {'rows/s':>8} {'errors':>7} {'requests':>9} {'429s':>6}")
+    
+    def show(result):
+        print(f"{result['max_concurrency']:>11} {result['batch_size']:>5} {result['wall_seconds'] / 60:>9.1f} "
+              f"{result['rows_per_second'] or 0:>8.2f} {result['error_rate']:>7.2%} {result['requests']:>9} "
+              f"{result['rate_limited']:>6}")
+    
+    results = sweep(model, args.rows, args.max_concurrency or DEFAULT_CONCURRENCY, args.batch_size or DEFAULT_BATCH_SIZES,
+                    progress=show,
+                    requests_per_minute=args.requests_per_minute, tokens_per_minute=args.tokens_per_minute,
+                    provider_rpm=args.provider_rpm, provider_tpm=args.provider_tpm,
+                    retry_policy=RetryPolicy.from_env(), duplicate_rate=args.duplicate_rate,
+                    cache_hit_rate=args.cache_hit_rate, seed=args.seed)
+    best = results[0]
+    print(f"\nFastest: MAX_CONCURRENCY={best['max_concurrency']} BATCH_SIZE={best['batch_size']}, "
+          f"~{best['wall_seconds'] / 60:.1f} minutes for {args.rows} rows")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as report_file:
+            json.dump({'trace': trace, 'results': results}, report_file, indent=2)
+    return 0
+
+
+def _command_lookup(args) -> int:
+    import sqlite3
+    
+    from summary_index import DEFAULT_INDEX_PATH, SummaryIndex
+    
+    path = DEFAULT_INDEX_PATH if args.index is None else args.index
+    if not path or not os.path.exists(path):
+        print("Error: no summary index found; runs add to it unless SUMMARY_INDEX_PATH is empty")
+        return 1
+    if not (args.name or args.domain or args.text or args.export):
+        print("Error: give a company name, --domain, --text or --export")
+        return 1
+    
+    index = SummaryIndex(path)
+    try:
+        if args.export:
+            start = time.perf_counter()
+            written = index.export(args.export)
+            print(f"Exported {written} summaries to {args.export} in {time.perf_counter() - start:.1f}s")
+            return 0
+        start = time.perf_counter()
+        if args.text:
+            matches = index.search(args.text, limit=args.limit)
+        else:
+            matches = index.lookup(' '.join(args.name), args.domain, prefix=args.prefix, limit=args.limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    except sqlite3.OperationalError as e:
+        print(f"Error: invalid search {args.text!r}: {e}")
+        return 1
+    finally:
+        index.close()
+    
+    for match in matches:
+        where = ' / '.join(part for part in (match['Spreadsheet'], match['Worksheet']) if part)
+        print(f"{match['Company Name']} ({match['Domain'] or 'no domain'}) - {match['Processed Date']}, "
+              f"{match['Model']}, {where}")
+        print(f"    {match['Summary']}")
+    print(f"{len(matches)} matches in {elapsed_ms:.1f} ms")
+    return 0
+
+
+def _command_watch(args) -> int:
+    from data_sources import file_format
+    
+    if not os.getenv('GROQ_API_KEY') and not (args.endpoints or args.cascade):
+        print("Error: GROQ_API_KEY environment variable not set")
+        return 1
+    if file_format(args.input) or file_format(args.output) or not args.spreadsheet_url:
+        print("Error: watch needs SPREADSHEET_URL and input and output worksheets, not files")
+        return 1
+    
+    from watch import SheetWatcher
+    
+    try:
+        summarizer = _build_summarizer(args, os.getenv('GROQ_API_KEY'))
+        summarizer.open_spreadsheet(args.spreadsheet_url)
+        watcher = SheetWatcher.for_run(summarizer, args.spreadsheet_url, args.input, args.output)
+        if args.once:
+            print(f"Summarized {watcher.poll()} added or edited rows.")
+        else:
+            watcher.run(args.interval)
+        return 0
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+        return 0
+    except Exception as e:
+        logger.error(f"Watch failed: {e}")
+        print(f"Error: {e}")
+        return 1
+
+
+def _command_serve(args) -> int:
+    if not os.getenv('GROQ_API_KEY') and not (args.endpoints or args.cascade):
+        print("Error: GROQ_API_KEY environment variable not set")
+        return 1
+    
+    from service import SummaryService, serve
+    
+    try:
+        service = SummaryService(_build_summarizer(args, os.getenv('GROQ_API_KEY')), max_batch=args.max_batch,
+                                 window_seconds=args.batch_window_ms / 1000, timeout=args.timeout)
+        service.warm()
+        serve(service, args.host, args.port, args.socket)
+        return 0
+    except Exception as e:
+        logger.error(f"Service failed: {e}")
+        print(f"Error: {e}")
+        return 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Parse the command line and run the chosen command.
+    
+    Returns:
+        int: Process exit code
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Without a command behave like "run", so "--resume" and "--stream" keep working
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv.insert(0, 'run')
+    args = build_parser().parse_args(argv)
+    
+    from company_summarizer import configure_logging
+    configure_logging(args.log_level)
+    
+    if args.command == 'validate':
+        return _command_validate(args)
+    if args.command == 'estimate':
+        return _command_estimate(args)
+    if args.command == 'simulate':
+        return _command_simulate(args)
+    if args.command == 'lookup':
+        return _command_lookup(args)
+    if args.command == 'serve':
+        return _command_serve(args)
+    if args.command == 'watch':
+        return _command_watch(args)
+    return _command_run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
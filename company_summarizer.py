@@ -1,56 +1,312 @@
-#!/usr/bin/env python3
 """
-Company Summarizer Script
+Company Summarizer
 
-This script reads company names from a Google Sheet, uses OpenAI's GPT API to generate
-summaries of what each company does, and outputs the results to a new tab in the same sheet.
+CompanySummarizer reads company names from a Google Sheet (or a local file),
+asks an LLM for a summary of what each company does, and writes the results
+to a new tab in the same sheet. The command line lives in cli.py; running
+this module directly still works and hands over to it.
 
 Author: Robi Dany Riupassa (Assisted by forge code assistant)
 Date: 2025-08-05
 """
 
-import os
-import time
+import sys
+import hashlib
 import logging
-from typing import List, Dict, Optional
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
-from openai import OpenAI
-from groq import Groq
+from typing import TYPE_CHECKING, Callable, ContextManager, List, Dict, Iterator, Optional, Tuple, Union
 import json
-from datetime import datetime
-from dotenv import load_dotenv
-load_dotenv()
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+# Groq, gspread, google-auth and python-dotenv, and the feature modules only
+# some runs use (sharding, routing, tracing), are imported where they are
+# first needed, so importing this module stays fast
+from rate_limiter import RateLimiter
+from summary_cache import SummaryCache, make_cache_key
+from run_journal import RunJournal, row_fingerprint
+from sheet_writer import SheetWriter, WRITE_MODES, row_key
+from canonicalize import group_duplicates
+from metrics import RunMetrics
+from data_sources import CompanySource, ResultSink, file_format, open_source, open_sink
+from prompts import CompletionBudget, compile_template, count_message_tokens, count_tokens
+from retry import CircuitBreaker, RetryPolicy, RetryQueue
+from results import OUTPUT_HEADERS, ResultStore
+
+if TYPE_CHECKING:
+    from cascade import ModelCascade
+    from provider_router import Completion, ProviderRouter
+    from simulator import LatencyTrace
+    from summary_index import SummaryIndex
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('company_summarizer.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = "llama3-8b-8192"
+
+SYSTEM_PROMPT = "You are a business analyst providing accurate, concise company summaries based on publicly available information. Always be factual and professional."
+
+# Carefully designed prompt for reliable and consistent responses. The company
+# details come last, so everything before them is a static prefix shared by
+# every request (see prompts.compile_template).
+PROMPT_TEMPLATE = compile_template("""
+        Please provide a concise, professional summary of what the company below does as a business.
+        
+        Your response should:
+        1. Be 2-3 sentences maximum
+        2. Focus on their primary business activities and services
+        3. Be factual and based on publicly available information
+        4. Use professional, business-appropriate language
+        5. Avoid speculation or unverified claims
+        
+        Format your response as a single paragraph without any prefixes like "Summary:" or bullet points.
+        
+        If you cannot find reliable information about this company, respond with: "Information about this company's business activities is not readily available in public sources."
+        
+        Company: {company_name}
+        Website: {website}
+        """)
+
+# Packs several companies into one request; uses the same rules as PROMPT_TEMPLATE
+BATCH_PROMPT_TEMPLATE = compile_template("""
+        Please provide a concise, professional summary of what each of the companies below does as a business.
+        
+        Each summary should:
+        1. Be 2-3 sentences maximum
+        2. Focus on the company's primary business activities and services
+        3. Be factual and based on publicly available information
+        4. Use professional, business-appropriate language
+        5. Avoid speculation or unverified claims
+        
+        Write each summary as a single paragraph without any prefixes like "Summary:" or bullet points.
+        
+        If you cannot find reliable information about a company, use this summary for it: "Information about this company's business activities is not readily available in public sources."
+        
+        Respond with only a JSON array containing one object per company, in the form [{{"id": 1, "summary": "..."}}], using the id given for each company.
+        
+        Companies (one JSON object per line):
+        {companies}
+        """)
+
+# Request latency assumed by estimates before any request was measured
+ASSUMED_LATENCY_SECONDS = 1.0
+
+# Input columns the pipeline reads; the layout of the output tab is results.OUTPUT_HEADERS
+INPUT_COLUMNS = ['Company Name', 'Website', 'Source']
+HEADER_FORMAT = {
+    "backgroundColor": {"red": 0.2, "green": 0.6, "blue": 0.8},
+    "textFormat": {"bold": True, "foregroundColor": {"red": 1, "green": 1, "blue": 1}}
+}
+
+# Status column values; failed rows keep an empty summary and can be re-run with retry-failed
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+
+# Identifies the prompt in cache keys, so editing the prompt invalidates old summaries
+PROMPT_HASH = hashlib.sha256((SYSTEM_PROMPT + PROMPT_TEMPLATE.text).encode('utf-8')).hexdigest()[:16]
+
+
+def configure_logging(level: str = 'INFO', log_file: Optional[str] = 'company_summarizer.log'):
+    """
+    Log to the console and to ``log_file``.
+    
+    Called by the command-line entry points; importing this module leaves
+    logging configuration to the application.
+    """
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file))
+    logging.basicConfig(
+        level=getattr(logging, str(level).upper(), logging.INFO),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+
+def _build_messages(prompt: str) -> List[Dict]:
+    """Chat messages for a user prompt, preceded by the system prompt."""
+    return [
+        {
+            "role": "system", 
+            "content": SYSTEM_PROMPT
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+
+def prompt_overhead_tokens() -> Tuple[int, int, int]:
+    """
+    Prompt tokens a request pays for apart from its companies' names and websites.
+    
+    Returns:
+        Tuple[int, int, int]: Tokens sent once per single-company request and once
+            per batched request (system prompt, template instructions, chat format),
+            and how many more tokens a company's batch entry takes than the
+            labels around it in a single-company prompt
+    """
+    single = count_message_tokens(_build_messages(PROMPT_TEMPLATE.static_prefix))
+    batched = count_message_tokens(_build_messages(BATCH_PROMPT_TEMPLATE.static_prefix))
+    empty = {'Company Name': '', 'Website': ''}
+    labels = count_tokens(PROMPT_TEMPLATE.format(company_name='', website='')) - PROMPT_TEMPLATE.prefix_tokens
+    entry = count_tokens(_batch_prompt([empty, empty])) - count_tokens(_batch_prompt([empty]))
+    return single, batched, entry - labels
+
+
+def _batch_prompt(companies: List[Dict]) -> str:
+    """Build the batched prompt for several companies; row IDs count from 1."""
+    entries = [
+        {
+            'id': row_id,
+            'company': company.get('Company Name', 'Unknown Company'),
+            'website': company.get('Website', '')
+        }
+        for row_id, company in enumerate(companies, 1)
+    ]
+    return BATCH_PROMPT_TEMPLATE.format(
+        companies='\n'.join(json.dumps(entry, ensure_ascii=False) for entry in entries)
+    )
+
+
+def _column_letter(column: int) -> str:
+    """Convert a 1-based column number to its A1 letter (1 -> A, 27 -> AA)."""
+    letters = ''
+    while column > 0:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def _parse_batch_response(content: str, expected: int) -> Dict[int, str]:
+    """
+    Extract per-row summaries from a batched JSON response.
+    
+    Tolerates Markdown code fences and text around the array. Entries with an
+    unknown or duplicate ID, or an empty summary, are dropped so the
+    caller can fall back to single requests for them.
+    
+    Args:
+        content (str): Raw response text
+        expected (int): Number of rows in the batch (IDs 1..expected)
+        
+    Returns:
+        Dict[int, str]: Summary per row ID
+    """
+    start, end = content.find('['), content.rfind(']')
+    if start == -1 or end < start:
+        logger.warning("Batch response did not contain a JSON array")
+        return {}
+    
+    try:
+        items = json.loads(content[start:end + 1])
+    except ValueError as e:
+        logger.warning(f"Batch response was not valid JSON: {e}")
+        return {}
+    
+    summaries = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        row_id, summary = item.get('id'), item.get('summary')
+        if isinstance(row_id, str) and row_id.isdigit():
+            row_id = int(row_id)
+        if not isinstance(row_id, int) or not 1 <= row_id <= expected or row_id in summaries:
+            continue
+        if not isinstance(summary, str) or not summary.strip():
+            continue
+        summaries[row_id] = summary.strip()
+    return summaries
+
 
 class CompanySummarizer:
     """
     A class to handle company data processing from Google Sheets using OpenAI API.
     """
     
-    def __init__(self, credentials_path: str, groq_api_key: str):
+    def __init__(self, credentials_path: str, groq_api_key: str, max_workers: int = 4,
+                 rate_limiter: Optional[RateLimiter] = None, max_rate_limit_retries: int = 3,
+                 cache: Optional[SummaryCache] = None, batch_size: int = 1, dedupe: bool = True,
+                 llm_client=None, sheets_client=None, metrics: Optional[RunMetrics] = None,
+                 request_slot: Optional[Callable[[], ContextManager]] = None,
+                 router: Optional['ProviderRouter'] = None,
+                 completion_budget: Optional[CompletionBudget] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 cascade: Optional['ModelCascade'] = None,
+                 trace: Optional['LatencyTrace'] = None,
+                 index: Optional['SummaryIndex'] = None):
         """
         Initialize the CompanySummarizer with necessary credentials.
         
         Args:
             credentials_path (str): Path to Google Service Account credentials JSON file
-            openai_api_key (str): OpenAI API key
+            groq_api_key (str): Groq API key
+            max_workers (int): Maximum number of summary requests kept in flight at once
+            rate_limiter (Optional[RateLimiter]): Limiter shared by all summary calls;
+                built from the GROQ_*_PER_MINUTE environment variables if omitted
+            max_rate_limit_retries (int): How often a call is retried after a 429
+            cache (Optional[SummaryCache]): Persistent summary cache checked before each API call
+            batch_size (int): Number of companies packed into each API request
+            dedupe (bool): Summarize duplicate companies (matched by canonical name
+                and website domain) once and reuse the summary for every row
+            llm_client: Chat-completions client to use instead of building a Groq
+                client, e.g. one pointed at a local stand-in server
+            sheets_client: gspread-compatible client to use instead of authenticating
+                with the service account, e.g. an in-memory fake. Without one, the
+                service account is only authenticated once a spreadsheet is used
+            metrics (Optional[RunMetrics]): Collector for stage timings, LLM latency,
+                token usage, throttling and error counts
+            request_slot (Optional[Callable[[], ContextManager]]): Returns a context
+                manager held around every API request, e.g. a slot from a scheduler
+                shared by several summarizers (see job_runner.FairShareScheduler)
+            router (Optional[ProviderRouter]): Routes requests across several
+                providers/keys/models; without one every request goes to Groq
+                (``MODEL_NAME``) through ``rate_limiter``. Not used with a cascade
+            completion_budget (Optional[CompletionBudget]): Sets ``max_tokens`` per
+                request from the completion sizes seen so far
+            retry_policy (Optional[RetryPolicy]): Backoff and retry count for rows whose
+                request failed; built from the RETRY_* environment variables if omitted
+            circuit_breaker (Optional[CircuitBreaker]): Pauses dispatch while the provider
+                error rate is high; may be shared by several summarizers. Built from the
+                CIRCUIT_* environment variables if omitted
+            cascade (Optional[ModelCascade]): Model tiers for single-company requests;
+                an answer that fails validation escalates to the next tier. Batched
+                requests go to the first tier (holding one of its slots and counted
+                in its stats), and batch entries that fail validation fall back to
+                the cascade
+            trace (Optional[LatencyTrace]): Records every request's latency, tokens and
+                429s for the simulator; built from LATENCY_TRACE_PATH if omitted
+            index (Optional[SummaryIndex]): Local index every written summary is
+                also added to, for lookups without going through the Sheets API
         """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        
         self.credentials_path = credentials_path
-        self.groq_client = Groq(api_key=groq_api_key)
-        self.gc = None
+        self.groq_api_key = groq_api_key
+        self._groq_client = llm_client
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.cache = cache
+        self.batch_size = batch_size
+        self.dedupe = dedupe
+        self.metrics = metrics or RunMetrics()
+        self.request_slot = request_slot or nullcontext
+        self.cascade = cascade
+        # With a cascade, its first tier takes the requests ``router`` would get
+        self._router = cascade.tiers[0].router if cascade else router
+        # Summaries from a cascade are cached apart from single-model ones
+        self.cache_model = cascade.key if cascade else MODEL_NAME
+        self.completion_budget = completion_budget or CompletionBudget()
+        self.retry_policy = retry_policy or RetryPolicy.from_env()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker.from_env()
+        if trace is None:
+            from simulator import LatencyTrace
+            trace = LatencyTrace.from_env()
+        self.trace = trace
+        self.index = index
+        self._gc = sheets_client
+        self._client_lock = threading.Lock()
         self.spreadsheet = None
         
         # Define the scope for Google Sheets and Drive APIs
@@ -58,17 +314,49 @@ class CompanySummarizer:
             'https://spreadsheets.google.com/feeds',
             'https://www.googleapis.com/auth/drive'
         ]
-        
-        self._authenticate_google_sheets()
+    
+    @property
+    def groq_client(self):
+        """Groq client, created on first use."""
+        with self._client_lock:
+            if self._groq_client is None:
+                from groq import Groq
+                from transport import llm_http_client
+                # The SDK's own retries would hide 429s from the rate limiter;
+                # the pooled HTTP client is shared with every other summarizer
+                self._groq_client = Groq(api_key=self.groq_api_key, max_retries=0, http_client=llm_http_client())
+            return self._groq_client
+    
+    @property
+    def router(self) -> 'ProviderRouter':
+        """Provider router; a single Groq endpoint unless one was passed in."""
+        with self._client_lock:
+            if self._router is None:
+                from provider_router import Endpoint, ProviderRouter
+                self._router = ProviderRouter([
+                    Endpoint('groq', MODEL_NAME, lambda: self.groq_client, rate_limiter=self.rate_limiter)
+                ])
+            return self._router
+    
+    @property
+    def gc(self):
+        """gspread client, authenticated on first use so file-only runs never touch Google."""
+        with self._client_lock:
+            if self._gc is None:
+                self._authenticate_google_sheets()
+            return self._gc
     
     def _authenticate_google_sheets(self):
-        """Authenticate with Google Sheets API using service account credentials."""
+        """
+        Authenticate with Google Sheets API using service account credentials.
+        
+        The client, its connection pool and access token are shared with every
+        summarizer in the process using the same credentials (see transport.py).
+        """
+        from transport import TokenCache, shared_sheets_client
+        
         try:
-            creds = Credentials.from_service_account_file(
-                self.credentials_path, 
-                scopes=self.scope
-            )
-            self.gc = gspread.authorize(creds)
+            self._gc = shared_sheets_client(self.credentials_path, self.scope, token_cache=TokenCache.from_env())
             logger.info("Successfully authenticated with Google Sheets API")
         except Exception as e:
             logger.error(f"Failed to authenticate with Google Sheets API: {e}")
@@ -145,8 +433,9 @@ class CompanySummarizer:
             List[Dict]: List of company data dictionaries
         """
         try:
-            worksheet = self.spreadsheet.worksheet(worksheet_name)
-            data = worksheet.get_all_records()
+            with self.metrics.stage('read'):
+                worksheet = self.spreadsheet.worksheet(worksheet_name)
+                data = worksheet.get_all_records()
             
             logger.info(f"Read {len(data)} companies from {worksheet_name}")
             return data
@@ -155,158 +444,840 @@ class CompanySummarizer:
             logger.error(f"Failed to read companies from {worksheet_name}: {e}")
             raise
     
+    def iter_companies(self, worksheet_name: str = "data", chunk_size: int = 500,
+                       start_row: int = 0) -> Iterator[List[Dict]]:
+        """
+        Read company data in fixed-size chunks, fetching only the input columns.
+        
+        Each chunk costs one batch_get call covering ``chunk_size`` sheet rows of
+        the Company Name, Website and Source columns, so memory stays flat no
+        matter how large the sheet is. Blank rows are skipped, and reading stops
+        at the first chunk with no data.
+        
+        Args:
+            worksheet_name (str): Name of the worksheet to read from
+            chunk_size (int): Number of sheet rows fetched per request
+            start_row (int): Number of (non-blank) companies to skip first
+            
+        Yields:
+            List[Dict]: Company data dictionaries for the next chunk
+        """
+        with self.metrics.stage('read'):
+            worksheet = self.spreadsheet.worksheet(worksheet_name)
+            columns = self._input_columns(worksheet)
+        
+        to_skip = start_row
+        for first in range(2, worksheet.row_count + 1, chunk_size):
+            last = min(first + chunk_size - 1, worksheet.row_count)
+            chunk = [company for _, company in self._read_rows(worksheet, columns, first, last)]
+            
+            if not chunk:
+                break
+            if to_skip >= len(chunk):
+                to_skip -= len(chunk)
+                continue
+            
+            chunk, to_skip = chunk[to_skip:], 0
+            logger.debug(f"Read rows {first}-{last} from {worksheet_name}")
+            yield chunk
+    
+    def read_row_range(self, worksheet_name: str, first_row: int, last_row: int) -> List[Tuple[int, Dict]]:
+        """
+        Read the input columns of a range of sheet rows.
+        
+        Args:
+            worksheet_name (str): Name of the worksheet to read from
+            first_row (int): First sheet row (1-based; row 1 is the header)
+            last_row (int): Last sheet row, inclusive
+            
+        Returns:
+            List[Tuple[int, Dict]]: (sheet row number, company) for each non-blank row
+        """
+        with self.metrics.stage('read'):
+            worksheet = self.spreadsheet.worksheet(worksheet_name)
+            columns = self._input_columns(worksheet)
+            return self._read_rows(worksheet, columns, first_row, last_row)
+    
+    @staticmethod
+    def _input_columns(worksheet) -> List[Tuple[str, int]]:
+        """Locate the input columns in the header row as (name, 1-based column) pairs."""
+        header = worksheet.row_values(1)
+        columns = [(name, header.index(name) + 1) for name in INPUT_COLUMNS if name in header]
+        if not any(name == 'Company Name' for name, _ in columns):
+            raise ValueError(f"Worksheet {worksheet.title} has no 'Company Name' column")
+        return columns
+    
+    def _read_rows(self, worksheet, columns: List[Tuple[str, int]], first: int, last: int) -> List[Tuple[int, Dict]]:
+        """Fetch rows ``first``..``last`` of the given columns in one batch_get call, skipping blank rows."""
+        ranges = [f"{_column_letter(col)}{first}:{_column_letter(col)}{last}" for _, col in columns]
+        with self.metrics.stage('read'):
+            column_values = worksheet.batch_get(ranges)
+        
+        rows = []
+        for offset in range(last - first + 1):
+            company = {}
+            for (name, _), values in zip(columns, column_values):
+                cells = values[offset] if offset < len(values) else []
+                company[name] = cells[0] if cells else ''
+            if any(company.values()):
+                rows.append((first + offset, company))
+        return rows
+    
+    def cached_summary(self, company_data: Dict) -> Optional[str]:
+        """
+        Look a company up in the summary cache without calling the API.
+        
+        Args:
+            company_data (Dict): Dictionary containing company information
+            
+        Returns:
+            Optional[str]: The cached summary, or None on a miss or without a cache
+        """
+        if self.cache is None:
+            return None
+        summary = self.cache.get(make_cache_key(company_data.get('Company Name', 'Unknown Company'),
+                                                company_data.get('Website', ''), self.cache_model, PROMPT_HASH))
+        if summary is not None:
+            self.metrics.increment('cache_hits')
+        return summary
+    
     def generate_company_summary(self, company_data: Dict) -> str:
         """
-        Generate a summary for a company using OpenAI GPT API.
+        Generate a summary for a company using the Groq API.
         
         Args:
             company_data (Dict): Dictionary containing company information
             
         Returns:
             str: Generated company summary
+            
+        Raises:
+            Exception: If the request failed on every endpoint; the caller decides
+                whether to retry (see _summarize_companies)
+        """
+        return self._generate_company_summary(company_data)[0]
+    
+    def _generate_company_summary(self, company_data: Dict) -> Tuple[str, str]:
+        """
+        generate_company_summary, also returning the model that wrote the summary.
+        
+        A cached summary is attributed to ``cache_model``, the model (or
+        cascade) its cache key was made for.
         """
         company_name = company_data.get('Company Name', 'Unknown Company')
         website = company_data.get('Website', '')
         
-        # Carefully designed prompt for reliable and consistent responses
-        prompt = f"""
-        Please provide a concise, professional summary of what {company_name} does as a business. 
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(company_name, website, self.cache_model, PROMPT_HASH)
+            cached_summary = self.cache.get(cache_key)
+            if cached_summary is not None:
+                self.metrics.increment('cache_hits')
+                logger.debug(f"Cache hit for {company_name}")
+                return cached_summary, self.cache_model
+            self.metrics.increment('cache_misses')
         
-        Company: {company_name}
-        Website: {website}
+        prompt = PROMPT_TEMPLATE.format(company_name=company_name, website=website)
         
-        Your response should:
-        1. Be 2-3 sentences maximum
-        2. Focus on their primary business activities and services
-        3. Be factual and based on publicly available information
-        4. Use professional, business-appropriate language
-        5. Avoid speculation or unverified claims
+        completion = self._create_completion(prompt, max_tokens=self.completion_budget.max_tokens(),
+                                             description=company_name)
+        summary = completion.content
+        logger.debug(f"Generated summary for {company_name}")
         
-        Format your response as a single paragraph without any prefixes like "Summary:" or bullet points.
+        if cache_key is not None:
+            self.cache.put(cache_key, summary)
         
-        If you cannot find reliable information about this company, respond with: "Information about this company's business activities is not readily available in public sources."
+        return summary, completion.model
+    
+    def generate_batch_summaries(self, companies: List[Dict]) -> List[Optional[str]]:
         """
+        Generate summaries for several companies with a single API request.
         
-        try:
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a business analyst providing accurate, concise company summaries based on publicly available information. Always be factual and professional."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=150,
-                temperature=0.3  # Lower temperature for more consistent, factual responses
-            )
+        The companies are packed into one prompt that asks for a JSON array of
+        summaries keyed by row ID. Entries that are missing or malformed in the
+        response fall back to individual generate_company_summary calls.
+        
+        Args:
+            companies (List[Dict]): Company data dictionaries
             
-            summary = response.choices[0].message.content.strip()
-            logger.info(f"Generated summary for {company_name}")
+        Returns:
+            List[Optional[str]]: Summaries in the same order as ``companies``;
+                None for companies whose single request failed too
+        """
+        return self._generate_batch_summaries(companies)[0]
+    
+    def _generate_batch_summaries(self, companies: List[Dict]) -> Tuple[List[Optional[str]], List[str]]:
+        """generate_batch_summaries, also returning the model that wrote each summary ('' if it failed)."""
+        summaries: List[Optional[str]] = [None] * len(companies)
+        models = [''] * len(companies)
+        cache_keys = [None] * len(companies)
+        
+        if self.cache is not None:
+            for i, company in enumerate(companies):
+                cache_keys[i] = make_cache_key(
+                    company.get('Company Name', 'Unknown Company'), company.get('Website', ''),
+                    self.cache_model, PROMPT_HASH
+                )
+                summaries[i] = self.cache.get(cache_keys[i])
+                if summaries[i] is not None:
+                    models[i] = self.cache_model
+                self.metrics.increment('cache_hits' if summaries[i] is not None else 'cache_misses')
+        
+        pending = [i for i, summary in enumerate(summaries) if summary is None]
+        if len(pending) > 1:
+            prompt = _batch_prompt([companies[i] for i in pending])
+            description = f"batch of {len(pending)} companies"
             
-            # Add a small delay to respect API rate limits
-            time.sleep(0.5)
+            model = ''
+            try:
+                completion = self._create_completion(
+                    prompt,
+                    max_tokens=self.completion_budget.max_tokens(len(pending)),
+                    description=description,
+                    companies=len(pending)
+                )
+                model = completion.model
+                parsed = _parse_batch_response(completion.content, len(pending))
+                if self.cascade is not None:
+                    parsed = {row_id: summary for row_id, summary in parsed.items()
+                              if self.cascade.accept(summary)}
+            except Exception as e:
+                logger.error(f"Failed to generate summaries for {description}: {e}")
+                parsed = {}
             
-            return summary
+            for row_id, i in enumerate(pending, 1):
+                if row_id in parsed:
+                    summaries[i] = parsed[row_id]
+                    models[i] = model
+                    if cache_keys[i] is not None:
+                        self.cache.put(cache_keys[i], parsed[row_id])
             
+            missing = len(pending) - len(parsed)
+            logger.debug(f"Generated {len(parsed)} summaries in one request for {description}"
+                        + (f", {missing} falling back to single requests" if missing else ""))
+        
+        # Anything the batch didn't cover goes through the single-company path
+        for i, summary in enumerate(summaries):
+            if summary is None:
+                try:
+                    summaries[i], models[i] = self._generate_company_summary(companies[i])
+                except Exception as e:
+                    logger.warning(f"Failed to generate summary for "
+                                   f"{companies[i].get('Company Name', 'Unknown Company')}: {e}")
+        
+        return summaries, models
+    
+    def _create_completion(self, prompt: str, max_tokens: int, description: str, companies: int = 1) -> 'Completion':
+        """
+        Send one chat completion through the provider router.
+        
+        429 responses are retried up to ``max_rate_limit_retries`` times and
+        other errors fail over to another endpoint, if the router has one
+        (see ProviderRouter.complete). With a cascade, a single-company answer
+        that fails validation moves up to the next tier (see cascade.ModelCascade).
+        While the circuit breaker is open the request waits for it. A reply cut off at ``max_tokens`` is requested
+        again once with the completion budget's ceiling.
+        
+        Args:
+            prompt (str): User message content
+            max_tokens (int): Completion token limit
+            description (str): What the request is for, used in log messages
+            companies (int): Companies the request covers, for the completion budget
+            
+        Returns:
+            Completion: The answer; ``content`` is the stripped response text and
+                ``model`` the model that wrote it
+        """
+        messages = _build_messages(prompt)
+        reserved_tokens = count_message_tokens(messages) + max_tokens
+        
+        # Single-company requests climb the cascade; batches go to its first tier
+        if self.cascade is None:
+            complete = self.router.complete
+        else:
+            complete = self.cascade.complete if companies == 1 else self.cascade.complete_batch
+        
+        self.metrics.record_throttle(self.circuit_breaker.before_request())
+        try:
+            completion = complete(
+                messages,
+                max_tokens,
+                reserved_tokens,
+                description=description,
+                max_retries=self.max_rate_limit_retries,
+                request_slot=self.request_slot
+            )
         except Exception as e:
-            logger.error(f"Failed to generate summary for {company_name}: {e}")
-            return f"Error generating summary: {str(e)}"
+            if self.circuit_breaker.record_failure():
+                self.metrics.increment('circuit_opens')
+            if self.trace is not None:
+                rate_limited = getattr(e, 'status_code', None) == 429
+                self.trace.record(companies, rate_limited=self.max_rate_limit_retries if rate_limited else 0,
+                                  error='rate_limited' if rate_limited else 'error')
+            raise
+        self.circuit_breaker.record_success()
+        if self.trace is not None:
+            self.trace.record(companies, completion.latency, completion.prompt_tokens, completion.completion_tokens,
+                              rate_limited=completion.retries, throttled=completion.throttled)
+        
+        for rejected in completion.escalated:
+            self.metrics.record_throttle(rejected.throttled)
+            self.metrics.record_llm_call(rejected.latency, prompt_tokens=rejected.prompt_tokens,
+                                         completion_tokens=rejected.completion_tokens)
+        self.metrics.increment('escalations', len(completion.escalated))
+        self.metrics.record_throttle(completion.throttled)
+        self.metrics.increment('retries', completion.retries)
+        if completion.hedged:
+            self.metrics.increment('hedges')
+        self.metrics.record_llm_call(
+            completion.latency,
+            prompt_tokens=completion.prompt_tokens,
+            completion_tokens=completion.completion_tokens
+        )
+        self.completion_budget.observe(completion.completion_tokens, companies)
+        
+        if completion.finish_reason == 'length':
+            ceiling = self.completion_budget.max_tokens(companies, per_company=self.completion_budget.ceiling)
+            if max_tokens < ceiling:
+                logger.info(f"Reply for {description} was cut off at {max_tokens} tokens, retrying with {ceiling}")
+                return self._create_completion(prompt, ceiling, description, companies)
+        return completion
     
-    def process_companies(self, input_worksheet: str = "data") -> List[Dict]:
+    def estimate_run(self, companies: List[Dict], latency: float = ASSUMED_LATENCY_SECONDS) -> Dict:
+        """
+        Estimate what summarizing ``companies`` will cost, without calling the API.
+        
+        Duplicates and cached summaries are skipped just like in a real run,
+        prompts are built exactly as they would be sent, and completion sizes
+        come from the completion budget.
+        
+        Args:
+            companies (List[Dict]): Company rows as returned by read_companies
+            latency (float): Seconds per request assumed until the router has measured one
+            
+        Returns:
+            Dict: Row, distinct-company and cache counts, API requests, estimated
+                prompt tokens (and how many of them are the shared static prefix),
+                completion token budget and expected completion tokens, cost in
+                USD (None if the model's prices are unknown), the minimum run
+                time in minutes allowed by the rate limits and the estimated run
+                time once concurrency and latency are taken into account
+        """
+        if self.dedupe:
+            representatives = [companies[group[0]] for group in group_duplicates(companies)]
+        else:
+            representatives = list(companies)
+        
+        uncached = []
+        for company in representatives:
+            key = make_cache_key(company.get('Company Name', 'Unknown Company'), company.get('Website', ''),
+                                 self.cache_model, PROMPT_HASH)
+            if self.cache is None or not self.cache.contains(key):
+                uncached.append(company)
+        
+        system_tokens = count_tokens(SYSTEM_PROMPT)
+        requests = prompt_tokens = prefix_tokens = completion_tokens = expected_tokens = 0
+        for start in range(0, len(uncached), self.batch_size):
+            batch = uncached[start:start + self.batch_size]
+            if len(batch) == 1:
+                template = PROMPT_TEMPLATE
+                prompt = PROMPT_TEMPLATE.format(company_name=batch[0].get('Company Name', 'Unknown Company'),
+                                                website=batch[0].get('Website', ''))
+            else:
+                template = BATCH_PROMPT_TEMPLATE
+                prompt = _batch_prompt(batch)
+            requests += 1
+            prompt_tokens += count_message_tokens(_build_messages(prompt))
+            prefix_tokens += system_tokens + template.prefix_tokens
+            completion_tokens += self.completion_budget.max_tokens(len(batch))
+            expected_tokens += self.completion_budget.expected_tokens(len(batch))
+        
+        # Requests spread over every endpoint the router has. Unused completion
+        # budget is refunded to the limiters, so expected tokens set the pace
+        endpoints = self.router.endpoints
+        rate_minutes = max(requests / sum(endpoint.rate_limiter.requests.per_minute for endpoint in endpoints),
+                           (prompt_tokens + expected_tokens)
+                           / sum(endpoint.rate_limiter.tokens.per_minute for endpoint in endpoints))
+        latency = endpoints[0].latency_ewma or latency
+        concurrency_minutes = requests * latency / self.max_workers / 60
+        cost = endpoints[0].cost(prompt_tokens, expected_tokens)
+        return {
+            'rows': len(companies),
+            'distinct_companies': len(representatives),
+            'cached': len(representatives) - len(uncached),
+            'cache_hit_rate': round(1 - len(uncached) / len(representatives), 3) if representatives else 0.0,
+            'requests': requests,
+            'prompt_tokens': prompt_tokens,
+            'static_prefix_tokens': prefix_tokens,
+            'max_completion_tokens': completion_tokens,
+            'expected_completion_tokens': expected_tokens,
+            'estimated_cost_usd': round(cost, 4) if cost is not None else None,
+            'model': endpoints[0].model,
+            'min_minutes': round(rate_minutes, 2),
+            'estimated_minutes': round(max(rate_minutes, concurrency_minutes), 2)
+        }
+    
+    def process_companies(self, input_worksheet: str = "data",
+                          journal: Optional[RunJournal] = None) -> ResultStore:
         """
         Process all companies and generate summaries.
         
         Args:
             input_worksheet (str): Name of the input worksheet
+            journal (Optional[RunJournal]): Progress journal; rows it already holds
+                successful results for are skipped, and new results are appended
             
         Returns:
-            List[Dict]: List of companies with their summaries
+            ResultStore: The companies with their summaries, in input order
         """
         companies = self.read_companies(input_worksheet)
-        results = []
         
-        logger.info(f"Starting to process {len(companies)} companies...")
+        logger.info(f"Starting to process {len(companies)} companies "
+                    f"({self.max_workers} requests in flight, {self.batch_size} per request)...")
+        
+        with self.metrics.stage('summarize'):
+            results = self._summarize_companies(companies, journal)
+        
+        logger.info("Completed processing all companies")
+        if self.cache is not None:
+            stats = self.cache.stats()
+            logger.info(f"Summary cache: {stats['hits']} hits, {stats['misses']} misses "
+                        f"({stats['hit_rate']:.0%} hit rate, {stats['entries']} entries)")
+        return results
+    
+    def _summarize_companies(self, companies: List[Dict],
+                             journal: Optional[RunJournal] = None) -> ResultStore:
+        """
+        Generate summaries for a list of companies, preserving input order.
+        
+        Up to ``max_workers`` requests are in flight concurrently, each covering
+        ``batch_size`` companies; the Groq client is thread-safe, so the pool
+        shares a single client. With ``dedupe`` enabled, rows that refer to the
+        same company (see canonicalize.group_duplicates) are summarized once.
+        Companies whose request fails are queued and retried after the main
+        pass with jittered exponential backoff (see retry.RetryQueue); rows that
+        still fail get Status ``failed`` and an empty summary. Results are
+        written straight into a columnar ResultStore, with one Processed Date
+        per request.
+        
+        Args:
+            companies (List[Dict]): Company rows as returned by read_companies
+            journal (Optional[RunJournal]): Progress journal to resume from and append to
+            
+        Returns:
+            ResultStore: Result rows in the same order as ``companies``
+        """
+        total = len(companies)
+        results = ResultStore(total)
+        fingerprints = [row_fingerprint(company) for company in companies]
+        
+        if journal is not None:
+            for index, entry in journal.load().items():
+                if index < total and entry.get('ok') and entry.get('fingerprint') == fingerprints[index]:
+                    results.set_result(index, entry['result'])
+        
+        pending = [index for index in range(total) if not results.filled(index)]
+        if len(pending) < total:
+            self.metrics.increment('rows_resumed', total - len(pending))
+            logger.info(f"Resuming: {total - len(pending)} rows already done, {len(pending)} to process")
+        
+        # One summary per distinct company; duplicates share their representative's summary
+        if self.dedupe:
+            groups = [[pending[i] for i in group] for group in group_duplicates([companies[i] for i in pending])]
+        else:
+            groups = [[index] for index in pending]
+        members = {group[0]: group for group in groups}
+        representatives = [group[0] for group in groups]
+        if len(representatives) < len(pending):
+            self.metrics.increment('rows_deduplicated', len(pending) - len(representatives))
+            logger.info(f"Deduplicated {len(pending)} rows to {len(representatives)} distinct companies")
         
-        for i, company in enumerate(companies, 1):
-            logger.info(f"Processing company {i}/{len(companies)}: {company.get('Company Name', 'Unknown')}")
+        # Per-row progress is logged at debug level; at info level only about every 5%
+        progress = {'done': 0}
+        progress_lock = threading.Lock()
+        progress_every = max(1, len(pending) // 20)
+        
+        def report_progress(count):
+            self.metrics.increment('rows', count)
+            with progress_lock:
+                before = progress['done']
+                progress['done'] += count
+                done = progress['done']
+            if done // progress_every > before // progress_every or done == len(pending):
+                logger.info(f"Processed {done}/{len(pending)} companies")
+        
+        # Representatives whose request failed are retried after the main pass
+        failures = RetryQueue(self.retry_policy)
+        
+        def summarize(batch, retries=0):
+            batch_companies = [companies[index] for index in batch]
+            for index in batch:
+                logger.debug(f"Processing company {index + 1}/{total}: {companies[index].get('Company Name', 'Unknown')}")
             
-            summary = self.generate_company_summary(company)
+            if len(batch) == 1:
+                try:
+                    summary, model = self._generate_company_summary(batch_companies[0])
+                    summaries, models = [summary], [model]
+                except Exception as e:
+                    logger.warning(f"Failed to generate summary for "
+                                   f"{batch_companies[0].get('Company Name', 'Unknown Company')}: {e}")
+                    summaries, models = [None], ['']
+            else:
+                summaries, models = self._generate_batch_summaries(batch_companies)
             
-            result = {
-                'Company Name': company.get('Company Name', ''),
-                'Website': company.get('Website', ''),
-                'Source': company.get('Source', ''),
-                'Summary': summary,
-                'Processed Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+            stamp = results.stamp()
+            done = 0
+            for representative, summary, model in zip(batch, summaries, models):
+                status = STATUS_OK
+                if summary is None:
+                    if failures.push(representative, retries):
+                        continue
+                    status = STATUS_FAILED
+                    self.metrics.increment('errors')
+                    logger.error(f"Giving up on {companies[representative].get('Company Name', 'Unknown Company')} "
+                                 f"after {retries} retries")
+                for index in members[representative]:
+                    results.set(index, companies[index], summary or '', status, stamp, model)
+                    if journal is not None:
+                        journal.record(index, fingerprints[index], results[index].to_dict(), ok=status == STATUS_OK)
+                    done += 1
+            report_progress(done)
+        
+        def dispatch(work):
+            """Summarize ``(batch, retries)`` pairs, up to ``max_workers`` at a time."""
+            if self.max_workers == 1 or len(work) <= 1:
+                for batch, retries in work:
+                    summarize(batch, retries)
+                return
             
-            results.append(result)
+            executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(work)))
+            futures = [executor.submit(summarize, batch, retries) for batch, retries in work]
+            try:
+                for future in futures:
+                    future.result()
+            finally:
+                # On Ctrl-C or an error, drop queued rows instead of finishing the
+                # whole sheet; completed rows are already in the journal.
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=True)
         
-        logger.info("Completed processing all companies")
+        dispatch([(representatives[i:i + self.batch_size], 0)
+                  for i in range(0, len(representatives), self.batch_size)])
+        
+        # Re-drive failed companies one per request once their backoff has passed
+        for due in failures.drain():
+            self.metrics.increment('rows_retried', len(due))
+            logger.info(f"Retrying {len(due)} failed companies ({len(failures)} more waiting)")
+            dispatch([([representative], retries) for representative, retries in due])
         return results
     
-    def write_summaries_to_sheet(self, summaries: List[Dict], output_worksheet: str = "Company Summaries"):
+    def write_summaries_to_sheet(self, summaries: Union[ResultStore, List[Dict]],
+                                 output_worksheet: str = "Company Summaries", mode: str = "replace"):
         """
         Write the company summaries to a new worksheet.
         
+        Values and header formatting are sent together in batched batchUpdate
+        calls. ``mode`` controls how existing contents are treated:
+        
+        - ``replace``: clear the worksheet and rewrite it
+        - ``append``: add the summaries after the existing rows
+        - ``upsert``: update rows for companies already in the worksheet (only
+          if their data changed) and append new companies
+        
         Args:
-            summaries (List[Dict]): List of company summaries
+            summaries (Union[ResultStore, List[Dict]]): Company summaries, as a
+                ResultStore or as result dictionaries keyed by output header
             output_worksheet (str): Name of the output worksheet
+            mode (str): One of ``replace``, ``append`` or ``upsert``
         """
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Unknown write mode {mode!r}; expected one of {', '.join(WRITE_MODES)}")
+        if not isinstance(summaries, ResultStore):
+            summaries = ResultStore.from_results(summaries)
+        
         try:
-            # Try to get existing worksheet, create if it doesn't exist
-            try:
-                worksheet = self.spreadsheet.worksheet(output_worksheet)
-                worksheet.clear()  # Clear existing data
-            except gspread.WorksheetNotFound:
-                worksheet = self.spreadsheet.add_worksheet(
-                    title=output_worksheet, 
-                    rows=len(summaries) + 10, 
-                    cols=6
-                )
+            with self.metrics.stage('write'):
+                writer, created = self._output_writer(output_worksheet, rows=len(summaries) + 10)
+                rows = summaries.rows()
             
-            # Prepare data for writing
-            headers = ['Company Name', 'Website', 'Source', 'Summary', 'Processed Date']
-            data = [headers]
+                if mode == 'replace' or created:
+                    writer.replace(rows)
+                    logger.info(f"Successfully wrote {len(summaries)} summaries to {output_worksheet}")
+                elif mode == 'append':
+                    writer.append(rows)
+                    logger.info(f"Successfully appended {len(summaries)} summaries to {output_worksheet}")
+                else:
+                    counts = writer.upsert(
+                        rows,
+                        key_column=OUTPUT_HEADERS.index('Company Name'),
+                        domain_column=OUTPUT_HEADERS.index('Website'),
+                        ignore_columns=[OUTPUT_HEADERS.index('Processed Date')]
+                    )
+                    logger.info(f"Upserted summaries to {output_worksheet}: {counts['updated']} updated, "
+                                f"{counts['appended']} appended, {counts['unchanged']} unchanged")
+                
+                logger.debug(f"Write to {output_worksheet} took {writer.api_calls} API calls")
+            self._index_results(summaries, output_worksheet)
             
-            for summary in summaries:
-                row = [
-                    summary.get('Company Name', ''),
-                    summary.get('Website', ''),
-                    summary.get('Source', ''),
-                    summary.get('Summary', ''),
-                    summary.get('Processed Date', '')
-                ]
-                data.append(row)
-            
-            # Write data to worksheet
-            worksheet.update('A1', data)
+        except Exception as e:
+            logger.error(f"Failed to write summaries to sheet: {e}")
+            raise
+    
+    def _index_results(self, results: ResultStore, output: str):
+        """
+        Add the successful rows of ``results`` to the summary index, if there is one.
+        
+        Each row is indexed with the model recorded for it (see
+        ResultStore.set); rows without one get ``cache_model``.
+        
+        Args:
+            results (ResultStore): Rows just written
+            output (str): Output worksheet name or file path they were written to
+        """
+        if self.index is None:
+            return
+        spreadsheet = '' if file_format(output) else getattr(self.spreadsheet, 'url', '')
+        with self.metrics.stage('index'):
+            self.index.add(results, spreadsheet, output, model=self.cache_model, status_ok=STATUS_OK)
+    
+    def _prepare_output_worksheet(self, output_worksheet: str, rows: int):
+        """
+        Get the output worksheet, creating it if it doesn't exist.
+        
+        Args:
+            output_worksheet (str): Name of the output worksheet
+            rows (int): Row count for a newly created worksheet
             
-            # Format the header row
-            worksheet.format('A1:E1', {
-                "backgroundColor": {"red": 0.2, "green": 0.6, "blue": 0.8},
-                "textFormat": {"bold": True, "foregroundColor": {"red": 1, "green": 1, "blue": 1}}
-            })
+        Returns:
+            Tuple[gspread.Worksheet, bool]: The output worksheet, and whether it was just created
+        """
+        import gspread
+        
+        try:
+            return self.spreadsheet.worksheet(output_worksheet), False
+        except gspread.WorksheetNotFound:
+            worksheet = self.spreadsheet.add_worksheet(
+                title=output_worksheet, 
+                rows=rows, 
+                cols=len(OUTPUT_HEADERS) + 1
+            )
+            return worksheet, True
+    
+    def _output_writer(self, output_worksheet: str, rows: int):
+        """
+        Build a SheetWriter for the output worksheet, creating the worksheet if needed.
+        
+        Returns:
+            Tuple[SheetWriter, bool]: The writer, and whether the worksheet was just created
+        """
+        worksheet, created = self._prepare_output_worksheet(output_worksheet, rows)
+        return SheetWriter(self.spreadsheet, worksheet, OUTPUT_HEADERS, HEADER_FORMAT), created
+    
+    def process_companies_streaming(self, input_worksheet: str = "data", output_worksheet: str = "Company Summaries",
+                                    chunk_size: int = 500, resume: bool = False) -> int:
+        """
+        Read, summarize and write companies chunk by chunk.
+        
+        Each chunk of input rows is summarized as soon as it is read and
+        appended to the output worksheet, so memory stays bounded and results
+        show up in the sheet while the run is still going. Because the output
+        tab holds every completed chunk, a resumed run simply skips as many
+        input rows as the output tab already has.
+        
+        Args:
+            input_worksheet (str): Name of the input worksheet
+            output_worksheet (str): Name of the output worksheet
+            chunk_size (int): Number of rows read, summarized and written at a time
+            resume (bool): Continue after the rows already in the output worksheet
             
-            # Auto-resize columns
-            worksheet.columns_auto_resize(0, len(headers))
+        Returns:
+            int: Total number of companies in the output worksheet
+        """
+        writer, _ = self._output_writer(output_worksheet, rows=chunk_size + 10)
+        
+        written = max(0, len(writer.worksheet.col_values(1)) - 1) if resume else 0
+        if written:
+            logger.info(f"Resuming after {written} companies already in {output_worksheet}")
+        else:
+            writer.replace([], auto_resize=False)
+        
+        for chunk in self.iter_companies(input_worksheet, chunk_size, start_row=written):
+            with self.metrics.stage('summarize'):
+                results = self._summarize_companies(chunk)
+            with self.metrics.stage('write'):
+                writer.append(results.rows())
+            self._index_results(results, output_worksheet)
+            written += len(results)
+            logger.info(f"Wrote {written} summaries to {output_worksheet}")
+        
+        with self.metrics.stage('write'):
+            writer.auto_resize()
+        return written
+    
+    def retry_failed_companies(self, input_worksheet: str = "data",
+                               output_worksheet: str = "Company Summaries") -> ResultStore:
+        """
+        Summarize again only the companies marked ``failed`` in the output worksheet.
+        
+        The failed companies are looked up in the input worksheet by name and
+        website domain (the key upsert matches rows on), so their rows are
+        summarized from current input data, and the new results are upserted
+        over the failed rows. Companies that only share a name with a failed
+        row are left alone.
+        
+        Args:
+            input_worksheet (str): Name of the input worksheet
+            output_worksheet (str): Name of the output worksheet of an earlier run
             
-            logger.info(f"Successfully wrote {len(summaries)} summaries to {output_worksheet}")
+        Returns:
+            ResultStore: The new result rows
+        """
+        with self.metrics.stage('read'):
+            rows = self.spreadsheet.worksheet(output_worksheet).get_all_values()
+        header = rows[0] if rows else []
+        if 'Status' not in header:
+            logger.info(f"{output_worksheet} has no Status column; nothing to retry")
+            return ResultStore()
+        name_column, status_column = header.index('Company Name'), header.index('Status')
+        website_column = header.index('Website') if 'Website' in header else None
+        
+        def website(values):
+            return values[website_column] if website_column is not None and len(values) > website_column else ''
+        
+        failed = {row_key(row[name_column], website(row)) for row in rows[1:]
+                  if len(row) > status_column and row[status_column] == STATUS_FAILED}
+        
+        companies = [company for company in self.read_companies(input_worksheet)
+                     if row_key(str(company.get('Company Name', '')),
+                                str(company.get('Website', '')) if website_column is not None else '') in failed]
+        logger.info(f"Retrying {len(companies)} rows marked {STATUS_FAILED!r} in {output_worksheet}")
+        if not companies:
+            return ResultStore()
+        
+        with self.metrics.stage('summarize'):
+            results = self._summarize_companies(companies)
+        self.write_summaries_to_sheet(results, output_worksheet, mode='upsert')
+        return results
+    
+    def run_pipeline(self, source: CompanySource, sink: ResultSink, chunk_size: int = 500,
+                     output: str = '') -> int:
+        """
+        Summarize every company from a source into a sink, one chunk at a time.
+        
+        Sources and sinks are the Google Sheets and local file backends from
+        data_sources, so e.g. a Parquet file can be summarized into a CSV file
+        or a worksheet without holding all rows in memory.
+        
+        Args:
+            source (CompanySource): Where companies are read from
+            sink (ResultSink): Where result rows are written to
+            chunk_size (int): Number of rows read, summarized and written at a time
+            output (str): Name of the output worksheet or file, recorded in the
+                summary index; results are only indexed when it is given
             
-        except Exception as e:
-            logger.error(f"Failed to write summaries to sheet: {e}")
-            raise
+        Returns:
+            int: Number of companies written
+        """
+        written = 0
+        chunks = source.iter_chunks(chunk_size)
+        with sink:
+            while True:
+                with self.metrics.stage('read'):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                with self.metrics.stage('summarize'):
+                    results = self._summarize_companies(chunk)
+                with self.metrics.stage('write'):
+                    sink.append(results)
+                if output:
+                    self._index_results(results, output)
+                written += len(results)
+                logger.info(f"Wrote {written} summaries")
+        return written
     
-    def run_full_analysis(self, spreadsheet_url: str, input_sheet: str = "data", output_sheet: str = "Company Summaries"):
+    def run_full_analysis(self, spreadsheet_url: Optional[str], input_sheet: str = "data", output_sheet: str = "Company Summaries",
+                          resume: bool = False, streaming: bool = False, chunk_size: int = 500,
+                          write_mode: str = "replace", report_path: Optional[str] = None,
+                          metrics_path: Optional[str] = None, sharded: bool = False, shard_size: int = 1000,
+                          lease_seconds: float = 300, worker_id: Optional[str] = None,
+                          retry_failed: bool = False):
         """
         Run the complete analysis pipeline.
         
+        Completed rows are journaled as they finish, so an interrupted run can
+        be picked up again with ``resume=True``.
+        
+        ``input_sheet`` and ``output_sheet`` may also be paths to .csv, .xlsx or
+        .parquet files (see data_sources). Runs involving a file are processed
+        chunk by chunk like streaming mode and are not journaled; if both are
+        files, ``spreadsheet_url`` may be None.
+        
         Args:
-            spreadsheet_url (str): URL of the Google Spreadsheet
-            input_sheet (str): Name of the input worksheet
-            output_sheet (str): Name of the output worksheet
+            spreadsheet_url (Optional[str]): URL of the Google Spreadsheet
+            input_sheet (str): Name of the input worksheet, or an input file path
+            output_sheet (str): Name of the output worksheet, or an output file path
+            resume (bool): Reuse results journaled by a previous, interrupted run
+                and only process failed or missing rows
+            streaming (bool): Read, summarize and append results in chunks of
+                ``chunk_size`` rows instead of holding the whole sheet in memory
+            chunk_size (int): Rows per chunk in streaming mode
+            write_mode (str): How results are written: ``replace``, ``append`` or ``upsert``
+                (see write_summaries_to_sheet); streaming mode always appends
+            report_path (Optional[str]): Write a JSON run report (stage timings, LLM
+                latency, tokens, throttling, retries and errors) to this file
+            metrics_path (Optional[str]): Also write the metrics in Prometheus text format
+            sharded (bool): Split the input into shards of ``shard_size`` rows in a
+                shared ShardQueue and work on them alongside any other processes
+                running the same sharded analysis (see shard_queue)
+            shard_size (int): Sheet rows per shard
+            lease_seconds (float): Shard lease duration; a crashed worker's shards
+                are picked up by other workers after this long
+            worker_id (Optional[str]): Name of this worker in the queue (host-pid if omitted)
+            retry_failed (bool): Only re-process the rows an earlier run marked
+                ``failed`` in the output worksheet (see retry_failed_companies)
         """
+        self.metrics.reset()
+        try:
+            if retry_failed:
+                self._run_retry_failed(spreadsheet_url, input_sheet, output_sheet)
+            elif file_format(input_sheet) or file_format(output_sheet):
+                self._run_file_analysis(spreadsheet_url, input_sheet, output_sheet, resume, chunk_size, write_mode)
+            elif sharded:
+                self._run_sharded_analysis(spreadsheet_url, input_sheet, output_sheet, write_mode,
+                                           shard_size, lease_seconds, worker_id)
+            elif streaming:
+                self._run_streaming_analysis(spreadsheet_url, input_sheet, output_sheet, resume, chunk_size)
+            else:
+                self._run_journaled_analysis(spreadsheet_url, input_sheet, output_sheet, resume, write_mode)
+        finally:
+            self.metrics.finish()
+            self._write_run_report(report_path, metrics_path, spreadsheet_url, input_sheet, output_sheet)
+    
+    def _run_retry_failed(self, spreadsheet_url: str, input_sheet: str, output_sheet: str):
+        """Variant of run_full_analysis that re-processes failed rows; see retry_failed_companies."""
+        if file_format(input_sheet) or file_format(output_sheet):
+            raise ValueError("Retrying failed rows needs an input and an output worksheet, not files")
+        try:
+            logger.info("Retrying failed companies...")
+            self.open_spreadsheet(spreadsheet_url)
+            results = self.retry_failed_companies(input_sheet, output_sheet)
+            
+            still_failed = results.column('Status').count(STATUS_FAILED)
+            print(f"\nRetried {len(results)} companies; {still_failed} still failed.")
+            
+        except Exception as e:
+            logger.error(f"Retrying failed companies failed: {e}")
+            raise
+    
+    def _run_journaled_analysis(self, spreadsheet_url: str, input_sheet: str, output_sheet: str,
+                                resume: bool, write_mode: str):
+        """In-memory variant of run_full_analysis, checkpointed by a RunJournal."""
+        journal = RunJournal.for_run(spreadsheet_url, input_sheet, output_sheet)
+        if not resume:
+            journal.reset()
+        
         try:
             logger.info("Starting full company analysis pipeline...")
             
@@ -314,58 +1285,140 @@ class CompanySummarizer:
             self.open_spreadsheet(spreadsheet_url)
             
             # Process companies
-            summaries = self.process_companies(input_sheet)
+            summaries = self.process_companies(input_sheet, journal=journal)
             
             # Write results
-            self.write_summaries_to_sheet(summaries, output_sheet)
+            self.write_summaries_to_sheet(summaries, output_sheet, mode=write_mode)
+            
+            # The results are in the sheet now, so the journal has served its purpose
+            journal.discard()
             
             logger.info("Company analysis pipeline completed successfully!")
             print(f"\nAnalysis complete! Check the '{output_sheet}' tab in your Google Sheet.")
             print(f"Processed {len(summaries)} companies.")
             
+        except KeyboardInterrupt:
+            journal.close()
+            logger.warning(f"Analysis interrupted; progress saved to {journal.path}. Run again with resume to continue.")
+            raise
         except Exception as e:
+            journal.close()
             logger.error(f"Analysis pipeline failed: {e}")
             raise
-
-
-def main():
-    """
-    Main function to run the company summarizer.
-    """
-    # Configuration - these should be set as environment variables
-    CREDENTIALS_PATH = os.getenv('GOOGLE_CREDENTIALS_PATH', 'credentials.json')
-    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
-    SPREADSHEET_URL = os.getenv('SPREADSHEET_URL')
     
-    if not GROQ_API_KEY:
-        print("Error: GROQ_API_KEY environment variable not set")
-        print("Please set your Groq API key: export GROQ_API_KEY='your-api-key-here'")
-        return
+    def _run_streaming_analysis(self, spreadsheet_url: str, input_sheet: str, output_sheet: str,
+                                resume: bool, chunk_size: int):
+        """Streaming variant of run_full_analysis; see process_companies_streaming."""
+        try:
+            logger.info("Starting streaming company analysis pipeline...")
+            self.open_spreadsheet(spreadsheet_url)
+            
+            written = self.process_companies_streaming(input_sheet, output_sheet, chunk_size, resume)
+            
+            logger.info("Company analysis pipeline completed successfully!")
+            print(f"\nAnalysis complete! Check the '{output_sheet}' tab in your Google Sheet.")
+            print(f"Processed {written} companies.")
+            
+        except Exception as e:
+            logger.error(f"Analysis pipeline failed: {e}")
+            raise
     
-    if not os.path.exists(CREDENTIALS_PATH):
-        print(f"Error: Google credentials file not found at {CREDENTIALS_PATH}")
-        print("Please download your Google Service Account credentials and save as 'credentials.json'")
-        return
+    def _run_sharded_analysis(self, spreadsheet_url: str, input_sheet: str, output_sheet: str, write_mode: str,
+                              shard_size: int, lease_seconds: float, worker_id: Optional[str]):
+        """Sharded variant of run_full_analysis; see shard_queue."""
+        from shard_queue import ShardQueue, default_worker_id, merge_results, run_worker
+        
+        worker_id = worker_id or default_worker_id()
+        queue = ShardQueue.for_run(spreadsheet_url, input_sheet, output_sheet)
+        try:
+            logger.info(f"Starting sharded company analysis pipeline as worker {worker_id}...")
+            self.open_spreadsheet(spreadsheet_url)
+            
+            with self.metrics.stage('read'):
+                worksheet = self.spreadsheet.worksheet(input_sheet)
+                name_column = dict(self._input_columns(worksheet))['Company Name']
+                last_row = len(worksheet.col_values(name_column))
+            if queue.plan(2, max(last_row, 2), shard_size):
+                logger.info(f"Planned {queue.progress()['pending']} shards of {shard_size} rows in {queue.path}")
+            
+            with self.metrics.stage('summarize'):
+                shards = run_worker(self, queue, input_sheet, worker_id, lease_seconds)
+            logger.info(f"Worker {worker_id} completed {shards} shards")
+            
+            if merge_results(self, queue, output_sheet, write_mode, worker_id, lease_seconds):
+                logger.info("Company analysis pipeline completed successfully!")
+                print(f"\nAnalysis complete! Check the '{output_sheet}' tab in your Google Sheet.")
+            else:
+                logger.info("Another worker is writing the merged results")
+            
+        except Exception as e:
+            logger.error(f"Analysis pipeline failed: {e}")
+            raise
+        finally:
+            queue.close()
     
-    try:
-        # Initialize the summarizer
-        summarizer = CompanySummarizer(CREDENTIALS_PATH, GROQ_API_KEY)
-        
-        # If no spreadsheet URL provided, create a sample one
-        if not SPREADSHEET_URL:
-            print("No spreadsheet URL provided. Creating a sample spreadsheet...")
-            url = summarizer.create_sample_sheet("Company Analysis Sample")
-            print(f"Sample spreadsheet created: {url}")
-            print("You can now set SPREADSHEET_URL environment variable and run the analysis.")
-            return
+    def _run_file_analysis(self, spreadsheet_url: Optional[str], input_sheet: str, output_sheet: str,
+                           resume: bool, chunk_size: int, write_mode: str):
+        """Variant of run_full_analysis where the input or output is a local file."""
+        if resume:
+            logger.warning("Resume is not supported when reading or writing files; starting from the beginning")
         
-        # Run the full analysis
-        summarizer.run_full_analysis(SPREADSHEET_URL)
+        try:
+            logger.info(f"Starting company analysis pipeline: {input_sheet} -> {output_sheet}")
+            if not (file_format(input_sheet) and file_format(output_sheet)):
+                if not spreadsheet_url:
+                    raise ValueError("A spreadsheet URL is required when reading or writing a worksheet")
+                self.open_spreadsheet(spreadsheet_url)
+            
+            source = open_source(input_sheet, INPUT_COLUMNS, summarizer=self)
+            sink = open_sink(output_sheet, OUTPUT_HEADERS, summarizer=self, mode=write_mode)
+            written = self.run_pipeline(source, sink, chunk_size, output=output_sheet)
+            
+            logger.info("Company analysis pipeline completed successfully!")
+            print(f"\nAnalysis complete! Results written to {output_sheet}.")
+            print(f"Processed {written} companies.")
+            
+        except Exception as e:
+            logger.error(f"Analysis pipeline failed: {e}")
+            raise
+    
+    def _write_run_report(self, report_path: Optional[str], metrics_path: Optional[str],
+                          spreadsheet_url: Optional[str], input_sheet: str, output_sheet: str):
+        """Log a one-line summary of the run and write the requested report files."""
+        report = self.metrics.to_dict()
+        stages = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in report['stages_seconds'].items())
+        counters = report['counters']
+        logger.info(f"Run took {report['wall_seconds']:.1f}s ({stages}; throttled {report['throttled_seconds']:.1f}s), "
+                    f"{counters['llm_requests']} LLM requests, "
+                    f"{counters['prompt_tokens'] + counters['completion_tokens']} tokens, "
+                    f"{counters['retries']} retries, {counters['errors']} errors")
+        if self._router is not None and len(self._router.endpoints) > 1:
+            for endpoint in self._router.stats()['endpoints']:
+                logger.info(f"Endpoint {endpoint['name']} ({endpoint['model']}): {endpoint['requests']} requests, "
+                            f"{endpoint['errors']} errors, {endpoint['rate_limited']} rate limited, "
+                            f"latency EWMA {endpoint['latency_ewma']}s, p95 {endpoint['latency_p95']}s")
+        if self.cascade is not None:
+            for tier in self.cascade.stats()['tiers']:
+                hit_rate = f"{tier['hit_rate']:.0%}" if tier['hit_rate'] is not None else 'n/a'
+                logger.info(f"Tier {tier['name']} ({', '.join(tier['models'])}): {tier['requests']} requests, "
+                            f"{hit_rate} accepted, {tier['escalated']} escalated {tier['escalation_reasons']}, "
+                            f"mean latency {tier['mean_latency']}s, ${tier['cost_usd']:.4f}")
         
-    except Exception as e:
-        logger.error(f"Application failed: {e}")
-        print(f"Error: {e}")
+        try:
+            if report_path:
+                self.metrics.write_json(report_path)
+                logger.info(f"Wrote run report to {report_path}")
+            if metrics_path:
+                self.metrics.write_prometheus(metrics_path, labels={
+                    'spreadsheet': spreadsheet_url or '',
+                    'input_sheet': input_sheet,
+                    'output_sheet': output_sheet
+                })
+                logger.info(f"Wrote Prometheus metrics to {metrics_path}")
+        except OSError as e:
+            logger.error(f"Failed to write run report: {e}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from cli import main
+    sys.exit(main())
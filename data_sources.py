@@ -0,0 +1,372 @@
+"""
+Pluggable company sources and result sinks.
+
+A source yields company rows in chunks, and a sink receives result rows
+chunk by chunk. Google Sheets is one backend; local CSV, XLSX and Parquet
+files are the others. Large bulk jobs can run straight from a file, and
+push only the final result to a sheet or skip the Sheets API entirely.
+
+open_source and open_sink pick the backend from the target. A path ending
+in .csv, .xlsx or .parquet is a file; anything else is the name of a
+worksheet in the summarizer's open spreadsheet.
+
+pandas (CSV), openpyxl (XLSX) and pyarrow (Parquet) are imported only when
+a file of that type is used.
+"""
+
+import importlib
+import logging
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# File extensions and the backend they map to
+FILE_FORMATS = {
+    '.csv': 'csv',
+    '.xlsx': 'xlsx',
+    '.parquet': 'parquet',
+    '.pq': 'parquet'
+}
+
+
+def file_format(target: str) -> Optional[str]:
+    """Return 'csv', 'xlsx' or 'parquet' for a file path, or None for a worksheet name."""
+    return FILE_FORMATS.get(os.path.splitext(str(target))[1].lower())
+
+
+def _require(module: str, package: str, purpose: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError(f"{purpose} requires {package} (pip install {package})") from e
+
+
+def _text(value) -> str:
+    """Cell value as text; empty cells (None, NaN) become ''."""
+    if value is None or value != value:
+        return ''
+    return str(value)
+
+
+def _companies_from_columns(data: Dict[str, list], columns: Sequence[str]) -> List[Dict]:
+    """Turn column lists into company dictionaries, skipping blank rows."""
+    present = [name for name in columns if name in data]
+    count = len(data[present[0]]) if present else 0
+    companies = []
+    for i in range(count):
+        company = {name: _text(data[name][i]) for name in present}
+        if any(company.values()):
+            companies.append(company)
+    return companies
+
+
+def _check_columns(found: Sequence[str], target: str):
+    if 'Company Name' not in found:
+        raise ValueError(f"{target} has no 'Company Name' column")
+
+
+class CompanySource:
+    """
+    Base class for company inputs.
+    """
+
+    def iter_chunks(self, chunk_size: int = 500) -> Iterator[List[Dict]]:
+        """
+        Yield company rows in chunks of at most ``chunk_size``.
+
+        Args:
+            chunk_size (int): Rows per chunk
+
+        Yields:
+            List[Dict]: Company dictionaries keyed by input column name
+        """
+        raise NotImplementedError
+
+    def read(self) -> List[Dict]:
+        """Read all companies at once."""
+        return [company for chunk in self.iter_chunks() for company in chunk]
+
+
+class SheetSource(CompanySource):
+    """Companies from a worksheet of the summarizer's open spreadsheet."""
+
+    def __init__(self, summarizer, worksheet_name: str, start_row: int = 0):
+        self.summarizer = summarizer
+        self.worksheet_name = worksheet_name
+        self.start_row = start_row
+
+    def iter_chunks(self, chunk_size: int = 500) -> Iterator[List[Dict]]:
+        return self.summarizer.iter_companies(self.worksheet_name, chunk_size, start_row=self.start_row)
+
+
+class CsvSource(CompanySource):
+    """Companies from a CSV file with a header row, read in chunks with pandas."""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.path = path
+        self.columns = list(columns)
+
+    def iter_chunks(self, chunk_size: int = 500) -> Iterator[List[Dict]]:
+        pd = _require('pandas', 'pandas', "Reading CSV files")
+        reader = pd.read_csv(self.path, dtype=str, keep_default_na=False, chunksize=chunk_size,
+                             usecols=lambda name: name in self.columns)
+        with reader:
+            for frame in reader:
+                _check_columns(frame.columns, self.path)
+                chunk = _companies_from_columns({name: frame[name].tolist() for name in frame.columns},
+                                                self.columns)
+                if chunk:
+                    yield chunk
+
+
+class XlsxSource(CompanySource):
+    """Companies from an Excel workbook, streamed row by row with openpyxl."""
+
+    def __init__(self, path: str, columns: Sequence[str], sheet_name: Optional[str] = None):
+        """
+        Args:
+            path (str): Path to the .xlsx file
+            columns (Sequence[str]): Input columns to read
+            sheet_name (Optional[str]): Sheet to read; the active sheet if omitted
+        """
+        self.path = path
+        self.columns = list(columns)
+        self.sheet_name = sheet_name
+
+    def iter_chunks(self, chunk_size: int = 500) -> Iterator[List[Dict]]:
+        openpyxl = _require('openpyxl', 'openpyxl', "Reading XLSX files")
+        workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            sheet = workbook[self.sheet_name] if self.sheet_name else workbook.active
+            rows = sheet.iter_rows(values_only=True)
+            header = [_text(value) for value in next(rows, ())]
+            _check_columns(header, self.path)
+            indexes = {name: header.index(name) for name in self.columns if name in header}
+
+            chunk = []
+            for row in rows:
+                company = {name: _text(row[index]) if index < len(row) else '' for name, index in indexes.items()}
+                if any(company.values()):
+                    chunk.append(company)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        finally:
+            workbook.close()
+
+
+class ParquetSource(CompanySource):
+    """Companies from a Parquet file, read one record batch at a time with pyarrow."""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.path = path
+        self.columns = list(columns)
+
+    def iter_chunks(self, chunk_size: int = 500) -> Iterator[List[Dict]]:
+        parquet = _require('pyarrow.parquet', 'pyarrow', "Reading Parquet files")
+        parquet_file = parquet.ParquetFile(self.path)
+        names = parquet_file.schema_arrow.names
+        _check_columns(names, self.path)
+        columns = [name for name in self.columns if name in names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            chunk = _companies_from_columns(batch.to_pydict(), self.columns)
+            if chunk:
+                yield chunk
+
+
+class ResultSink:
+    """
+    Base class for result outputs.
+
+    Use as a context manager: the sink is opened on entry, receives result
+    chunks through append, and is finalized on exit.
+    """
+
+    def open(self):
+        pass
+
+    def append(self, results):
+        """
+        Write one chunk of results.
+
+        Args:
+            results (ResultStore): Result rows of the chunk (see results)
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> 'ResultSink':
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SheetSink(ResultSink):
+    """
+    Results to a worksheet of the summarizer's open spreadsheet.
+
+    In ``replace`` and ``append`` mode every chunk is appended as it arrives.
+    ``upsert`` needs the full result set to match rows, so chunks are
+    buffered and written on close.
+    """
+
+    def __init__(self, summarizer, worksheet_name: str, mode: str = 'replace'):
+        self.summarizer = summarizer
+        self.worksheet_name = worksheet_name
+        self.mode = mode
+        self._writer = None
+        self._buffer = None
+
+    def open(self):
+        if self.mode == 'upsert':
+            return
+        self._writer, created = self.summarizer._output_writer(self.worksheet_name, rows=10)
+        if self.mode == 'replace':
+            self._writer.replace([], auto_resize=False)
+        elif created:
+            self._writer.write_header()
+
+    def append(self, results):
+        if self._writer is not None:
+            self._writer.append(results.rows())
+        elif self._buffer is None:
+            self._buffer = results
+        else:
+            self._buffer.extend(results)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.auto_resize()
+        elif self._buffer:
+            self.summarizer.write_summaries_to_sheet(self._buffer, self.worksheet_name, mode=self.mode)
+
+
+class CsvSink(ResultSink):
+    """Results to a CSV file, written one chunk (DataFrame) at a time with pandas."""
+
+    def __init__(self, path: str, headers: Sequence[str]):
+        self.path = path
+        self.headers = list(headers)
+        self._header_written = False
+
+    def open(self):
+        self._pd = _require('pandas', 'pandas', "Writing CSV files")
+        self._write({name: [] for name in self.headers})
+
+    def _write(self, columns: Dict[str, list]):
+        frame = self._pd.DataFrame(columns, columns=self.headers)
+        frame.to_csv(self.path, mode='a' if self._header_written else 'w', header=not self._header_written,
+                     index=False)
+        self._header_written = True
+
+    def append(self, results):
+        self._write({name: results.column(name) for name in self.headers})
+
+
+class XlsxSink(ResultSink):
+    """Results to an Excel workbook, streamed with openpyxl's write-only mode."""
+
+    def __init__(self, path: str, headers: Sequence[str], sheet_title: str = 'Company Summaries'):
+        self.path = path
+        self.headers = list(headers)
+        self.sheet_title = sheet_title
+
+    def open(self):
+        openpyxl = _require('openpyxl', 'openpyxl', "Writing XLSX files")
+        self._workbook = openpyxl.Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(self.sheet_title)
+        self._sheet.append(self.headers)
+
+    def append(self, results):
+        for row in zip(*(results.column(name) for name in self.headers)):
+            self._sheet.append(row)
+
+    def close(self):
+        self._workbook.save(self.path)
+
+
+class ParquetSink(ResultSink):
+    """Results to a Parquet file, one row group per chunk with pyarrow."""
+
+    def __init__(self, path: str, headers: Sequence[str]):
+        self.path = path
+        self.headers = list(headers)
+
+    def open(self):
+        self._pa = _require('pyarrow', 'pyarrow', "Writing Parquet files")
+        parquet = _require('pyarrow.parquet', 'pyarrow', "Writing Parquet files")
+        self._schema = self._pa.schema([(name, self._pa.string()) for name in self.headers])
+        self._writer = parquet.ParquetWriter(self.path, self._schema)
+
+    def append(self, results):
+        if not len(results):
+            return
+        table = self._pa.Table.from_pydict(
+            {name: results.column(name) for name in self.headers},
+            schema=self._schema
+        )
+        self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+
+
+def open_source(target: str, columns: Sequence[str], summarizer=None) -> CompanySource:
+    """
+    Build the source for a file path or worksheet name.
+
+    Args:
+        target (str): .csv/.xlsx/.parquet path, or a worksheet name
+        columns (Sequence[str]): Input columns to read
+        summarizer: CompanySummarizer with an open spreadsheet (worksheets only)
+
+    Returns:
+        CompanySource: Source for ``target``
+    """
+    kind = file_format(target)
+    if kind == 'csv':
+        return CsvSource(target, columns)
+    if kind == 'xlsx':
+        return XlsxSource(target, columns)
+    if kind == 'parquet':
+        return ParquetSource(target, columns)
+    if summarizer is None:
+        raise ValueError(f"Worksheet {target!r} needs a summarizer with an open spreadsheet")
+    return SheetSource(summarizer, target)
+
+
+def open_sink(target: str, headers: Sequence[str], summarizer=None, mode: str = 'replace') -> ResultSink:
+    """
+    Build the sink for a file path or worksheet name.
+
+    Files are always written from scratch; ``append`` and ``upsert`` are only
+    supported for worksheets.
+
+    Args:
+        target (str): .csv/.xlsx/.parquet path, or a worksheet name
+        headers (Sequence[str]): Output columns, in order
+        summarizer: CompanySummarizer with an open spreadsheet (worksheets only)
+        mode (str): Write mode, see CompanySummarizer.write_summaries_to_sheet
+
+    Returns:
+        ResultSink: Sink for ``target``
+    """
+    kind = file_format(target)
+    if kind and mode != 'replace':
+        raise ValueError(f"Write mode {mode!r} is not supported for files; use replace")
+    if kind == 'csv':
+        return CsvSink(target, headers)
+    if kind == 'xlsx':
+        return XlsxSink(target, headers)
+    if kind == 'parquet':
+        return ParquetSink(target, headers)
+    if summarizer is None:
+        raise ValueError(f"Worksheet {target!r} needs a summarizer with an open spreadsheet")
+    return SheetSink(summarizer, target, mode)
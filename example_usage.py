@@ -5,7 +5,7 @@ This script demonstrates how to use the company summarizer programmatically.
 """
 
 import os
-from company_summarizer import CompanySummarizer
+from company_summarizer import CompanySummarizer, configure_logging
 
 def example_create_and_analyze():
     """Example: Create a sample sheet and analyze companies."""
@@ -97,12 +97,18 @@ def example_custom_processing():
         summaries = []
         
         for company in limited_companies:
-            summary = summarizer.generate_company_summary(company)
+            # generate_company_summary raises if the request fails
+            try:
+                summary, status = summarizer.generate_company_summary(company), 'ok'
+            except Exception as e:
+                print(f"Could not summarize {company.get('Company Name', '')}: {e}")
+                summary, status = '', 'failed'
             result = {
                 'Company Name': company.get('Company Name', ''),
                 'Website': company.get('Website', ''),
                 'Source': company.get('Source', ''),
                 'Summary': summary,
+                'Status': status,
                 'Processed Date': '2024-01-01'  # Custom date
             }
             summaries.append(result)
@@ -116,6 +122,8 @@ def example_custom_processing():
         print(f"Error: {e}")
 
 if __name__ == "__main__":
+    configure_logging()
+    
     print("Company Summarizer Examples")
     print("=" * 30)
     print("1. Create sample sheet and analyze")
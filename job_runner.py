@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Run many summarization jobs in one process under a shared provider budget.
+
+A manifest lists jobs (spreadsheet, input tab, output tab, priority). All
+jobs share one Groq client, one rate limiter, one summary cache, one
+summary index and one pool of request slots, so they no longer compete for
+the same quota from separate processes. They also share one circuit breaker, so a provider
+outage pauses every job instead of each job discovering it separately. Slots go to the highest-priority job that is waiting
+for one; jobs of equal priority take turns, so a large sheet cannot starve
+a small one.
+
+Usage:
+    python job_runner.py jobs.json [--resume]
+
+Manifest format (JSON):
+    {
+        "defaults": {"write_mode": "upsert"},
+        "jobs": [
+            {"name": "acme", "spreadsheet_url": "https://docs.google.com/...", "priority": 10},
+            {"spreadsheet_url": "https://docs.google.com/...", "input_sheet": "leads",
+             "output_sheet": "Lead Summaries"}
+        ]
+    }
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from company_summarizer import CompanySummarizer, configure_logging
+from metrics import RunMetrics
+from cascade import ModelCascade
+from provider_router import ProviderRouter
+from rate_limiter import RateLimiter
+from retry import CircuitBreaker
+from sheet_writer import WRITE_MODES
+from summary_cache import SummaryCache
+from summary_index import SummaryIndex
+
+logger = logging.getLogger(__name__)
+
+# Manifest keys a job (or the manifest's "defaults") may set, with their defaults
+JOB_OPTIONS = {
+    'input_sheet': 'data',
+    'output_sheet': 'Company Summaries',
+    'priority': 0,
+    'write_mode': 'replace',
+    'streaming': False,
+    'chunk_size': 500,
+    'batch_size': None,
+    'dedupe': None
+}
+
+
+class Job:
+    """One spreadsheet/tab pair to summarize."""
+
+    def __init__(self, name: str, spreadsheet_url: str, input_sheet: str = 'data',
+                 output_sheet: str = 'Company Summaries', priority: int = 0, write_mode: str = 'replace',
+                 streaming: bool = False, chunk_size: int = 500, batch_size: Optional[int] = None,
+                 dedupe: Optional[bool] = None):
+        """
+        Args:
+            name (str): Unique name used in logs and the job report
+            spreadsheet_url (str): URL of the Google Spreadsheet
+            input_sheet (str): Name of the input worksheet
+            output_sheet (str): Name of the output worksheet
+            priority (int): Jobs with a higher priority get request slots first
+            write_mode (str): ``replace``, ``append`` or ``upsert``
+            streaming (bool): Use the chunked streaming pipeline
+            chunk_size (int): Rows per chunk in streaming mode
+            batch_size (Optional[int]): Companies per request; the runner default if None
+            dedupe (Optional[bool]): Summarize duplicates once; the runner default if None
+        """
+        if write_mode not in WRITE_MODES:
+            raise ValueError(f"Job {name!r}: unknown write_mode {write_mode!r}")
+        self.name = name
+        self.spreadsheet_url = spreadsheet_url
+        self.input_sheet = input_sheet
+        self.output_sheet = output_sheet
+        self.priority = int(priority)
+        self.write_mode = write_mode
+        self.streaming = bool(streaming)
+        self.chunk_size = int(chunk_size)
+        self.batch_size = batch_size
+        self.dedupe = dedupe
+
+        self.status = 'queued'
+        self.error: Optional[str] = None
+        self.metrics = RunMetrics()
+
+
+def load_manifest(path: str) -> List[Job]:
+    """
+    Read jobs from a JSON manifest.
+
+    The manifest is either a list of job objects or an object with a "jobs"
+    list and optional "defaults" applied to every job.
+
+    Args:
+        path (str): Path to the manifest file
+
+    Returns:
+        List[Job]: Jobs in manifest order
+    """
+    with open(path, 'r', encoding='utf-8') as manifest_file:
+        manifest = json.load(manifest_file)
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+
+    defaults = {**JOB_OPTIONS, **manifest.get('defaults', {})}
+    jobs = []
+    names = set()
+    for position, entry in enumerate(manifest.get('jobs', []), start=1):
+        if not entry.get('spreadsheet_url'):
+            raise ValueError(f"Job {position} in {path} has no spreadsheet_url")
+        unknown = set(entry) - set(JOB_OPTIONS) - {'name', 'spreadsheet_url'}
+        if unknown:
+            raise ValueError(f"Job {position} in {path} has unknown keys: {', '.join(sorted(unknown))}")
+
+        options = {key: entry.get(key, defaults[key]) for key in JOB_OPTIONS}
+        name = entry.get('name') or f"job-{position}"
+        if name in names:
+            raise ValueError(f"Duplicate job name {name!r} in {path}")
+        names.add(name)
+        jobs.append(Job(name, entry['spreadsheet_url'], **options))
+    return jobs
+
+
+class FairShareScheduler:
+    """
+    Hands out a fixed number of request slots to competing jobs.
+
+    When a slot frees up it goes to the waiting job with the highest
+    priority; among equal priorities, to the job with the fewest requests in
+    flight, and then to the one that was served least recently. The
+    scheduler is work-conserving: a job that is busy reading or writing its
+    sheet doesn't hold slots, so others use them in the meantime.
+    """
+
+    def __init__(self, slots: int):
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        self.slots = slots
+        self._condition = threading.Condition()
+        self._in_use = 0
+        self._priority: Dict[str, int] = {}
+        self._waiting: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._last_served: Dict[str, int] = {}
+        self._grants = 0
+
+    def register(self, job: str, priority: int = 0):
+        with self._condition:
+            self._priority[job] = priority
+            self._waiting.setdefault(job, 0)
+            self._in_flight.setdefault(job, 0)
+            self._last_served.setdefault(job, 0)
+
+    def in_flight(self, job: str) -> int:
+        with self._condition:
+            return self._in_flight.get(job, 0)
+
+    def _next_job(self) -> Optional[str]:
+        waiting = [job for job, count in self._waiting.items() if count]
+        if not waiting:
+            return None
+        return min(waiting, key=lambda job: (-self._priority[job], self._in_flight[job], self._last_served[job]))
+
+    @contextmanager
+    def slot(self, job: str) -> Iterator[None]:
+        """Hold one request slot for ``job`` for the duration of the ``with`` block."""
+        with self._condition:
+            self._waiting[job] += 1
+            while self._in_use >= self.slots or self._next_job() != job:
+                self._condition.wait()
+            self._waiting[job] -= 1
+            self._in_use += 1
+            self._in_flight[job] += 1
+            self._grants += 1
+            self._last_served[job] = self._grants
+            # Another waiter may be next in line for a remaining free slot
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_use -= 1
+                self._in_flight[job] -= 1
+                self._condition.notify_all()
+
+
+class JobRunner:
+    """
+    Run a list of jobs concurrently under one concurrency and rate budget.
+    """
+
+    def __init__(self, jobs: List[Job], credentials_path: str, groq_api_key: str,
+                 max_concurrency: int = 4, max_active_jobs: int = 4, batch_size: int = 1,
+                 dedupe: bool = True, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[SummaryCache] = None, llm_client=None, sheets_client=None,
+                 router: Optional[ProviderRouter] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 cascade: Optional[ModelCascade] = None, index: Optional[SummaryIndex] = None):
+        """
+        Args:
+            jobs (List[Job]): Jobs to run
+            credentials_path (str): Path to Google Service Account credentials JSON file
+            groq_api_key (str): Groq API key
+            max_concurrency (int): Summary requests in flight across all jobs
+            max_active_jobs (int): Jobs that may be reading, summarizing or writing at once
+            batch_size (int): Default companies per request
+            dedupe (bool): Default for summarizing duplicate companies once
+            rate_limiter (Optional[RateLimiter]): Limiter shared by all jobs;
+                built from the GROQ_*_PER_MINUTE environment variables if omitted
+            cache (Optional[SummaryCache]): Summary cache shared by all jobs
+            llm_client: Chat-completions client shared by all jobs
+            sheets_client: gspread-compatible client shared by all jobs
+            router (Optional[ProviderRouter]): Provider router shared by all jobs,
+                used instead of ``llm_client`` and ``rate_limiter``
+            circuit_breaker (Optional[CircuitBreaker]): Breaker shared by all jobs;
+                built from the CIRCUIT_* environment variables if omitted
+            cascade (Optional[ModelCascade]): Model tiers shared by all jobs; its first
+                tier takes batched requests, and ``router`` is not used when a cascade
+                is given
+            index (Optional[SummaryIndex]): Summary index every job adds its results to
+        """
+        if max_active_jobs < 1:
+            raise ValueError("max_active_jobs must be at least 1")
+        self.jobs = jobs
+        self.max_concurrency = max_concurrency
+        self.max_active_jobs = max_active_jobs
+        self.batch_size = batch_size
+        self.dedupe = dedupe
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
+        self.cache = cache
+        self.router = router
+        self.cascade = cascade
+        self.index = index
+        self.circuit_breaker = circuit_breaker or CircuitBreaker.from_env()
+        self.scheduler = FairShareScheduler(max_concurrency)
+
+        self.credentials_path = credentials_path
+        self.groq_api_key = groq_api_key
+        routed = router is not None or cascade is not None
+        if (llm_client is None and not routed) or sheets_client is None:
+            # Authenticate once; every job reuses the same clients
+            bootstrap = CompanySummarizer(credentials_path, groq_api_key, rate_limiter=self.rate_limiter,
+                                          llm_client=llm_client, sheets_client=sheets_client)
+            if llm_client is None and not routed:
+                llm_client = bootstrap.groq_client
+            sheets_client = bootstrap.gc
+        self.llm_client = llm_client
+        self.sheets_client = sheets_client
+
+    def _summarizer_for(self, job: Job) -> CompanySummarizer:
+        self.scheduler.register(job.name, job.priority)
+        return CompanySummarizer(
+            self.credentials_path,
+            self.groq_api_key,
+            # Each job may use every slot when it runs alone; the scheduler caps the total
+            max_workers=self.max_concurrency,
+            rate_limiter=self.rate_limiter,
+            cache=self.cache,
+            index=self.index,
+            batch_size=job.batch_size or self.batch_size,
+            dedupe=self.dedupe if job.dedupe is None else job.dedupe,
+            llm_client=self.llm_client,
+            sheets_client=self.sheets_client,
+            metrics=job.metrics,
+            request_slot=lambda: self.scheduler.slot(job.name),
+            router=self.router,
+            cascade=self.cascade,
+            circuit_breaker=self.circuit_breaker
+        )
+
+    def _run_job(self, job: Job, resume: bool):
+        job.status = 'running'
+        logger.info(f"Job {job.name}: starting ({job.spreadsheet_url}, {job.input_sheet} -> {job.output_sheet}, "
+                    f"priority {job.priority})")
+        try:
+            self._summarizer_for(job).run_full_analysis(
+                job.spreadsheet_url,
+                input_sheet=job.input_sheet,
+                output_sheet=job.output_sheet,
+                resume=resume,
+                streaming=job.streaming,
+                chunk_size=job.chunk_size,
+                write_mode=job.write_mode
+            )
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error(f"Job {job.name}: failed: {e}")
+            return
+        job.status = 'done'
+        logger.info(f"Job {job.name}: done in {job.metrics.to_dict()['wall_seconds']:.1f}s")
+
+    def _log_progress(self):
+        counts: Dict[str, int] = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        logger.info("Jobs: " + ', '.join(f"{count} {status}" for status, count in sorted(counts.items())))
+        for job in self.jobs:
+            if job.status == 'running':
+                logger.info(f"Job {job.name}: {job.metrics.counters['rows']} rows summarized, "
+                            f"{self.scheduler.in_flight(job.name)} requests in flight")
+
+    def run(self, resume: bool = False, progress_interval: float = 30.0) -> bool:
+        """
+        Run all jobs, highest priority first, and wait for them to finish.
+
+        Args:
+            resume (bool): Resume each job from its progress journal
+            progress_interval (float): Seconds between per-job progress log lines
+
+        Returns:
+            bool: True if every job succeeded
+        """
+        ordered = sorted(self.jobs, key=lambda job: -job.priority)
+        logger.info(f"Running {len(ordered)} jobs ({self.max_active_jobs} at a time, "
+                    f"{self.max_concurrency} requests in flight in total)")
+
+        stop = threading.Event()
+
+        def monitor():
+            while not stop.wait(progress_interval):
+                self._log_progress()
+
+        monitor_thread = threading.Thread(target=monitor, daemon=True)
+        monitor_thread.start()
+        start = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=min(self.max_active_jobs, len(ordered)) or 1)
+        futures = [executor.submit(self._run_job, job, resume) for job in ordered]
+        try:
+            for future in futures:
+                future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            stop.set()
+
+        failed = [job.name for job in self.jobs if job.status == 'failed']
+        logger.info(f"Finished {len(self.jobs)} jobs in {time.perf_counter() - start:.1f}s"
+                    + (f"; failed: {', '.join(failed)}" if failed else ""))
+        return not failed
+
+    def report(self) -> Dict:
+        """Return the per-job status and metrics as a JSON-serializable dictionary."""
+        return {
+            'jobs': [
+                {
+                    'name': job.name,
+                    'spreadsheet_url': job.spreadsheet_url,
+                    'input_sheet': job.input_sheet,
+                    'output_sheet': job.output_sheet,
+                    'priority': job.priority,
+                    'status': job.status,
+                    'error': job.error,
+                    'metrics': job.metrics.to_dict()
+                }
+                for job in self.jobs
+            ],
+            'rate_limiter': {
+                'throttled_seconds': round(self.rate_limiter.throttled_seconds, 3),
+                'rate_limited_count': self.rate_limiter.rate_limited_count
+            }
+        }
+
+    def write_report(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as report_file:
+            json.dump(self.report(), report_file, indent=2)
+            report_file.write('\n')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize several spreadsheets under one shared Groq budget")
+    parser.add_argument('manifest', help="JSON manifest of jobs")
+    parser.add_argument('--resume', action='store_true', help="Resume each job from its progress journal")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    configure_logging(os.getenv('LOG_LEVEL', 'INFO'))
+
+    CREDENTIALS_PATH = os.getenv('GOOGLE_CREDENTIALS_PATH', 'credentials.json')
+    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+    MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', '4'))
+    MAX_ACTIVE_JOBS = int(os.getenv('MAX_ACTIVE_JOBS', '4'))
+    BATCH_SIZE = int(os.getenv('BATCH_SIZE', '1'))
+    DEDUPE = os.getenv('DEDUPE', '1') != '0'
+    JOB_REPORT_PATH = os.getenv('JOB_REPORT_PATH', os.path.join('.company_summarizer', 'job_report.json'))
+    LLM_ENDPOINTS = os.getenv('LLM_ENDPOINTS')
+    MODEL_CASCADE = os.getenv('MODEL_CASCADE')
+    HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS', '0') == '1'
+
+    if not GROQ_API_KEY and not (LLM_ENDPOINTS or MODEL_CASCADE):
+        print("Error: GROQ_API_KEY environment variable not set")
+        return 1
+
+    try:
+        jobs = load_manifest(args.manifest)
+        runner = JobRunner(
+            jobs,
+            CREDENTIALS_PATH,
+            GROQ_API_KEY,
+            max_concurrency=MAX_CONCURRENCY,
+            max_active_jobs=MAX_ACTIVE_JOBS,
+            batch_size=BATCH_SIZE,
+            dedupe=DEDUPE,
+            cache=SummaryCache.from_env(),
+            index=SummaryIndex.from_env(),
+            router=ProviderRouter.from_file(LLM_ENDPOINTS, hedge=HEDGE_REQUESTS) if LLM_ENDPOINTS else None,
+            cascade=ModelCascade.from_file(MODEL_CASCADE, hedge=HEDGE_REQUESTS) if MODEL_CASCADE else None
+        )
+        succeeded = runner.run(resume=args.resume)
+    except Exception as e:
+        logger.error(f"Job runner failed: {e}")
+        print(f"Error: {e}")
+        return 1
+
+    if JOB_REPORT_PATH:
+        runner.write_report(JOB_REPORT_PATH)
+        logger.info(f"Wrote job report to {JOB_REPORT_PATH}")
+    return 0 if succeeded else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
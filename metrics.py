@@ -0,0 +1,237 @@
+"""
+Run instrumentation: per-stage timing, LLM latency histogram and counters.
+
+A RunMetrics instance is the hook the summarizer reports into while it
+runs. At the end of a run it can be written out as a JSON report and,
+optionally, as a Prometheus text-format file (e.g. for node_exporter's
+textfile collector).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence
+
+# Upper bounds (seconds) of the LLM latency histogram buckets
+DEFAULT_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = 'company_summarizer'
+
+# Counter names and their help text, in report order
+COUNTERS = {
+    'rows': "Rows processed",
+    'rows_resumed': "Rows taken from the progress journal instead of being processed",
+    'rows_deduplicated': "Rows that reused the summary of a duplicate company",
+    'llm_requests': "Chat-completion requests sent",
+    'prompt_tokens': "Prompt tokens reported in response usage",
+    'completion_tokens': "Completion tokens reported in response usage",
+    'cache_hits': "Summaries served from the summary cache",
+    'cache_misses': "Summary cache lookups that missed",
+    'retries': "Requests retried after a rate-limit response or an endpoint failure",
+    'hedges': "Requests duplicated to a second endpoint after running past the p95 latency",
+    'escalations': "Answers that failed validation and moved up to the next cascade tier",
+    'rows_retried': "Summaries queued again after a failed request",
+    'circuit_opens': "Times the circuit breaker paused dispatch after an error-rate spike",
+    'errors': "Summaries that still failed after all retries"
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate quantiles."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction: float) -> float:
+        """Estimate a quantile by linear interpolation within its bucket."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if bucket_count and seen + bucket_count >= target:
+                return lower + (upper - lower) * (target - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 4),
+            'mean': round(self.sum / self.count, 4) if self.count else 0.0,
+            'p50': round(self.quantile(0.50), 4),
+            'p95': round(self.quantile(0.95), 4),
+            'p99': round(self.quantile(0.99), 4),
+            'max': round(self.max, 4),
+            'buckets': {
+                **{str(bound): count for bound, count in zip(self.buckets, self.counts)},
+                '+Inf': self.counts[-1]
+            }
+        }
+
+
+class RunMetrics:
+    """
+    Thread-safe collector for one summarization run.
+    """
+
+    def __init__(self, latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self._latency_buckets = latency_buckets
+        self._lock = threading.Lock()
+        self._active = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Clear all measurements, e.g. at the start of a new run."""
+        with self._lock:
+            self.started_at = time.time()
+            self.stages: Dict[str, float] = {}
+            self.counters: Dict[str, int] = {name: 0 for name in COUNTERS}
+            self.llm_latency = Histogram(self._latency_buckets)
+            self.throttled_seconds = 0.0
+            self.finished_at: Optional[float] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Add the wall time of the ``with`` block to stage ``name``.
+
+        Nested blocks for the same stage on the same thread are only counted once.
+        """
+        active = self._active.__dict__.setdefault('stages', set())
+        if name in active:
+            yield
+            return
+        active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            active.discard(name)
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_llm_call(self, latency: float, prompt_tokens: Optional[int] = None,
+                        completion_tokens: Optional[int] = None):
+        """Record one successful chat-completion request."""
+        with self._lock:
+            self.llm_latency.observe(latency)
+            self.counters['llm_requests'] += 1
+            self.counters['prompt_tokens'] += prompt_tokens or 0
+            self.counters['completion_tokens'] += completion_tokens or 0
+
+    def record_throttle(self, seconds: float):
+        """Record time spent waiting on the rate limiter."""
+        if seconds > 0:
+            with self._lock:
+                self.throttled_seconds += seconds
+
+    def finish(self):
+        with self._lock:
+            self.finished_at = time.time()
+
+    def to_dict(self) -> Dict:
+        """Return the run report as a JSON-serializable dictionary."""
+        with self._lock:
+            finished_at = self.finished_at or time.time()
+            return {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                'wall_seconds': round(finished_at - self.started_at, 3),
+                'stages_seconds': {name: round(value, 3) for name, value in self.stages.items()},
+                'throttled_seconds': round(self.throttled_seconds, 3),
+                'counters': dict(self.counters),
+                'llm_latency_seconds': self.llm_latency.to_dict()
+            }
+
+    def write_json(self, path: str):
+        """Write the run report as JSON."""
+        _atomic_write(path, json.dumps(self.to_dict(), indent=2) + '\n')
+
+    def to_prometheus(self, labels: Optional[Dict[str, str]] = None) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        report = self.to_dict()
+        base_labels = dict(labels or {})
+
+        def fmt(extra: Optional[Dict[str, str]] = None) -> str:
+            merged = {**base_labels, **(extra or {})}
+            if not merged:
+                return ''
+            escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in merged.values())
+            return '{' + ','.join(f'{name}="{value}"' for name, value in zip(merged, escaped)) + '}'
+
+        lines = [
+            f"# HELP {METRIC_PREFIX}_run_seconds Wall time of the run",
+            f"# TYPE {METRIC_PREFIX}_run_seconds gauge",
+            f"{METRIC_PREFIX}_run_seconds{fmt()} {report['wall_seconds']}",
+            f"# HELP {METRIC_PREFIX}_stage_seconds Wall time spent per pipeline stage",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds gauge"
+        ]
+        for stage, seconds in report['stages_seconds'].items():
+            lines.append(f"{METRIC_PREFIX}_stage_seconds{fmt({'stage': stage})} {seconds}")
+
+        lines += [
+            f"# HELP {METRIC_PREFIX}_throttled_seconds Time spent waiting on the rate limiter",
+            f"# TYPE {METRIC_PREFIX}_throttled_seconds gauge",
+            f"{METRIC_PREFIX}_throttled_seconds{fmt()} {report['throttled_seconds']}"
+        ]
+        for name, help_text in COUNTERS.items():
+            lines += [
+                f"# HELP {METRIC_PREFIX}_{name}_total {help_text}",
+                f"# TYPE {METRIC_PREFIX}_{name}_total counter",
+                f"{METRIC_PREFIX}_{name}_total{fmt()} {report['counters'].get(name, 0)}"
+            ]
+
+        histogram = f"{METRIC_PREFIX}_llm_latency_seconds"
+        lines += [
+            f"# HELP {histogram} Chat-completion request latency",
+            f"# TYPE {histogram} histogram"
+        ]
+        with self._lock:
+            cumulative = 0
+            for bound, count in zip(self.llm_latency.buckets, self.llm_latency.counts):
+                cumulative += count
+                lines.append(f"{histogram}_bucket{fmt({'le': str(bound)})} {cumulative}")
+            lines.append(f"{histogram}_bucket{fmt({'le': '+Inf'})} {self.llm_latency.count}")
+            lines.append(f"{histogram}_sum{fmt()} {round(self.llm_latency.sum, 6)}")
+            lines.append(f"{histogram}_count{fmt()} {self.llm_latency.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str, labels: Optional[Dict[str, str]] = None):
+        """Write the metrics to a Prometheus text-format file."""
+        _atomic_write(path, self.to_prometheus(labels))
+
+
+def _atomic_write(path: str, content: str):
+    """Write via a temporary file and rename, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as output_file:
+        output_file.write(content)
+    os.replace(temporary_path, path)
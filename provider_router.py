@@ -0,0 +1,504 @@
+"""
+Route chat completions across several LLM endpoints.
+
+An endpoint is one provider, API key and model, with its own rate limiter.
+The router keeps an exponentially weighted moving average (EWMA) of every
+endpoint's latency and error rate and sends each request to the endpoint
+expected to answer first: lowest latency plus rate-limiter wait, among the
+endpoints that are currently healthy. A request that fails on one endpoint
+fails over to the next, so one slow or failing provider no longer stalls a
+whole run.
+
+With hedging enabled, a request that is still unanswered once the primary
+endpoint's p95 latency has passed is sent again to a second endpoint, and
+whichever answer arrives first is used. This cuts the latency tail of
+large batches for a few percent of extra requests.
+
+Endpoints are listed in a JSON file (LLM_ENDPOINTS):
+
+    [
+        {"name": "groq", "provider": "groq", "model": "llama3-8b-8192",
+         "api_key_env": "GROQ_API_KEY", "requests_per_minute": 30, "tokens_per_minute": 6000},
+        {"name": "groq-2", "provider": "groq", "model": "llama3-8b-8192",
+         "api_key_env": "GROQ_API_KEY_2"},
+        {"name": "openai", "provider": "openai", "model": "gpt-4o-mini",
+         "api_key_env": "OPENAI_API_KEY", "requests_per_minute": 500, "tokens_per_minute": 200000}
+    ]
+
+The groq and openai packages are imported when an endpoint of that provider
+sends its first request.
+"""
+
+import importlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+from rate_limiter import RateLimiter
+from transport import llm_http_client
+
+logger = logging.getLogger(__name__)
+
+# Provider name -> (module, client class); every client takes api_key, base_url and max_retries
+PROVIDERS = {
+    'groq': ('groq', 'Groq'),
+    'openai': ('openai', 'OpenAI')
+}
+
+# Keys an endpoint entry in the LLM_ENDPOINTS file may set
+ENDPOINT_OPTIONS = ('name', 'provider', 'model', 'api_key', 'api_key_env', 'base_url',
+                    'requests_per_minute', 'tokens_per_minute', 'temperature', 'input_price', 'output_price')
+
+# List prices in USD per million (input, output) tokens, used for run estimates;
+# an endpoint entry can override them with input_price/output_price
+MODEL_PRICES = {
+    'llama3-8b-8192': (0.05, 0.08),
+    'llama-3.1-8b-instant': (0.05, 0.08),
+    'llama3-70b-8192': (0.59, 0.79),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00)
+}
+
+# Latency samples needed before an endpoint's p95 is trusted for hedging
+MIN_HEDGE_SAMPLES = 20
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Return True if an API error is an HTTP 429 response."""
+    return getattr(error, 'status_code', None) == 429
+
+
+def _error_headers(error: Exception):
+    """Return the response headers attached to an API error, if any."""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'headers', None)
+
+
+def client_factory(provider: str, api_key: Optional[str], base_url: Optional[str] = None) -> Callable:
+    """
+    Return a function that builds a chat-completions client for ``provider``.
+
+    The provider package is imported when the function is first called, and
+    every client shares the process-wide connection pool (transport.llm_http_client).
+    """
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider {provider!r}; expected one of {', '.join(PROVIDERS)}")
+    module_name, class_name = PROVIDERS[provider]
+
+    def build():
+        client_class = getattr(importlib.import_module(module_name), class_name)
+        options = {'api_key': api_key, 'max_retries': 0, 'http_client': llm_http_client()}  # retries are the router's job
+        if base_url:
+            options['base_url'] = base_url
+        return client_class(**options)
+
+    return build
+
+
+class Completion:
+    """The answer to one routed request."""
+
+    def __init__(self, content: str, endpoint: str, latency: float, prompt_tokens: Optional[int] = None,
+                 completion_tokens: Optional[int] = None, throttled: float = 0.0,
+                 finish_reason: Optional[str] = None, model: str = ''):
+        self.content = content
+        self.endpoint = endpoint
+        # Model of the endpoint that answered
+        self.model = model
+        self.latency = latency
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.throttled = throttled
+        self.finish_reason = finish_reason
+        self.retries = 0
+        self.hedged = False
+        # Answers from cheaper cascade tiers that failed validation (see cascade.ModelCascade)
+        self.escalated: List['Completion'] = []
+
+
+class Endpoint:
+    """
+    One provider/key/model combination and its health statistics.
+    """
+
+    def __init__(self, name: str, model: str, client: Callable, rate_limiter: Optional[RateLimiter] = None,
+                 temperature: float = 0.3, alpha: float = 0.2, max_error_rate: float = 0.5,
+                 cooldown_seconds: float = 30.0, window: int = 200,
+                 prices: Optional[Tuple[float, float]] = None):
+        """
+        Args:
+            name (str): Unique name used in logs and stats
+            model (str): Model requested from this endpoint
+            client (Callable): Returns the chat-completions client; called on first use
+            rate_limiter (Optional[RateLimiter]): Limiter for this endpoint's quota
+            temperature (float): Sampling temperature
+            alpha (float): EWMA weight of the newest observation
+            max_error_rate (float): Error EWMA at which the endpoint is taken out of rotation
+            cooldown_seconds (float): How long an unhealthy endpoint sits out before it is tried again
+            window (int): Recent latencies kept for the p95 estimate
+            prices (Optional[Tuple[float, float]]): USD per million input and output
+                tokens; looked up in MODEL_PRICES if omitted
+        """
+        self.name = name
+        self.model = model
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.temperature = temperature
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.prices = prices or MODEL_PRICES.get(model)
+
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.last_used = 0.0
+        self.unhealthy_until = 0.0
+
+        self._client_factory = client
+        self._client = None
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Chat-completions client, created on first use."""
+        with self._lock:
+            if self._client is None:
+                self._client = self._client_factory()
+            return self._client
+
+    def healthy(self, now: Optional[float] = None) -> bool:
+        """False while the endpoint sits out a cooldown after too many errors."""
+        return (time.monotonic() if now is None else now) >= self.unhealthy_until
+
+    def p95(self) -> Optional[float]:
+        """95th percentile of recent latencies, or None until enough samples exist."""
+        with self._lock:
+            if len(self._latencies) < MIN_HEDGE_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def expected_seconds(self, tokens: int = 0) -> float:
+        """
+        Expected time until this endpoint answers a request of ``tokens`` tokens.
+
+        Rate-limiter wait plus latency EWMA, inflated by the error EWMA since
+        a failed attempt has to be repeated elsewhere. An endpoint without
+        latency samples scores zero so it gets tried.
+        """
+        seconds = self.rate_limiter.wait_time(tokens) + (self.latency_ewma or 0.0)
+        return seconds / max(1.0 - self.error_ewma, 0.05)
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """USD cost of the given token counts, or None if the model's prices are unknown."""
+        if self.prices is None:
+            return None
+        return (prompt_tokens * self.prices[0] + completion_tokens * self.prices[1]) / 1_000_000
+
+    def complete(self, messages: List[Dict], max_tokens: int, reserved_tokens: int) -> Completion:
+        """
+        Send one request through this endpoint's rate limiter.
+
+        Raises the client's exception on failure, after recording it.
+        """
+        throttled = self.rate_limiter.acquire(reserved_tokens)
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.last_used = time.monotonic()
+
+        start = time.perf_counter()
+        try:
+            raw_response = self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=self.temperature
+            )
+            response = raw_response.parse()
+        except Exception as e:
+            if _is_rate_limit_error(e):
+                self.rate_limiter.record_rate_limited(_error_headers(e))
+                self._record_rate_limited()
+            else:
+                self._record_error()
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        latency = time.perf_counter() - start
+
+        usage = getattr(response, 'usage', None)
+        self.rate_limiter.record_success(
+            raw_response.headers,
+            reserved_tokens=reserved_tokens,
+            used_tokens=getattr(usage, 'total_tokens', None)
+        )
+        self._record_success(latency)
+        return Completion(
+            response.choices[0].message.content.strip(),
+            self.name,
+            latency,
+            prompt_tokens=getattr(usage, 'prompt_tokens', None),
+            completion_tokens=getattr(usage, 'completion_tokens', None),
+            throttled=throttled,
+            finish_reason=getattr(response.choices[0], 'finish_reason', None),
+            model=self.model
+        )
+
+    def _record_success(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+            self.error_ewma *= 1 - self.alpha
+
+    def _record_error(self):
+        with self._lock:
+            self.errors += 1
+            self.error_ewma += self.alpha * (1 - self.error_ewma)
+            if self.error_ewma >= self.max_error_rate:
+                self.unhealthy_until = time.monotonic() + self.cooldown_seconds
+                logger.warning(f"Endpoint {self.name} error rate at {self.error_ewma:.0%}; "
+                               f"out of rotation for {self.cooldown_seconds:.0f}s")
+
+    def _record_rate_limited(self):
+        # A 429 says the quota is used up, not that the endpoint is broken;
+        # the rate limiter's pause already shows up in expected_seconds
+        with self._lock:
+            self.rate_limited += 1
+
+    def stats(self) -> Dict:
+        p95 = self.p95()
+        with self._lock:
+            return {
+                'name': self.name,
+                'model': self.model,
+                'requests': self.requests,
+                'errors': self.errors,
+                'rate_limited': self.rate_limited,
+                'latency_ewma': round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+                'latency_p95': round(p95, 4) if p95 is not None else None,
+                'error_ewma': round(self.error_ewma, 4),
+                'healthy': self.healthy()
+            }
+
+
+class ProviderRouter:
+    """
+    Thread-safe router sending each request to the fastest healthy endpoint.
+    """
+
+    def __init__(self, endpoints: Sequence[Endpoint], hedge: bool = False, hedge_min_delay: float = 0.5,
+                 probe_interval: float = 30.0, hedge_workers: int = 64):
+        """
+        Args:
+            endpoints (Sequence[Endpoint]): Endpoints to route between, in order of preference
+            hedge (bool): Duplicate slow requests to a second endpoint
+            hedge_min_delay (float): Never hedge before this many seconds, whatever the p95
+            probe_interval (float): Send a request to an endpoint that has been idle
+                this long, so a recovered endpoint gets traffic back
+            hedge_workers (int): Threads that run hedged requests; should exceed the
+                number of requests kept in flight
+        """
+        if not endpoints:
+            raise ValueError("ProviderRouter needs at least one endpoint")
+        names = [endpoint.name for endpoint in endpoints]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Endpoint names must be unique: {', '.join(names)}")
+
+        self.endpoints = list(endpoints)
+        self.hedge = hedge and len(self.endpoints) > 1
+        self.hedge_min_delay = hedge_min_delay
+        self.probe_interval = probe_interval
+        self.hedges = 0
+        self.failovers = 0
+
+        self._hedge_workers = hedge_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'ProviderRouter':
+        """
+        Build a router from an endpoints JSON file (see the module docstring).
+
+        ``api_key_env`` names the environment variable holding the key; ``api_key``
+        gives it inline. Rate limits default to the GROQ_*_PER_MINUTE variables.
+        """
+        with open(path, 'r', encoding='utf-8') as endpoints_file:
+            entries = json.load(endpoints_file)
+        return cls.from_entries(entries, source=path, **kwargs)
+
+    @classmethod
+    def from_entries(cls, entries: Sequence[Dict], source: str = 'endpoints', **kwargs) -> 'ProviderRouter':
+        """
+        Build a router from endpoint entries as found in an endpoints file.
+
+        Args:
+            entries (Sequence[Dict]): Endpoint entries (see the module docstring)
+            source (str): Where the entries come from, used in error messages
+        """
+        endpoints = []
+        for position, entry in enumerate(entries, start=1):
+            unknown = set(entry) - set(ENDPOINT_OPTIONS)
+            if unknown:
+                raise ValueError(f"Endpoint {position} in {source} has unknown keys: {', '.join(sorted(unknown))}")
+            if not entry.get('model'):
+                raise ValueError(f"Endpoint {position} in {source} has no model")
+            provider = entry.get('provider', 'groq')
+            api_key = entry.get('api_key') or os.getenv(entry.get('api_key_env', f"{provider.upper()}_API_KEY"))
+            if not api_key:
+                raise ValueError(f"Endpoint {position} in {source} has no API key "
+                                 f"(set {entry.get('api_key_env', f'{provider.upper()}_API_KEY')})")
+            rate_limiter = RateLimiter(
+                requests_per_minute=float(entry.get('requests_per_minute', os.getenv('GROQ_REQUESTS_PER_MINUTE', '30'))),
+                tokens_per_minute=float(entry.get('tokens_per_minute', os.getenv('GROQ_TOKENS_PER_MINUTE', '6000')))
+            )
+            prices = None
+            if 'input_price' in entry or 'output_price' in entry:
+                prices = (float(entry.get('input_price', 0)), float(entry.get('output_price', 0)))
+            endpoints.append(Endpoint(
+                entry.get('name', f"{provider}-{position}"),
+                entry['model'],
+                client_factory(provider, api_key, entry.get('base_url')),
+                rate_limiter=rate_limiter,
+                temperature=float(entry.get('temperature', 0.3)),
+                prices=prices
+            ))
+        return cls(endpoints, **kwargs)
+
+    def choose(self, tokens: int = 0, exclude: Sequence[str] = ()) -> Endpoint:
+        """
+        Pick the endpoint for the next request.
+
+        Args:
+            tokens (int): Tokens the request reserves, for the rate-limiter wait estimate
+            exclude (Sequence[str]): Endpoint names to avoid (e.g. ones that already failed)
+
+        Returns:
+            Endpoint: An idle endpoint due for a probe, else the healthy endpoint with
+            the lowest expected time; unhealthy or excluded ones only if nothing else is left
+        """
+        now = time.monotonic()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.name not in exclude] or self.endpoints
+        healthy = [endpoint for endpoint in candidates if endpoint.healthy(now)] or candidates
+        with self._lock:
+            for endpoint in healthy:
+                if endpoint.latency_ewma is not None and now - endpoint.last_used > self.probe_interval:
+                    endpoint.last_used = now
+                    return endpoint
+        return min(healthy, key=lambda endpoint: endpoint.expected_seconds(tokens))
+
+    def complete(self, messages: List[Dict], max_tokens: int, reserved_tokens: int, description: str = 'request',
+                 max_retries: int = 3, request_slot: Callable[[], ContextManager] = nullcontext) -> Completion:
+        """
+        Send a request, failing over and retrying as needed.
+
+        429 responses are retried on whichever endpoint is then expected to
+        answer first; other errors move the request to an endpoint that has
+        not failed it yet, and are raised once none is left.
+
+        Args:
+            messages (List[Dict]): Chat messages
+            max_tokens (int): Completion token limit
+            reserved_tokens (int): Tokens reserved on the rate limiter (prompt + max_tokens)
+            description (str): What the request is for, used in log messages
+            max_retries (int): Retries after the first attempt
+            request_slot (Callable[[], ContextManager]): Held around every attempt
+
+        Returns:
+            Completion: The first successful answer
+        """
+        failed = set()
+        for attempt in range(max_retries + 1):
+            endpoint = self.choose(reserved_tokens, exclude=failed)
+            try:
+                with request_slot():
+                    completion = self._attempt(endpoint, messages, max_tokens, reserved_tokens)
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                if _is_rate_limit_error(e):
+                    logger.info(f"Rate limited on {description} by {endpoint.name}, "
+                                f"retrying ({attempt + 1}/{max_retries})")
+                elif len(failed) + 1 < len(self.endpoints):
+                    failed.add(endpoint.name)
+                    with self._lock:
+                        self.failovers += 1
+                    logger.warning(f"{endpoint.name} failed on {description} ({e}), failing over")
+                else:
+                    raise
+                continue
+            completion.retries = attempt
+            return completion
+
+    def _attempt(self, primary: Endpoint, messages: List[Dict], max_tokens: int,
+                 reserved_tokens: int) -> Completion:
+        """One attempt on ``primary``, hedged to a second endpoint if it runs past its p95."""
+        p95 = primary.p95() if self.hedge else None
+        if p95 is None:
+            return primary.complete(messages, max_tokens, reserved_tokens)
+
+        executor = self._hedge_executor()
+        first = executor.submit(primary.complete, messages, max_tokens, reserved_tokens)
+        done, _ = wait([first], timeout=max(p95, self.hedge_min_delay))
+        if done:
+            return first.result()
+
+        backup = self.choose(reserved_tokens, exclude=[primary.name])
+        if backup is primary:
+            return first.result()
+        with self._lock:
+            self.hedges += 1
+        logger.debug(f"Hedging request to {backup.name}; {primary.name} is past its p95 of {p95:.2f}s")
+        pending = {first, executor.submit(backup.complete, messages, max_tokens, reserved_tokens)}
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The slower copy keeps running; its answer only feeds the endpoint stats
+                    completion = future.result()
+                    completion.hedged = True
+                    return completion
+                error = error or future.exception()
+        raise error
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._hedge_workers,
+                                                    thread_name_prefix='hedge')
+            return self._executor
+
+    def stats(self) -> Dict:
+        """Per-endpoint statistics plus hedge and failover counts."""
+        with self._lock:
+            hedges, failovers = self.hedges, self.failovers
+        return {
+            'endpoints': [endpoint.stats() for endpoint in self.endpoints],
+            'hedges': hedges,
+            'failovers': failovers
+        }
+
+    def close(self):
+        """Stop the hedge threads; requests still running finish in the background."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,296 @@
+"""
+Adaptive rate limiting for LLM API calls.
+
+A RateLimiter holds two token buckets, one for requests per minute and one
+for tokens per minute, and is safe to share between threads. Throughput is
+adjusted AIMD-style: every successful call nudges the allowed rate up
+additively, every 429 cuts it multiplicatively and pauses dispatch for the
+provider's Retry-After period. Rate-limit response headers, when present,
+are used to keep the local buckets in sync with the provider's own view.
+"""
+
+import os
+import re
+import threading
+import time
+import logging
+from typing import Callable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate-limit duration header into seconds.
+
+    Accepts plain numbers ("12", "0.5") as well as the compound form used by
+    Groq and OpenAI reset headers ("2m59.56s", "120ms", "1h2m").
+
+    Args:
+        value (Optional[str]): Raw header value
+
+    Returns:
+        Optional[float]: Duration in seconds, or None if it can't be parsed
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts or ''.join(n + u for n, u in parts) != value:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _header(headers: Optional[Mapping], name: str) -> Optional[str]:
+    """Case-insensitive header lookup that tolerates plain dicts."""
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    if value is None and isinstance(headers, dict):
+        name = name.lower()
+        value = next((value for key, value in headers.items() if str(key).lower() == name), None)
+    return value
+
+
+def _header_int(headers: Optional[Mapping], name: str) -> Optional[int]:
+    value = _header(headers, name)
+    try:
+        return int(float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously at ``per_minute / 60`` per second.
+
+    Not thread-safe on its own; RateLimiter serializes access to its buckets.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            per_minute (float): Bucket capacity and refill rate per minute
+            clock (Callable[[], float]): Monotonic clock returning seconds
+        """
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.per_minute = float(per_minute)
+        self.scale = 1.0
+        self._clock = clock
+        self._level = float(per_minute)
+        self._updated = clock()
+
+    @property
+    def rate(self) -> float:
+        """Current refill rate in units per second."""
+        return self.per_minute * self.scale / 60.0
+
+    @property
+    def level(self) -> float:
+        """Units currently available, after refilling."""
+        self._refill()
+        return self._level
+
+    def _refill(self):
+        now = self._clock()
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._level = min(self.per_minute, self._level + elapsed * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if available now)."""
+        self._refill()
+        # A single request larger than the bucket could never be admitted;
+        # let it through once the bucket is full instead of blocking forever.
+        amount = min(amount, self.per_minute)
+        if self._level >= amount:
+            return 0.0
+        return (amount - self._level) / self.rate
+
+    def consume(self, amount: float):
+        """Take ``amount`` units out of the bucket (the level may go negative)."""
+        self._refill()
+        self._level -= amount
+
+    def refund(self, amount: float):
+        """Return unused units to the bucket."""
+        self._refill()
+        self._level = min(self.per_minute, self._level + amount)
+
+    def sync(self, remaining: float):
+        """Clamp the local level to what the provider reports as remaining."""
+        self._refill()
+        self._level = min(self._level, float(remaining))
+
+
+class RateLimiter:
+    """
+    Thread-safe request and token rate limiter with AIMD rate adjustment.
+
+    Callers reserve capacity with ``acquire`` before each API call and report
+    the outcome with ``record_success`` or ``record_rate_limited``.
+    """
+
+    def __init__(self, requests_per_minute: float = 30, tokens_per_minute: float = 6000,
+                 increase_step: float = 0.05, decrease_factor: float = 0.5,
+                 min_scale: float = 0.05, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            requests_per_minute (float): Request ceiling per minute
+            tokens_per_minute (float): Token ceiling per minute (prompt + completion)
+            increase_step (float): Additive rate increase per successful call,
+                as a fraction of the ceiling
+            decrease_factor (float): Multiplicative rate decrease on a 429
+            min_scale (float): Lowest fraction of the ceiling the rate may drop to
+            clock (Callable[[], float]): Monotonic clock, injectable for simulation
+            sleep (Callable[[float], None]): Sleep function, injectable for simulation
+        """
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1")
+
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.min_scale = min_scale
+        self.throttled_seconds = 0.0
+        self.rate_limited_count = 0
+
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'RateLimiter':
+        """Build a limiter from GROQ_REQUESTS_PER_MINUTE / GROQ_TOKENS_PER_MINUTE."""
+        return cls(
+            requests_per_minute=float(os.getenv('GROQ_REQUESTS_PER_MINUTE', '30')),
+            tokens_per_minute=float(os.getenv('GROQ_TOKENS_PER_MINUTE', '6000')),
+            **kwargs
+        )
+
+    @property
+    def scale(self) -> float:
+        """Current fraction of the configured ceiling being used."""
+        return self.requests.scale
+
+    def _set_scale(self, scale: float):
+        scale = min(1.0, max(self.min_scale, scale))
+        self.requests.scale = scale
+        self.tokens.scale = scale
+
+    def wait_time(self, tokens: int = 0) -> float:
+        """Seconds ``acquire(tokens)`` would block for right now, without reserving anything."""
+        with self._lock:
+            return max(
+                0.0,
+                self._blocked_until - self._clock(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens)
+            )
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Block until one request and ``tokens`` tokens can be spent.
+
+        Args:
+            tokens (int): Estimated tokens for the call (prompt + max completion)
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                wait = max(
+                    self._blocked_until - now,
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(tokens)
+                )
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(tokens)
+                    self.throttled_seconds += waited
+                    return waited
+            self._sleep(wait)
+            waited += wait
+
+    def record_success(self, headers: Optional[Mapping] = None,
+                       reserved_tokens: int = 0, used_tokens: Optional[int] = None):
+        """
+        Report a successful call.
+
+        Args:
+            headers (Optional[Mapping]): Response headers, if available
+            reserved_tokens (int): Tokens passed to ``acquire`` for this call
+            used_tokens (Optional[int]): Actual tokens billed (``usage.total_tokens``)
+        """
+        with self._lock:
+            if used_tokens is not None and reserved_tokens > used_tokens:
+                self.tokens.refund(reserved_tokens - used_tokens)
+            elif used_tokens is not None and used_tokens > reserved_tokens:
+                self.tokens.consume(used_tokens - reserved_tokens)
+            self._set_scale(self.scale + self.increase_step)
+            self._apply_headers(headers)
+
+    def record_rate_limited(self, headers: Optional[Mapping] = None,
+                            default_delay: float = 1.0) -> float:
+        """
+        Report a 429 response: cut the rate and pause dispatch.
+
+        Args:
+            headers (Optional[Mapping]): Response headers of the 429 response
+            default_delay (float): Pause used when no Retry-After is given
+
+        Returns:
+            float: Seconds dispatch is paused for
+        """
+        with self._lock:
+            self.rate_limited_count += 1
+            self._set_scale(self.scale * self.decrease_factor)
+            delay = parse_duration(_header(headers, 'retry-after'))
+            if delay is None:
+                delay = default_delay
+            self._blocked_until = max(self._blocked_until, self._clock() + delay)
+            self._apply_headers(headers)
+            logger.warning(f"Rate limited; pausing {delay:.2f}s and scaling rate to {self.scale:.0%}")
+            return delay
+
+    def _apply_headers(self, headers: Optional[Mapping]):
+        """Sync the buckets with x-ratelimit-* headers. Caller holds the lock."""
+        if not headers:
+            return
+
+        # The token limit is per minute on both Groq and OpenAI, so it can
+        # replace the configured ceiling. The request limit is per day on
+        # Groq, so only its remaining/reset pair is used.
+        token_limit = _header_int(headers, 'x-ratelimit-limit-tokens')
+        if token_limit and token_limit != self.tokens.per_minute:
+            self.tokens.per_minute = float(token_limit)
+
+        remaining_tokens = _header_int(headers, 'x-ratelimit-remaining-tokens')
+        if remaining_tokens is not None:
+            self.tokens.sync(remaining_tokens)
+
+        remaining_requests = _header_int(headers, 'x-ratelimit-remaining-requests')
+        if remaining_requests == 0:
+            reset = parse_duration(_header(headers, 'x-ratelimit-reset-requests'))
+            if reset:
+                self._blocked_until = max(self._blocked_until, self._clock() + reset)
@@ -0,0 +1,231 @@
+"""
+Columnar store for summary results.
+
+Holding one dictionary per row (the same six keys every time, plus a
+timestamp formatted for every row) and then copying each one into a list
+for the sheet adds up at a million rows. ResultStore keeps one list per
+output column instead. The Processed Date is stored as a small integer per
+row that points to a timestamp formatted once per batch.
+
+The exports read the columns directly:
+
+- rows(): the sheet value matrix, as a lazy sequence; SheetWriter builds
+  row lists only for the slice it is turning into a request
+- to_dataframe(), to_arrow() and to_parquet(): pandas and pyarrow are
+  given the column lists as they are
+
+Indexing a store returns a SummaryRecord, a ``__slots__`` view of one row
+that reads like a result dictionary (``record['Status']``).
+
+Each row also records the model that wrote its summary (``record['Model']``).
+It isn't part of the output tab, but it travels with journals and shard
+results and ends up in the summary index.
+"""
+
+import threading
+from array import array
+from collections.abc import Sequence as SequenceABC
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+# Layout of the output tab; every column but the date is held as text
+OUTPUT_HEADERS = ['Company Name', 'Website', 'Source', 'Summary', 'Status', 'Processed Date']
+DATE_HEADER = 'Processed Date'
+TEXT_HEADERS = [header for header in OUTPUT_HEADERS if header != DATE_HEADER]
+# Kept per row but not written to the output tab
+MODEL_HEADER = 'Model'
+RECORD_HEADERS = OUTPUT_HEADERS + [MODEL_HEADER]
+_STORED_HEADERS = TEXT_HEADERS + [MODEL_HEADER]
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Rows materialized at a time when a store's rows are iterated
+_ITER_CHUNK = 500
+
+
+class SummaryRecord:
+    """
+    Read-only view of one row of a ResultStore, keyed by output header.
+    """
+
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store: 'ResultStore', index: int):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, header: str):
+        return self._store._value(header, self._index)
+
+    def get(self, header: str, default=None):
+        if header not in RECORD_HEADERS:
+            return default
+        return self._store._value(header, self._index)
+
+    def keys(self) -> List[str]:
+        return list(RECORD_HEADERS)
+
+    def to_dict(self) -> Dict:
+        """The row as a result dictionary, e.g. for JSON."""
+        return {header: self._store._value(header, self._index) for header in RECORD_HEADERS}
+
+    def __repr__(self) -> str:
+        return f"SummaryRecord({self.to_dict()!r})"
+
+
+class ResultRows(SequenceABC):
+    """
+    The sheet value matrix of a ResultStore, built slice by slice on access.
+    """
+
+    def __init__(self, store: 'ResultStore'):
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            columns = [self._store._slice(header, index) for header in OUTPUT_HEADERS]
+            return [list(row) for row in zip(*columns)]
+        return [self._store._value(header, index) for header in OUTPUT_HEADERS]
+
+    def __iter__(self) -> Iterator[List]:
+        for start in range(0, len(self), _ITER_CHUNK):
+            yield from self[start:start + _ITER_CHUNK]
+
+
+class ResultStore:
+    """
+    Column-backed result rows in input order.
+
+    Rows are filled by index, so worker threads can write their own rows
+    without coordination; only taking a batch timestamp is locked.
+    """
+
+    def __init__(self, size: int = 0):
+        """
+        Args:
+            size (int): Number of rows; every row starts out unfilled
+        """
+        self._columns: Dict[str, list] = {header: [None] * size for header in _STORED_HEADERS}
+        self._dates = array('I', [0]) * size
+        self._stamps: List[str] = []
+        self._stamp_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_results(cls, results: Iterable[Mapping]) -> 'ResultStore':
+        """Build a store from result dictionaries (or records) keyed by output header."""
+        store = cls()
+        for result in results:
+            for header in _STORED_HEADERS:
+                store._columns[header].append(result.get(header, ''))
+            store._dates.append(store._stamp_id(result.get(DATE_HEADER, '')))
+        return store
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def __getitem__(self, index: int) -> SummaryRecord:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('result index out of range')
+        return SummaryRecord(self, index)
+
+    def __iter__(self) -> Iterator[SummaryRecord]:
+        for index in range(len(self)):
+            yield SummaryRecord(self, index)
+
+    def stamp(self, when: Optional[datetime] = None) -> int:
+        """
+        Take the Processed Date for a batch of rows.
+
+        Returns:
+            int: Timestamp id to pass to ``set`` for every row of the batch
+        """
+        return self._stamp_id((when or datetime.now()).strftime(DATE_FORMAT))
+
+    def _stamp_id(self, text: str) -> int:
+        with self._lock:
+            stamp = self._stamp_ids.get(text)
+            if stamp is None:
+                stamp = self._stamp_ids[text] = len(self._stamps)
+                self._stamps.append(text)
+            return stamp
+
+    def set(self, index: int, company: Mapping, summary: str, status: str, stamp: int, model: str = ''):
+        """Fill row ``index`` from an input company, its summary, its status, a batch timestamp and the model."""
+        columns = self._columns
+        columns['Company Name'][index] = company.get('Company Name', '')
+        columns['Website'][index] = company.get('Website', '')
+        columns['Source'][index] = company.get('Source', '')
+        columns['Summary'][index] = summary
+        columns['Status'][index] = status
+        columns[MODEL_HEADER][index] = model
+        self._dates[index] = stamp
+
+    def set_result(self, index: int, result: Mapping):
+        """Fill row ``index`` from a result dictionary, e.g. one read back from a journal."""
+        for header in _STORED_HEADERS:
+            self._columns[header][index] = result.get(header, '')
+        self._dates[index] = self._stamp_id(result.get(DATE_HEADER, ''))
+
+    def filled(self, index: int) -> bool:
+        """Whether row ``index`` has been set."""
+        return self._columns['Company Name'][index] is not None
+
+    def extend(self, other: 'ResultStore'):
+        """Append the rows of another store."""
+        remap = array('I', (self._stamp_id(text) for text in other._stamps))
+        for header in _STORED_HEADERS:
+            self._columns[header].extend(other._columns[header])
+        self._dates.extend(remap[stamp] for stamp in other._dates)
+
+    def column(self, header: str) -> list:
+        """
+        Values of one output column, or of the Model column.
+
+        Text columns are returned without copying, so treat them as read-only.
+        """
+        if header == DATE_HEADER:
+            stamps = self._stamps
+            return [stamps[stamp] for stamp in self._dates]
+        return self._columns[header]
+
+    def _value(self, header: str, index: int):
+        if header == DATE_HEADER:
+            return self._stamps[self._dates[index]]
+        return self._columns[header][index]
+
+    def _slice(self, header: str, rows: slice) -> list:
+        if header == DATE_HEADER:
+            stamps = self._stamps
+            return [stamps[stamp] for stamp in self._dates[rows]]
+        return self._columns[header][rows]
+
+    def rows(self) -> ResultRows:
+        """The sheet value matrix (without the header), in OUTPUT_HEADERS order."""
+        return ResultRows(self)
+
+    def to_dataframe(self):
+        """The results as a pandas DataFrame with OUTPUT_HEADERS as columns."""
+        from data_sources import _require
+
+        pd = _require('pandas', 'pandas', "Exporting results to a DataFrame")
+        return pd.DataFrame({header: self.column(header) for header in OUTPUT_HEADERS}, columns=OUTPUT_HEADERS)
+
+    def to_arrow(self, schema=None):
+        """The results as a pyarrow Table of string columns."""
+        from data_sources import _require
+
+        pa = _require('pyarrow', 'pyarrow', "Exporting results to Arrow")
+        schema = schema or pa.schema([(header, pa.string()) for header in OUTPUT_HEADERS])
+        return pa.Table.from_pydict({header: self.column(header) for header in OUTPUT_HEADERS}, schema=schema)
+
+    def to_parquet(self, path: str):
+        """Write the results to a Parquet file."""
+        from data_sources import _require
+
+        parquet = _require('pyarrow.parquet', 'pyarrow', "Writing Parquet files")
+        parquet.write_table(self.to_arrow(), path)
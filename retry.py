@@ -0,0 +1,226 @@
+"""
+Retry queue with jittered exponential backoff, and a circuit breaker.
+
+A row whose summary request fails is not written out with an error message.
+It goes to a RetryQueue and is driven again once the main pass is done. Each
+retry waits an exponentially growing delay with jitter, so retries from many
+rows don't arrive at the provider in lockstep. Rows that still fail are
+written with Status "failed" and an empty summary. A later ``retry-failed``
+run re-processes only those rows.
+
+The CircuitBreaker watches the outcome of recent requests. When the error
+rate spikes (the provider is down or failing), it opens and holds back all
+dispatch for a cooldown. After the cooldown it lets one probe request
+through, and it closes again once a probe succeeds.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Hashable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """
+    How often and how long to wait before retrying a failed row.
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 2.0, max_delay: float = 60.0,
+                 rng: Callable[[], float] = random.random):
+        """
+        Args:
+            max_retries (int): Retries per row after its first failure
+            base_delay (float): Backoff before the first retry, in seconds
+            max_delay (float): Upper bound for the backoff
+            rng (Callable[[], float]): Uniform [0, 1) source, injectable for tests
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng
+
+    @classmethod
+    def from_env(cls) -> 'RetryPolicy':
+        """Build a policy from RETRY_ATTEMPTS / RETRY_BASE_SECONDS / RETRY_MAX_SECONDS."""
+        return cls(
+            max_retries=int(os.getenv('RETRY_ATTEMPTS', '3')),
+            base_delay=float(os.getenv('RETRY_BASE_SECONDS', '2')),
+            max_delay=float(os.getenv('RETRY_MAX_SECONDS', '60'))
+        )
+
+    def delay(self, retry: int) -> float:
+        """
+        Backoff before retry number ``retry`` (0 for the first retry).
+
+        "Equal jitter": half of the exponential delay is fixed and the other
+        half random, so retries always back off but are spread out.
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2 ** retry)
+        return ceiling / 2 + self._rng() * ceiling / 2
+
+
+class RetryQueue:
+    """
+    Thread-safe queue of failed work items, each due after its backoff.
+    """
+
+    def __init__(self, policy: RetryPolicy, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.policy = policy
+        self._clock = clock
+        self._sleep = sleep
+        self._heap: List[Tuple[float, int, Hashable, int]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
+
+    def push(self, item: Hashable, retries: int) -> bool:
+        """
+        Queue ``item`` for another attempt.
+
+        Args:
+            item (Hashable): The work item (e.g. a row index)
+            retries (int): Retries the item already had
+
+        Returns:
+            bool: False if the item has used up its retries and was not queued
+        """
+        if retries >= self.policy.max_retries:
+            return False
+        due = self._clock() + self.policy.delay(retries)
+        with self._lock:
+            heapq.heappush(self._heap, (due, next(self._order), item, retries + 1))
+        return True
+
+    def drain(self) -> Iterator[List[Tuple[Hashable, int]]]:
+        """
+        Yield the queued items as they come due, until the queue is empty.
+
+        Sleeps until the earliest item is due, then yields every item that is
+        due by then as ``(item, retry number)`` pairs. Items pushed while a
+        group is being processed are picked up by later iterations.
+        """
+        while True:
+            with self._lock:
+                if not self._heap:
+                    return
+                wait = self._heap[0][0] - self._clock()
+            if wait > 0:
+                self._sleep(wait)
+            with self._lock:
+                now = self._clock()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, item, retry = heapq.heappop(self._heap)
+                    due.append((item, retry))
+            if due:
+                yield due
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker over the error rate of recent requests.
+
+    Call ``before_request`` before each request; it blocks while the breaker
+    is open. Report the outcome with ``record_success`` or ``record_failure``.
+    """
+
+    def __init__(self, error_rate: float = 0.5, window: int = 20, min_requests: int = 10,
+                 cooldown_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            error_rate (float): Fraction of failed requests in the window that opens the breaker
+            window (int): Recent request outcomes considered
+            min_requests (int): Outcomes needed before the breaker can open
+            cooldown_seconds (float): How long the breaker stays open before a probe
+            clock (Callable[[], float]): Monotonic clock, injectable for tests
+        """
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.cooldown_seconds = cooldown_seconds
+        self.state = 'closed'
+        self.opened_count = 0
+
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._open_until = 0.0
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls) -> 'CircuitBreaker':
+        """Build a breaker from CIRCUIT_ERROR_RATE / CIRCUIT_COOLDOWN_SECONDS."""
+        return cls(
+            error_rate=float(os.getenv('CIRCUIT_ERROR_RATE', '0.5')),
+            cooldown_seconds=float(os.getenv('CIRCUIT_COOLDOWN_SECONDS', '30'))
+        )
+
+    def before_request(self) -> float:
+        """
+        Block until a request may be sent.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        start = self._clock()
+        with self._condition:
+            while True:
+                if self.state == 'closed':
+                    break
+                now = self._clock()
+                if self.state == 'open' and now >= self._open_until:
+                    # Let exactly one probe through; everyone else waits for its outcome
+                    self.state = 'half_open'
+                    logger.info("Circuit breaker half-open; sending a probe request")
+                    break
+                timeout = self._open_until - now if self.state == 'open' else None
+                self._condition.wait(timeout)
+        return self._clock() - start
+
+    def record_success(self):
+        """Report a successful request."""
+        with self._condition:
+            self._outcomes.append(True)
+            if self.state == 'half_open':
+                self.state = 'closed'
+                self._outcomes.clear()
+                logger.info("Circuit breaker closed; resuming dispatch")
+                self._condition.notify_all()
+
+    def record_failure(self) -> bool:
+        """
+        Report a failed request.
+
+        Returns:
+            bool: True if this failure opened the breaker
+        """
+        with self._condition:
+            self._outcomes.append(False)
+            if self.state == 'half_open':
+                self._open()
+                return True
+            if self.state == 'closed' and len(self._outcomes) >= self.min_requests:
+                failures = self._outcomes.count(False)
+                if failures / len(self._outcomes) >= self.error_rate:
+                    self._open()
+                    return True
+            return False
+
+    def _open(self):
+        """Open the breaker. Caller holds the condition."""
+        self.state = 'open'
+        self.opened_count += 1
+        self._open_until = self._clock() + self.cooldown_seconds
+        self._outcomes.clear()
+        logger.warning(f"Circuit breaker open: provider error rate spiked; pausing dispatch for "
+                       f"{self.cooldown_seconds:.0f}s")
+        self._condition.notify_all()
@@ -0,0 +1,123 @@
+"""
+Append-only progress journal for resumable summarization runs.
+
+Each completed row is appended to a JSON-lines file as soon as its summary
+comes back, so a crash or Ctrl-C only loses the rows that were in flight.
+A resumed run reloads the journal, keeps the rows that succeeded and whose
+input hasn't changed since, and only re-drives failed or missing rows.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_DIR = os.path.join('.company_summarizer', 'journals')
+
+
+def row_fingerprint(company: Dict) -> str:
+    """Hash the input columns of a row, so edited rows are not treated as done."""
+    values = [str(company.get(column, '')) for column in ('Company Name', 'Website', 'Source')]
+    return hashlib.sha256('\x1f'.join(values).encode('utf-8')).hexdigest()[:16]
+
+
+class RunJournal:
+    """
+    JSON-lines journal of completed rows, safe to append to from worker threads.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Journal file (created on first write)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    def for_run(cls, spreadsheet_url: str, input_sheet: str, output_sheet: str,
+                directory: str = DEFAULT_JOURNAL_DIR) -> 'RunJournal':
+        """
+        Return the journal for a spreadsheet and input/output tab pair.
+
+        Args:
+            spreadsheet_url (str): URL of the Google Spreadsheet
+            input_sheet (str): Name of the input worksheet
+            output_sheet (str): Name of the output worksheet
+            directory (str): Directory holding journal files
+
+        Returns:
+            RunJournal: Journal whose path is derived from the run's identity
+        """
+        run_id = hashlib.sha256(
+            '\x1f'.join([spreadsheet_url, input_sheet, output_sheet]).encode('utf-8')
+        ).hexdigest()[:16]
+        return cls(os.path.join(directory, f"{run_id}.jsonl"))
+
+    def load(self) -> Dict[int, Dict]:
+        """
+        Read the journal back.
+
+        Later entries for the same row replace earlier ones, and a partially
+        written last line (from a crash mid-write) is ignored.
+
+        Returns:
+            Dict[int, Dict]: Latest entry per row index
+        """
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+
+        with open(self.path, 'r', encoding='utf-8') as journal_file:
+            for line_number, line in enumerate(journal_file, 1):
+                try:
+                    entry = json.loads(line)
+                    entries[int(entry['row'])] = entry
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Skipping unreadable journal line {line_number} in {self.path}")
+        return entries
+
+    def record(self, row: int, fingerprint: str, result: Dict, ok: bool):
+        """
+        Append a completed row and flush it to disk.
+
+        Args:
+            row (int): Zero-based index of the row in the input sheet
+            fingerprint (str): row_fingerprint of the input row
+            result (Dict): Output row produced for it
+            ok (bool): Whether the summary was generated successfully
+        """
+        line = json.dumps({'row': row, 'fingerprint': fingerprint, 'ok': ok, 'result': result})
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def reset(self):
+        """Start a fresh journal, discarding any previous progress."""
+        self.discard()
+
+    def discard(self):
+        """Close and delete the journal, e.g. once its results are written out."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def close(self):
+        """Close the journal file, keeping it on disk for a later resume."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
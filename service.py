@@ -0,0 +1,365 @@
+"""
+Long-running summarization service.
+
+``cli.py serve`` keeps one CompanySummarizer warm (clients,
+connection pools, summary cache) behind a small HTTP API, on a TCP port or
+a Unix socket, so internal tools can ask for single companies without
+paying for process startup and authentication on every call.
+
+Requests go through three layers:
+
+- Cache hits are answered straight from the summary cache, in milliseconds.
+- Concurrent requests for the same company (same canonical name and same
+  canonical website domain; see canonicalize) share one upstream call
+  ("singleflight"). Different companies on a shared host such as
+  github.io are never merged.
+- Distinct companies requested within ``window_seconds`` of each other are
+  packed into one batched request of up to ``max_batch`` companies
+  (see CompanySummarizer.generate_batch_summaries).
+
+Generated summaries are added to the summarizer's summary index, if it has
+one, under the worksheet name ``service`` (INDEX_WORKSHEET).
+
+Endpoints:
+    GET  /summary?name=Acme&website=acme.com   one company
+    POST /summaries                            JSON list of {"Company Name": ..., "Website": ...}
+    GET  /health                               service counters
+    GET  /metrics                              Prometheus text format
+"""
+
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+from canonicalize import canonical_domain, canonical_name
+from results import ResultStore
+
+logger = logging.getLogger(__name__)
+
+# Worksheet name under which the service's summaries are indexed
+INDEX_WORKSHEET = 'service'
+
+
+def coalesce_key(company: Dict) -> str:
+    """
+    Key under which concurrent requests for the same company are merged.
+
+    Requests with equal keys have the same canonical name and domain, so
+    canonicalize.group_duplicates would also treat them as one company.
+    """
+    domain = canonical_domain(company.get('Website', ''))
+    return f"{canonical_name(company.get('Company Name', ''))}|{domain}"
+
+
+class MicroBatcher:
+    """
+    Collects items submitted within a short window and processes them together.
+
+    The first item of a batch starts a ``window_seconds`` timer; the batch is
+    dispatched when the timer runs out or ``max_batch`` items are waiting.
+    Batches are processed on a thread pool, so a slow batch doesn't hold up
+    the next one.
+    """
+
+    def __init__(self, process: Callable[[List], Sequence], max_batch: int = 8, window_seconds: float = 0.01,
+                 max_workers: int = 4):
+        """
+        Args:
+            process (Callable[[List], Sequence]): Turns a list of items into a list of
+                results in the same order; a None result fails that item
+            max_batch (int): Most items per batch
+            window_seconds (float): How long the first item of a batch waits for more items
+            max_workers (int): Batches processed at the same time
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.process = process
+        self.max_batch = max_batch
+        self.window_seconds = window_seconds
+        self.batches = 0
+        self.items = 0
+
+        self._pending: List = []
+        self._first_at = 0.0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch')
+        self._thread = threading.Thread(target=self._collect, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        """Queue ``item``; the returned future resolves to its result."""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append((item, future))
+            self._condition.notify()
+        return future
+
+    def _collect(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = self._first_at + self.window_seconds - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+                if self._pending:
+                    self._first_at = time.monotonic()
+                self.batches += 1
+                self.items += len(batch)
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: List):
+        try:
+            results = self.process([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if result is None:
+                future.set_exception(RuntimeError("Summary could not be generated"))
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Dispatch what is still waiting and stop accepting items."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+
+class SummaryService:
+    """
+    Thread-safe front end for on-demand summaries from a warm CompanySummarizer.
+    """
+
+    def __init__(self, summarizer, max_batch: int = 8, window_seconds: float = 0.01, timeout: float = 120.0):
+        """
+        Args:
+            summarizer (CompanySummarizer): Summarizer whose clients and cache are kept warm;
+                its ``max_workers`` caps the batches in flight
+            max_batch (int): Most companies per upstream request
+            window_seconds (float): How long a request waits for others to batch with
+            timeout (float): Seconds a caller waits for its summary
+        """
+        self.summarizer = summarizer
+        self.timeout = timeout
+        self.counters = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'failed': 0}
+        self.started_at = time.time()
+
+        self._batcher = MicroBatcher(self._process, max_batch, window_seconds, summarizer.max_workers)
+        self._in_flight: Dict[str, Future] = {}
+        # Reentrant: a future that is already done runs its callback (_forget) right away
+        self._lock = threading.RLock()
+
+    def warm(self):
+        """Build the LLM clients now, so the first request doesn't pay for it."""
+        for endpoint in self.summarizer.router.endpoints:
+            endpoint.client
+
+    def _process(self, companies: List[Dict]) -> List[Optional[str]]:
+        if len(companies) == 1:
+            summary, model = self.summarizer._generate_company_summary(companies[0])
+            summaries, models = [summary], [model]
+        else:
+            summaries, models = self.summarizer._generate_batch_summaries(companies)
+        self._index(companies, summaries, models)
+        return summaries
+
+    def _index(self, companies: List[Dict], summaries: List[Optional[str]], models: List[str]):
+        """Add the generated summaries to the summary index; a failure is logged, not raised."""
+        if getattr(self.summarizer, 'index', None) is None:
+            return
+        results = ResultStore(len(companies))
+        stamp = results.stamp()
+        for position, (company, summary, model) in enumerate(zip(companies, summaries, models)):
+            results.set(position, company, summary or '', 'ok' if summary else 'failed', stamp, model)
+        try:
+            self.summarizer._index_results(results, INDEX_WORKSHEET)
+        except Exception as e:
+            logger.warning(f"Could not index {len(companies)} summaries: {e}")
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def summarize(self, company: Dict) -> Dict:
+        """
+        Summarize one company, from the cache if possible.
+
+        Args:
+            company (Dict): 'Company Name' and optionally 'Website'
+
+        Returns:
+            Dict: The company's output row ('Company Name', 'Website', 'Summary',
+                'Status') plus 'cached', 'coalesced', 'seconds' and, if the
+                summary failed, 'error'
+        """
+        start = time.monotonic()
+        company = {'Company Name': str(company.get('Company Name') or '').strip(),
+                   'Website': str(company.get('Website') or '').strip()}
+        result = {**company, 'Summary': '', 'Status': 'ok', 'cached': False, 'coalesced': False}
+        self._count('requests')
+
+        summary = self.summarizer.cached_summary(company)
+        if summary is not None:
+            self._count('cache_hits')
+            result.update(Summary=summary, cached=True, seconds=round(time.monotonic() - start, 4))
+            return result
+
+        key = coalesce_key(company)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._batcher.submit(company)
+                self._in_flight[key] = future
+                future.add_done_callback(lambda done, key=key: self._forget(key, done))
+            else:
+                self.counters['coalesced'] += 1
+                result['coalesced'] = True
+
+        try:
+            result['Summary'] = future.result(self.timeout)
+        except FutureTimeoutError:
+            result.update(Status='failed', error=f"No summary within {self.timeout:g}s")
+        except Exception as e:
+            result.update(Status='failed', error=str(e))
+        if result['Status'] != 'ok':
+            self._count('failed')
+        result['seconds'] = round(time.monotonic() - start, 4)
+        return result
+
+    def _forget(self, key: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def health(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            in_flight = len(self._in_flight)
+        return {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'in_flight': in_flight,
+            'upstream_batches': self._batcher.batches,
+            'upstream_companies': self._batcher.items,
+            **counters
+        }
+
+    def close(self):
+        self._batcher.close()
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def _handler_class(service: SummaryService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send(self, status: int, payload, content_type: str = 'application/json'):
+            data = payload.encode('utf-8') if isinstance(payload, str) else json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == '/summary':
+                query = parse_qs(url.query)
+                name = (query.get('name') or [''])[0]
+                if not name.strip():
+                    self._send(400, {'error': "The 'name' query parameter is required"})
+                    return
+                result = service.summarize({'Company Name': name, 'Website': (query.get('website') or [''])[0]})
+                self._send(200 if result['Status'] == 'ok' else 502, result)
+            elif url.path == '/health':
+                self._send(200, service.health())
+            elif url.path == '/metrics':
+                self._send(200, service.summarizer.metrics.to_prometheus(), 'text/plain; version=0.0.4')
+            else:
+                self._send(404, {'error': f"Unknown path {url.path}"})
+
+        def do_POST(self):
+            if urlsplit(self.path).path != '/summaries':
+                self._send(404, {'error': f"Unknown path {self.path}"})
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                companies = json.loads(self.rfile.read(length) or b'[]')
+                if not isinstance(companies, list) or not all(isinstance(company, dict) for company in companies):
+                    raise ValueError("expected a JSON list of objects")
+            except ValueError as e:
+                self._send(400, {'error': f"Invalid request body: {e}"})
+                return
+            # Every company is submitted at once, so they share upstream batches
+            with ThreadPoolExecutor(max_workers=max(1, min(len(companies), 64))) as executor:
+                results = list(executor.map(service.summarize, companies))
+            self._send(200, results)
+
+    return Handler
+
+
+def make_server(service: SummaryService, host: str = '127.0.0.1', port: int = 8080,
+                socket_path: Optional[str] = None):
+    """
+    Build an HTTP server for ``service``, on a Unix socket if ``socket_path`` is given.
+
+    Returns:
+        socketserver.BaseServer: Call ``serve_forever`` on it
+    """
+    handler = _handler_class(service)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return _UnixServer(socket_path, handler)
+    return _TCPServer((host, port), handler)
+
+
+def serve(service: SummaryService, host: str = '127.0.0.1', port: int = 8080, socket_path: Optional[str] = None):
+    """Serve ``service`` until interrupted."""
+    server = make_server(service, host, port, socket_path)
+    address = socket_path or f"http://{server.server_address[0]}:{server.server_address[1]}"
+    logger.info(f"Summary service listening on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down summary service")
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -92,7 +92,7 @@ def main():
     print("\n" + "=" * 40)
     if all_good:
         print("🎉 Setup complete! You're ready to run the company summarizer.")
-        print("Run: python company_summarizer.py")
+        print("Run: python cli.py")
     else:
         print("⚠️  Setup incomplete. Please address the issues above.")
         print("Check the README.md for detailed setup instructions.")
@@ -0,0 +1,399 @@
+"""
+Lease-based work queue for running one summarization across several processes.
+
+The input sheet's rows are split into shards stored in a SQLite database.
+Any number of worker processes, each with its own Groq API key, claim a
+shard with a time-limited lease, summarize its rows and commit the results
+back to the database. A worker renews its lease while it works; if it
+crashes, the lease expires and another worker picks the shard up. Once every
+shard is done, one worker wins the merge lease and writes the output tab.
+
+All coordination goes through SQLite transactions (BEGIN IMMEDIATE), so the
+workers can be separate processes on one machine, or separate machines
+sharing a filesystem with working POSIX locks.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from results import ResultStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_DIR = os.path.join('.company_summarizer', 'shards')
+
+
+def default_worker_id() -> str:
+    """Identify this process as host-pid."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Shard:
+    """A claimed range of input sheet rows (1-based sheet row numbers, inclusive)."""
+
+    def __init__(self, shard_id: int, first_row: int, last_row: int, attempts: int):
+        self.id = shard_id
+        self.first_row = first_row
+        self.last_row = last_row
+        self.attempts = attempts
+
+
+class ShardQueue:
+    """
+    SQLite-backed shard queue with leases, shared by worker processes.
+
+    Each instance owns one connection; create one per process (or thread).
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): SQLite database file (created if missing)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS shards ('
+            ' id INTEGER PRIMARY KEY,'
+            ' first_row INTEGER NOT NULL,'
+            ' last_row INTEGER NOT NULL,'
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            ' worker TEXT,'
+            ' lease_expires REAL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' row INTEGER PRIMARY KEY,'
+            ' shard INTEGER NOT NULL,'
+            ' result TEXT NOT NULL)'
+        )
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    @classmethod
+    def for_run(cls, spreadsheet_url: str, input_sheet: str, output_sheet: str,
+                directory: str = DEFAULT_SHARD_DIR) -> 'ShardQueue':
+        """
+        Return the queue for a spreadsheet and input/output tab pair.
+
+        Workers started for the same run find the same queue.
+
+        Args:
+            spreadsheet_url (str): URL of the Google Spreadsheet
+            input_sheet (str): Name of the input worksheet
+            output_sheet (str): Name of the output worksheet
+            directory (str): Directory holding queue databases
+
+        Returns:
+            ShardQueue: Queue whose path is derived from the run's identity
+        """
+        run_id = hashlib.sha256(
+            '\x1f'.join([spreadsheet_url, input_sheet, output_sheet]).encode('utf-8')
+        ).hexdigest()[:16]
+        return cls(os.path.join(directory, f"{run_id}.sqlite"))
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction under an exclusive database lock."""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def _meta(self, conn, key: str) -> Optional[str]:
+        row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def plan(self, first_row: int, last_row: int, shard_size: int) -> bool:
+        """
+        Split sheet rows ``first_row``..``last_row`` into shards, unless a run is already planned.
+
+        An unfinished run is left alone so workers can join it; a run whose
+        output was already merged is cleared and planned afresh.
+
+        Args:
+            first_row (int): First sheet row with data
+            last_row (int): Last sheet row with data
+            shard_size (int): Rows per shard
+
+        Returns:
+            bool: True if a new plan was created
+        """
+        if shard_size < 1:
+            raise ValueError("shard_size must be at least 1")
+        with self._transaction() as conn:
+            if self._meta(conn, 'merged'):
+                conn.execute('DELETE FROM shards')
+                conn.execute('DELETE FROM results')
+                conn.execute('DELETE FROM meta')
+            if conn.execute('SELECT COUNT(*) FROM shards').fetchone()[0]:
+                return False
+            conn.executemany(
+                'INSERT INTO shards (first_row, last_row) VALUES (?, ?)',
+                [(start, min(start + shard_size - 1, last_row)) for start in range(first_row, last_row + 1, shard_size)]
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('planned_at', ?)", (str(time.time()),))
+            return True
+
+    def reset(self):
+        """Drop all shards and results, e.g. to restart a run from scratch."""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM shards')
+            conn.execute('DELETE FROM results')
+            conn.execute('DELETE FROM meta')
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Shard]:
+        """
+        Lease the next pending shard, or one whose lease has expired.
+
+        Args:
+            worker (str): Worker identifier
+            lease_seconds (float): Lease duration
+
+        Returns:
+            Optional[Shard]: The claimed shard, or None if none is available
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id, first_row, last_row, attempts FROM shards"
+                " WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)"
+                " ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1"
+                " WHERE id = ?",
+                (worker, now + lease_seconds, row[0])
+            )
+        if row[3]:
+            logger.info(f"Retrying shard {row[0]} (rows {row[1]}-{row[2]}), attempt {row[3] + 1}")
+        return Shard(row[0], row[1], row[2], row[3] + 1)
+
+    def renew(self, shard: Shard, worker: str, lease_seconds: float) -> bool:
+        """
+        Extend a lease.
+
+        Returns:
+            bool: False if the lease was lost (expired and claimed by another worker)
+        """
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE shards SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + lease_seconds, shard.id, worker)
+            ).rowcount
+        return bool(updated)
+
+    def complete(self, shard: Shard, results: Dict[int, Dict]) -> bool:
+        """
+        Commit a shard's results and mark it done.
+
+        Results are accepted even if the lease was lost meanwhile, unless
+        another worker already completed the shard.
+
+        Args:
+            shard (Shard): Shard returned by claim
+            results (Dict[int, Dict]): Result row per sheet row number
+
+        Returns:
+            bool: True if these results were stored
+        """
+        with self._transaction() as conn:
+            status = conn.execute('SELECT status FROM shards WHERE id = ?', (shard.id,)).fetchone()
+            if status is None or status[0] == 'done':
+                return False
+            conn.executemany(
+                'INSERT OR REPLACE INTO results (row, shard, result) VALUES (?, ?, ?)',
+                [(row, shard.id, json.dumps(result)) for row, result in results.items()]
+            )
+            conn.execute("UPDATE shards SET status = 'done', lease_expires = NULL WHERE id = ?", (shard.id,))
+            return True
+
+    def release(self, shard: Shard, worker: str):
+        """Give a shard back without results, e.g. after an error."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE shards SET status = 'pending', worker = NULL, lease_expires = NULL"
+                " WHERE id = ? AND worker = ? AND status = 'leased'",
+                (shard.id, worker)
+            )
+
+    def progress(self) -> Dict[str, int]:
+        """Count shards by status ('pending', 'leased', 'done')."""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM shards GROUP BY status').fetchall()
+        counts = {'pending': 0, 'leased': 0, 'done': 0}
+        counts.update(dict(rows))
+        return counts
+
+    def is_complete(self) -> bool:
+        counts = self.progress()
+        return counts['done'] > 0 and counts['pending'] == 0 and counts['leased'] == 0
+
+    def claim_merge(self, worker: str, lease_seconds: float) -> bool:
+        """
+        Take the merge lease once every shard is done.
+
+        Returns:
+            bool: True if this worker should write the output
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if self._meta(conn, 'merged'):
+                return False
+            pending = conn.execute("SELECT COUNT(*) FROM shards WHERE status != 'done'").fetchone()[0]
+            if pending:
+                return False
+            holder = self._meta(conn, 'merge_worker')
+            expires = float(self._meta(conn, 'merge_expires') or 0)
+            if holder and holder != worker and expires > now:
+                return False
+            conn.executemany(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                [('merge_worker', worker), ('merge_expires', str(now + lease_seconds))]
+            )
+            return True
+
+    def mark_merged(self):
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('merged', ?)", (str(time.time()),))
+
+    def is_merged(self) -> bool:
+        with self._lock:
+            return self._meta(self._conn, 'merged') is not None
+
+    def iter_results(self) -> Iterator[Dict]:
+        """Yield committed result rows in sheet row order."""
+        with self._lock:
+            rows = self._conn.execute('SELECT result FROM results ORDER BY row').fetchall()
+        for (result,) in rows:
+            yield json.loads(result)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LeaseKeeper:
+    """
+    Background thread that renews a shard lease while the shard is being worked on.
+
+    Use as a context manager around the work.
+    """
+
+    def __init__(self, queue: ShardQueue, shard: Shard, worker: str, lease_seconds: float):
+        self.queue = queue
+        self.shard = shard
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            if not self.queue.renew(self.shard, self.worker, self.lease_seconds):
+                self.lost = True
+                logger.warning(f"Lost the lease on shard {self.shard.id}; another worker may redo it")
+                return
+
+    def __enter__(self) -> 'LeaseKeeper':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(summarizer, queue: ShardQueue, input_sheet: str, worker: Optional[str] = None,
+               lease_seconds: float = 300, wait: bool = True, poll_seconds: float = 5.0) -> int:
+    """
+    Claim and summarize shards until none are left.
+
+    Args:
+        summarizer: CompanySummarizer with the spreadsheet already open
+        queue (ShardQueue): Shared queue for the run
+        input_sheet (str): Name of the input worksheet
+        worker (Optional[str]): Worker identifier; host-pid if omitted
+        lease_seconds (float): Lease duration; renewed every third of it while working
+        wait (bool): When all remaining shards are leased by others, keep polling
+            (to pick up shards of crashed workers) until the run is complete
+        poll_seconds (float): Delay between polls while waiting
+
+    Returns:
+        int: Number of shards this worker completed
+    """
+    worker = worker or default_worker_id()
+    completed = 0
+    while True:
+        shard = queue.claim(worker, lease_seconds)
+        if shard is None:
+            if not wait or queue.is_complete():
+                return completed
+            time.sleep(poll_seconds)
+            continue
+
+        logger.info(f"Worker {worker}: processing shard {shard.id} (rows {shard.first_row}-{shard.last_row})")
+        try:
+            with LeaseKeeper(queue, shard, worker, lease_seconds):
+                rows = summarizer.read_row_range(input_sheet, shard.first_row, shard.last_row)
+                results = summarizer._summarize_companies([company for _, company in rows])
+        except BaseException:
+            queue.release(shard, worker)
+            raise
+
+        if queue.complete(shard, {row: result.to_dict() for (row, _), result in zip(rows, results)}):
+            completed += 1
+        counts = queue.progress()
+        logger.info(f"Worker {worker}: shard {shard.id} done; {counts['done']} done, "
+                    f"{counts['leased']} in progress, {counts['pending']} pending")
+
+
+def merge_results(summarizer, queue: ShardQueue, output_sheet: str, write_mode: str = 'replace',
+                  worker: Optional[str] = None, lease_seconds: float = 300) -> bool:
+    """
+    Write the merged results to the output worksheet if every shard is done.
+
+    Only one worker performs the merge; the others return False.
+
+    Args:
+        summarizer: CompanySummarizer with the spreadsheet already open
+        queue (ShardQueue): Shared queue for the run
+        output_sheet (str): Name of the output worksheet
+        write_mode (str): See CompanySummarizer.write_summaries_to_sheet
+        worker (Optional[str]): Worker identifier; host-pid if omitted
+        lease_seconds (float): How long other workers wait before taking over a stalled merge
+
+    Returns:
+        bool: True if this call wrote the output
+    """
+    worker = worker or default_worker_id()
+    if not queue.claim_merge(worker, lease_seconds):
+        return False
+    results = ResultStore.from_results(queue.iter_results())
+    logger.info(f"Worker {worker}: merging {len(results)} results into {output_sheet}")
+    summarizer.write_summaries_to_sheet(results, output_sheet, mode=write_mode)
+    queue.mark_merged()
+    return True
@@ -0,0 +1,271 @@
+"""
+Batched writes of summary rows to a Google Sheets worksheet.
+
+SheetWriter turns values and header formatting into spreadsheets.batchUpdate
+requests (updateCells, appendCells, autoResizeDimensions, ...) so that a write
+costs as few API round trips as possible. Requests are grouped into calls
+that stay under a payload size limit, which keeps very large outputs within
+the API's request size and per-minute write quota.
+
+Three write modes are supported:
+
+- replace: clear the tab and rewrite it
+- append: add rows after the existing data
+- upsert: update rows whose key matches (only if their values changed) and
+  append the rest; the key is a name column, optionally with the canonical
+  domain of a website column
+"""
+
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from canonicalize import canonical_domain
+from summary_cache import normalize_name
+
+logger = logging.getLogger(__name__)
+
+
+def row_key(name: str, website: str = '') -> Tuple[str, str]:
+    """Key under which upsert matches rows: the normalized name and the website's canonical domain."""
+    return normalize_name(name), canonical_domain(website)
+
+WRITE_MODES = ('replace', 'append', 'upsert')
+
+# Google recommends keeping batchUpdate payloads at or below 2 MB
+DEFAULT_MAX_PAYLOAD_BYTES = 2 * 1024 * 1024
+
+# Rows per updateCells/appendCells request before payload-size grouping
+ROWS_PER_REQUEST = 500
+
+
+def _cell(value) -> Dict:
+    """Build CellData for a raw value."""
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": '' if value is None else str(value)}}
+
+
+def _row_data(values: Sequence, cell_format: Optional[Dict] = None) -> Dict:
+    cells = [_cell(value) for value in values]
+    if cell_format:
+        for cell in cells:
+            cell["userEnteredFormat"] = cell_format
+    return {"values": cells}
+
+
+def group_requests(requests: Iterable[Dict], max_payload_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES) -> Iterator[List[Dict]]:
+    """
+    Group batchUpdate requests into lists whose JSON payload stays under a size limit.
+
+    A single request larger than the limit is sent on its own.
+
+    Args:
+        requests (Iterable[Dict]): batchUpdate request objects, in order
+        max_payload_bytes (int): Payload size limit per batchUpdate call
+
+    Yields:
+        List[Dict]: Requests for one batchUpdate call
+    """
+    group, size = [], 0
+    for request in requests:
+        request_size = len(json.dumps(request, separators=(',', ':'))) + 1
+        if group and size + request_size > max_payload_bytes:
+            yield group
+            group, size = [], 0
+        group.append(request)
+        size += request_size
+    if group:
+        yield group
+
+
+class SheetWriter:
+    """
+    Write rows to one worksheet with batched batchUpdate calls.
+    """
+
+    def __init__(self, spreadsheet, worksheet, headers: Sequence[str], header_format: Optional[Dict] = None,
+                 max_payload_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES):
+        """
+        Args:
+            spreadsheet (gspread.Spreadsheet): Spreadsheet holding the worksheet
+            worksheet (gspread.Worksheet): Worksheet to write to
+            headers (Sequence[str]): Header row
+            header_format (Optional[Dict]): CellFormat applied to the header row
+            max_payload_bytes (int): Payload size limit per batchUpdate call
+        """
+        self.spreadsheet = spreadsheet
+        self.worksheet = worksheet
+        self.headers = list(headers)
+        self.header_format = header_format
+        self.max_payload_bytes = max_payload_bytes
+        self.api_calls = 0
+
+    @property
+    def sheet_id(self) -> int:
+        return self.worksheet.id
+
+    def _header_request(self) -> Dict:
+        fields = "userEnteredValue"
+        if self.header_format:
+            fields += ",userEnteredFormat(" + ",".join(self.header_format) + ")"
+        return {
+            "updateCells": {
+                "start": {"sheetId": self.sheet_id, "rowIndex": 0, "columnIndex": 0},
+                "rows": [_row_data(self.headers, self.header_format)],
+                "fields": fields
+            }
+        }
+
+    def _update_requests(self, start_row: int, rows: Sequence[Sequence]) -> Iterator[Dict]:
+        """updateCells requests writing ``rows`` starting at zero-based ``start_row``."""
+        for offset in range(0, len(rows), ROWS_PER_REQUEST):
+            yield {
+                "updateCells": {
+                    "start": {"sheetId": self.sheet_id, "rowIndex": start_row + offset, "columnIndex": 0},
+                    "rows": [_row_data(row) for row in rows[offset:offset + ROWS_PER_REQUEST]],
+                    "fields": "userEnteredValue"
+                }
+            }
+
+    def _append_requests(self, rows: Sequence[Sequence]) -> Iterator[Dict]:
+        """appendCells requests, which also grow the grid as needed."""
+        for offset in range(0, len(rows), ROWS_PER_REQUEST):
+            yield {
+                "appendCells": {
+                    "sheetId": self.sheet_id,
+                    "rows": [_row_data(row) for row in rows[offset:offset + ROWS_PER_REQUEST]],
+                    "fields": "userEnteredValue"
+                }
+            }
+
+    def _auto_resize_request(self) -> Dict:
+        return {
+            "autoResizeDimensions": {
+                "dimensions": {
+                    "sheetId": self.sheet_id,
+                    "dimension": "COLUMNS",
+                    "startIndex": 0,
+                    "endIndex": len(self.headers)
+                }
+            }
+        }
+
+    def _send(self, requests: Iterable[Dict]):
+        for group in group_requests(requests, self.max_payload_bytes):
+            self.spreadsheet.batch_update({"requests": group})
+            self.api_calls += 1
+
+    def replace(self, rows: Sequence[Sequence], auto_resize: bool = True):
+        """
+        Clear the worksheet and write the header and ``rows``.
+
+        Args:
+            rows (Sequence[Sequence]): Data rows, without the header
+            auto_resize (bool): Whether to auto-resize the columns afterwards
+        """
+        def requests():
+            # Size the grid to fit the data exactly, which also drops old rows
+            yield {
+                "updateSheetProperties": {
+                    "properties": {"sheetId": self.sheet_id, "gridProperties": {"rowCount": len(rows) + 1}},
+                    "fields": "gridProperties.rowCount"
+                }
+            }
+            yield {"updateCells": {"range": {"sheetId": self.sheet_id}, "fields": "userEnteredValue"}}
+            yield self._header_request()
+            yield from self._update_requests(1, rows)
+            if auto_resize:
+                yield self._auto_resize_request()
+
+        self._send(requests())
+
+    def auto_resize(self):
+        """Auto-resize the header columns to fit their contents."""
+        self._send([self._auto_resize_request()])
+
+    def write_header(self):
+        """Write (or rewrite) the header row and its formatting."""
+        self._send([self._header_request()])
+
+    def append(self, rows: Sequence[Sequence], include_header: bool = False):
+        """
+        Append ``rows`` after the last row with data.
+
+        Args:
+            rows (Sequence[Sequence]): Data rows, without the header
+            include_header (bool): Whether to write the header row first, for an empty worksheet
+        """
+        def requests():
+            if include_header:
+                yield self._header_request()
+            yield from self._append_requests(rows)
+
+        self._send(requests())
+
+    def upsert(self, rows: Sequence[Sequence], key_column: int = 0,
+               ignore_columns: Sequence[int] = (), domain_column: Optional[int] = None) -> Dict[str, int]:
+        """
+        Update rows whose key matches an existing row and append the others.
+
+        Existing rows are only rewritten if a compared column changed, so an
+        incremental run touches just the rows that are actually different.
+        Reading the current contents costs one extra API call.
+
+        Args:
+            rows (Sequence[Sequence]): Data rows, without the header
+            key_column (int): Column identifying a row (matched case- and whitespace-insensitively)
+            ignore_columns (Sequence[int]): Columns ignored when deciding whether a row changed
+            domain_column (Optional[int]): Website column whose canonical domain is part of
+                the key, so companies that share a name but not a website stay separate rows
+
+        Returns:
+            Dict[str, int]: Counts of 'updated', 'appended' and 'unchanged' rows
+        """
+        existing = self.worksheet.get_all_values()
+        self.api_calls += 1
+
+        def key(values: Sequence) -> Tuple[str, str]:
+            website = values[domain_column] if domain_column is not None and len(values) > domain_column else ''
+            return row_key(values[key_column], website)
+
+        positions = {}
+        for row_index, values in enumerate(existing[1:], 1):
+            if len(values) > key_column and values[key_column]:
+                positions.setdefault(key(values), row_index)
+
+        def differs(old: Sequence, new: Sequence) -> bool:
+            for column, value in enumerate(new):
+                if column in ignore_columns:
+                    continue
+                old_value = old[column] if column < len(old) else ''
+                if str(old_value) != ('' if value is None else str(value)):
+                    return True
+            return False
+
+        updates, appends, unchanged = [], [], 0
+        for row in rows:
+            row_index = positions.get(key(row))
+            if row_index is None:
+                appends.append(row)
+            elif differs(existing[row_index], row):
+                updates.append((row_index, row))
+            else:
+                unchanged += 1
+
+        # A header from an older layout (e.g. before a column was added) is rewritten too
+        stale_header = not existing or existing[0][:len(self.headers)] != list(self.headers)
+
+        def requests():
+            if stale_header:
+                yield self._header_request()
+            for row_index, row in updates:
+                yield from self._update_requests(row_index, [row])
+            yield from self._append_requests(appends)
+
+        if updates or appends or stale_header:
+            self._send(requests())
+
+        return {'updated': len(updates), 'appended': len(appends), 'unchanged': unchanged}
@@ -0,0 +1,451 @@
+"""
+Offline run-time simulator driven by recorded request traces.
+
+With LATENCY_TRACE_PATH set, every summary request a run sends is appended
+to a JSON-lines trace by LatencyTrace: the companies it covered, its
+latency and token usage, how many 429s it got before it went through, and
+whether it failed. ``cli.py simulate`` replays such traces to
+predict the wall time, throughput and error rate of a run of any size, for
+a sweep of concurrency and batch sizes, in seconds and without spending
+any quota.
+
+A Simulation is an approximate model of CompanySummarizer._summarize_companies,
+written separately so it can run on a virtual clock without threads. It
+models:
+
+- ``max_workers`` requests in flight, each covering ``batch_size``
+  companies; cached companies are skipped and duplicates share a request
+- the real RateLimiter (AIMD rate, Retry-After pauses) and CompletionBudget
+  deciding when a request may go out and how many tokens it reserves
+- 429s from a provider quota (``provider_rpm``/``provider_tpm``, real
+  TokenBuckets) or, without one, at the rate recorded in the trace; they are
+  retried up to ``max_retries`` times like ProviderRouter.complete
+- a failed batch falling back to single-company requests, and companies that
+  still fail going through the real RetryQueue and RetryPolicy backoff
+
+It does not model the circuit breaker and its waits, re-requests after a
+response cut off at ``max_tokens`` (``finish_reason == 'length'``), failover
+and hedging across several endpoints, cascade escalation, or summaries
+rejected by validation. Predictions are for a single endpoint and model;
+runs that lean on those features take longer than predicted.
+tests/test_simulator.py checks the model against real runs with a stand-in
+router.
+
+Latency and token counts are drawn from trace requests of the same size.
+Other sizes are scaled from the nearest recorded size, with latency
+adjusted by the per-completion-token time fitted over the trace. Only the
+per-company part of a prompt is scaled: the system prompt and template
+instructions (``prompt_overhead``) are sent once per request, which is
+where batching saves tokens.
+"""
+
+import bisect
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from prompts import CompletionBudget
+from rate_limiter import RateLimiter, TokenBucket
+from retry import RetryPolicy, RetryQueue
+
+logger = logging.getLogger(__name__)
+
+# How long a provider takes to answer with a 429
+RATE_LIMIT_RESPONSE_SECONDS = 0.05
+
+# Shortest virtual sleep while waiting on the rate limiter
+MIN_WAIT_SECONDS = 1e-6
+
+# Sweep used when no concurrency or batch sizes are given
+DEFAULT_CONCURRENCY = (1, 2, 4, 8, 16)
+DEFAULT_BATCH_SIZES = (1, 5, 10)
+
+
+class LatencyTrace:
+    """
+    Thread-safe JSON-lines recorder of summary requests.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['LatencyTrace']:
+        """Build a recorder for LATENCY_TRACE_PATH; None if it is unset or empty."""
+        path = os.getenv('LATENCY_TRACE_PATH')
+        return cls(path) if path else None
+
+    def record(self, companies: int, latency: Optional[float] = None, prompt_tokens: Optional[int] = None,
+               completion_tokens: Optional[int] = None, rate_limited: int = 0, throttled: float = 0.0,
+               error: Optional[str] = None):
+        """
+        Append one request to the trace.
+
+        Args:
+            companies (int): Companies the request covered
+            latency (Optional[float]): Seconds the successful attempt took
+            prompt_tokens (Optional[int]): Prompt tokens reported in the response usage
+            completion_tokens (Optional[int]): Completion tokens reported in the response usage
+            rate_limited (int): 429 responses (or failovers) before the request went through
+            throttled (float): Seconds the request waited on the rate limiter
+            error (Optional[str]): ``rate_limited`` or ``error`` if the request failed
+        """
+        entry = {'companies': companies, 'latency': round(latency, 4) if latency is not None else None,
+                 'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'rate_limited': rate_limited, 'throttled': round(throttled, 4), 'error': error}
+        line = json.dumps(entry)
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class TraceModel:
+    """
+    Request latency, token and failure statistics loaded from a trace.
+    """
+
+    def __init__(self, samples: Sequence[Tuple[int, float, int, int]], rate_limit_rate: float = 0.0,
+                 error_rate: float = 0.0, seconds_per_token: Optional[float] = None,
+                 prompt_overhead: Optional[Tuple[int, int, int]] = None):
+        """
+        Args:
+            samples (Sequence[Tuple[int, float, int, int]]): ``(companies, latency,
+                prompt_tokens, completion_tokens)`` of successful requests
+            rate_limit_rate (float): Fraction of attempts answered with a 429
+            error_rate (float): Fraction of requests that failed with another error
+            seconds_per_token (Optional[float]): Latency per completion token, used to
+                scale samples to other request sizes; fitted from ``samples`` if omitted
+            prompt_overhead (Optional[Tuple[int, int, int]]): Prompt tokens sent once
+                per single-company and per batched request (system prompt, template
+                instructions, chat format), and the extra tokens per company of a
+                batch entry (see company_summarizer.prompt_overhead_tokens). Only the
+                rest of a prompt is scaled with the number of companies; without
+                it the whole prompt is
+        """
+        if not samples:
+            raise ValueError("The trace has no successful requests to replay")
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.prompt_overhead = prompt_overhead
+        self._by_size: Dict[int, List[Tuple[float, int, int]]] = {}
+        for companies, latency, prompt_tokens, completion_tokens in samples:
+            self._by_size.setdefault(companies, []).append((latency, prompt_tokens, completion_tokens))
+        self._sizes = sorted(self._by_size)
+        self.requests = len(samples)
+        self.seconds_per_token = seconds_per_token if seconds_per_token is not None \
+            else _fit_seconds_per_token(samples)
+
+    @classmethod
+    def load(cls, path: str, prompt_overhead: Optional[Tuple[int, int, int]] = None) -> 'TraceModel':
+        """Read a LatencyTrace file; ``prompt_overhead`` is passed on to the model."""
+        samples, attempts, rate_limited, requests, errors = [], 0, 0, 0, 0
+        with open(path, 'r', encoding='utf-8') as trace_file:
+            for number, line in enumerate(trace_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"Line {number} of {path} is not valid JSON: {e}") from e
+                requests += 1
+                retries = int(entry.get('rate_limited') or 0)
+                attempts += retries + 1
+                rate_limited += retries
+                if entry.get('error') == 'rate_limited':
+                    rate_limited += 1
+                elif entry.get('error'):
+                    errors += 1
+                elif entry.get('latency') is not None:
+                    samples.append((max(1, int(entry.get('companies') or 1)), float(entry['latency']),
+                                    int(entry.get('prompt_tokens') or 0), int(entry.get('completion_tokens') or 0)))
+        return cls(samples, rate_limited / attempts if attempts else 0.0, errors / requests if requests else 0.0,
+                   prompt_overhead=prompt_overhead)
+
+    def sample(self, rng: random.Random, companies: int) -> Tuple[float, int, int]:
+        """
+        Draw ``(latency, prompt_tokens, completion_tokens)`` for a request of ``companies`` companies.
+        """
+        position = bisect.bisect_left(self._sizes, companies)
+        candidates = self._sizes[max(0, position - 1):position + 1]
+        size = min(candidates, key=lambda recorded: abs(recorded - companies))
+        latency, prompt_tokens, completion_tokens = rng.choice(self._by_size[size])
+        if size == companies:
+            return latency, prompt_tokens, completion_tokens
+        scale = companies / size
+        scaled_completion = round(completion_tokens * scale)
+        latency = max(0.0, latency + self.seconds_per_token * (scaled_completion - completion_tokens))
+        fixed, entry = self._prompt_overhead(size)
+        per_company = max(0.0, (prompt_tokens - fixed) / size - entry)
+        fixed, entry = self._prompt_overhead(companies)
+        return latency, fixed + round((per_company + entry) * companies), scaled_completion
+
+    def _prompt_overhead(self, companies: int) -> Tuple[int, int]:
+        """Tokens sent once per request of ``companies`` companies, and extra tokens per company."""
+        if self.prompt_overhead is None:
+            return 0, 0
+        single, batched, entry = self.prompt_overhead
+        return (single, 0) if companies == 1 else (batched, entry)
+
+    def summary(self) -> Dict:
+        latencies = sorted(latency for requests in self._by_size.values() for latency, _, _ in requests)
+        return {
+            'requests': self.requests,
+            'sizes': {size: len(self._by_size[size]) for size in self._sizes},
+            'latency_p50': round(latencies[len(latencies) // 2], 4),
+            'rate_limit_rate': round(self.rate_limit_rate, 4),
+            'error_rate': round(self.error_rate, 4),
+            'seconds_per_token': round(self.seconds_per_token, 6)
+        }
+
+
+def _fit_seconds_per_token(samples: Sequence[Tuple[int, float, int, int]]) -> float:
+    """Least-squares slope of latency over completion tokens, or latency per token if that can't be fitted."""
+    tokens = [completion for _, _, _, completion in samples]
+    latencies = [latency for _, latency, _, _ in samples]
+    mean_tokens = sum(tokens) / len(tokens)
+    mean_latency = sum(latencies) / len(latencies)
+    variance = sum((value - mean_tokens) ** 2 for value in tokens)
+    if variance > 0:
+        slope = sum((t - mean_tokens) * (l - mean_latency) for t, l in zip(tokens, latencies)) / variance
+        if slope > 0:
+            return slope
+    return mean_latency / mean_tokens if mean_tokens else 0.0
+
+
+class VirtualClock:
+    """Simulated monotonic clock; ``sleep`` advances it instead of waiting."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += max(0.0, seconds)
+
+
+class Simulation:
+    """
+    One simulated run of ``rows`` rows at a given concurrency and batch size.
+    """
+
+    def __init__(self, model: TraceModel, rows: int, max_workers: int = 4, batch_size: int = 1,
+                 requests_per_minute: float = 30, tokens_per_minute: float = 6000,
+                 provider_rpm: Optional[float] = None, provider_tpm: Optional[float] = None,
+                 max_retries: int = 3, retry_policy: Optional[RetryPolicy] = None,
+                 duplicate_rate: float = 0.0, cache_hit_rate: float = 0.0, seed: int = 1):
+        """
+        Args:
+            model (TraceModel): Recorded requests to replay
+            rows (int): Input rows
+            max_workers (int): Requests in flight (MAX_CONCURRENCY)
+            batch_size (int): Companies per request (BATCH_SIZE)
+            requests_per_minute (float): Client-side rate limit (GROQ_REQUESTS_PER_MINUTE)
+            tokens_per_minute (float): Client-side token limit (GROQ_TOKENS_PER_MINUTE)
+            provider_rpm (Optional[float]): The provider's real request quota; a request
+                over it gets a 429 with the matching Retry-After
+            provider_tpm (Optional[float]): The provider's real token quota
+            max_retries (int): Retries after a 429 per request
+            retry_policy (Optional[RetryPolicy]): Backoff for companies whose requests failed
+            duplicate_rate (float): Fraction of rows that duplicate another row
+            cache_hit_rate (float): Fraction of distinct companies already in the summary cache
+            seed (int): Seed for the random draws, so runs are repeatable
+        """
+        self.model = model
+        self.rows = rows
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.companies = max(1, round(rows * (1 - duplicate_rate))) if rows else 0
+
+        self.clock = VirtualClock()
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute, clock=self.clock, sleep=self.clock.sleep)
+        self.budget = CompletionBudget()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._rng = random.Random(seed)
+        self._cached = [self._rng.random() < cache_hit_rate for _ in range(self.companies)]
+        self._quota = None
+        if provider_rpm or provider_tpm:
+            self._quota = (TokenBucket(provider_rpm, self.clock) if provider_rpm else None,
+                           TokenBucket(provider_tpm, self.clock) if provider_tpm else None)
+
+        self.counters = {'requests': 0, 'rate_limited': 0, 'request_errors': 0, 'companies_retried': 0,
+                         'companies_failed': 0, 'throttled_seconds': 0.0, 'busy_seconds': 0.0}
+
+    def _provider_rejects(self, tokens: int) -> Optional[float]:
+        """Retry-After of a 429 for a request of ``tokens`` tokens, or None if it is accepted."""
+        if self._quota is None:
+            return 0.0 if self._rng.random() < self.model.rate_limit_rate else None
+        requests, token_bucket = self._quota
+        wait = max(requests.wait_time(1) if requests else 0.0,
+                   token_bucket.wait_time(tokens) if token_bucket else 0.0)
+        if wait > 0:
+            return wait
+        if requests:
+            requests.consume(1)
+        if token_bucket:
+            token_bucket.consume(tokens)
+        return None
+
+    def _request(self, companies: int) -> Iterator[float]:
+        """One summary request (yields virtual sleeps); returns True if it succeeded."""
+        self.counters['requests'] += 1
+        latency, prompt_tokens, completion_tokens = self.model.sample(self._rng, companies)
+        reserved = prompt_tokens + self.budget.max_tokens(companies)
+        for attempt in range(self.max_retries + 1):
+            # RateLimiter.acquire, without blocking the simulation
+            while True:
+                wait = self.limiter.wait_time(reserved)
+                if wait <= 0:
+                    break
+                # Rounded up, so float rounding in the bucket refill can't stall the clock
+                wait = max(wait, MIN_WAIT_SECONDS)
+                self.counters['throttled_seconds'] += wait
+                yield wait
+            self.limiter.acquire(reserved)
+
+            retry_after = self._provider_rejects(prompt_tokens + completion_tokens)
+            if retry_after is not None:
+                self.counters['rate_limited'] += 1
+                yield RATE_LIMIT_RESPONSE_SECONDS
+                self.limiter.record_rate_limited({'retry-after': f"{retry_after:.3f}"} if retry_after else None)
+                continue
+
+            self.counters['busy_seconds'] += latency
+            yield latency
+            if self._rng.random() < self.model.error_rate:
+                self.counters['request_errors'] += 1
+                return False
+            self.limiter.record_success(reserved_tokens=reserved, used_tokens=prompt_tokens + completion_tokens)
+            self.budget.observe(completion_tokens, companies)
+            return True
+        return False
+
+    def _summarize(self, batch: List[int], retries: int, failures: RetryQueue) -> Iterator[float]:
+        """Model of the ``summarize`` step of _summarize_companies for one batch of companies."""
+        uncached = [company for company in batch if not self._cached[company]]
+        failed = []
+        if len(uncached) > 1:
+            if not (yield from self._request(len(uncached))):
+                # generate_batch_summaries falls back to one request per company
+                for company in uncached:
+                    if not (yield from self._request(1)):
+                        failed.append(company)
+        elif uncached:
+            if not (yield from self._request(1)):
+                failed.append(uncached[0])
+        for company in failed:
+            if not failures.push(company, retries):
+                self.counters['companies_failed'] += 1
+
+    def _dispatch(self, work: List[Tuple[List[int], int]], failures: RetryQueue):
+        """Run ``(batch, retries)`` pairs, up to ``max_workers`` at a time, until all are done."""
+        pending = deque(work)
+        events: List[Tuple[float, int, Iterator[float]]] = []
+        order = itertools.count()
+
+        def advance(task: Iterator[float]) -> bool:
+            try:
+                delay = next(task)
+            except StopIteration:
+                return False
+            heapq.heappush(events, (self.clock.now + delay, next(order), task))
+            return True
+
+        def start_next():
+            while pending:
+                batch, retries = pending.popleft()
+                if advance(self._summarize(batch, retries, failures)):
+                    return
+
+        for _ in range(min(self.max_workers, len(pending))):
+            start_next()
+        while events:
+            due, _, task = heapq.heappop(events)
+            self.clock.now = max(self.clock.now, due)
+            if not advance(task):
+                start_next()
+
+    def run(self) -> Dict:
+        """
+        Simulate the run.
+
+        Returns:
+            Dict: Predicted wall time, throughput and error rate, plus request,
+                429, retry and throttling counts
+        """
+        failures = RetryQueue(self.retry_policy, clock=self.clock, sleep=self.clock.sleep)
+        representatives = list(range(self.companies))
+        self._dispatch([(representatives[i:i + self.batch_size], 0)
+                        for i in range(0, len(representatives), self.batch_size)], failures)
+        for due in failures.drain():
+            self.counters['companies_retried'] += len(due)
+            self._dispatch([([company], retries) for company, retries in due], failures)
+
+        seconds = self.clock.now
+        failed_rows = round(self.counters['companies_failed'] * self.rows / self.companies) if self.companies else 0
+        return {
+            'max_concurrency': self.max_workers,
+            'batch_size': self.batch_size,
+            'rows': self.rows,
+            'wall_seconds': round(seconds, 2),
+            'rows_per_second': round(self.rows / seconds, 2) if seconds else None,
+            'error_rate': round(failed_rows / self.rows, 4) if self.rows else 0.0,
+            'failed_rows': failed_rows,
+            'requests': self.counters['requests'],
+            'rate_limited': self.counters['rate_limited'],
+            'request_errors': self.counters['request_errors'],
+            'companies_retried': self.counters['companies_retried'],
+            'throttled_seconds': round(self.counters['throttled_seconds'], 2),
+            'utilization': round(self.counters['busy_seconds'] / (seconds * self.max_workers), 3) if seconds else None,
+            'final_rate_scale': round(self.limiter.scale, 3)
+        }
+
+
+def sweep(model: TraceModel, rows: int, concurrency: Sequence[int] = DEFAULT_CONCURRENCY,
+          batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+          progress: Optional[Callable[[Dict], None]] = None, **options) -> List[Dict]:
+    """
+    Simulate every combination of concurrency and batch size.
+
+    Args:
+        model (TraceModel): Recorded requests to replay
+        rows (int): Input rows
+        concurrency (Sequence[int]): Values of ``max_workers`` to try
+        batch_sizes (Sequence[int]): Values of ``batch_size`` to try
+        progress (Optional[Callable[[Dict], None]]): Called with each result as it is ready
+        **options: Further Simulation arguments (rate limits, quotas, retries, seed, ...)
+
+    Returns:
+        List[Dict]: Simulation results, fewest errors and fastest first
+    """
+    results = []
+    for batch_size in batch_sizes:
+        for max_workers in concurrency:
+            result = Simulation(model, rows, max_workers=max_workers, batch_size=batch_size, **options).run()
+            if progress is not None:
+                progress(result)
+            results.append(result)
+    # Settings within a tenth of a minute of each other count as equally fast; fewer workers win
+    return sorted(results, key=lambda result: (result['error_rate'], round(result['wall_seconds'] / 60, 1),
+                                               result['max_concurrency'], result['batch_size']))
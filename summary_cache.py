@@ -0,0 +1,205 @@
+"""
+Persistent on-disk cache of generated company summaries.
+
+Summaries are stored in SQLite, keyed on the normalized company name and
+website, the model name and a hash of the prompt template, so changing any
+of those naturally invalidates old entries. Entries expire after a TTL and
+the least recently used ones are evicted once the cache grows past its size
+bound.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join('.company_summarizer', 'summary_cache.sqlite')
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case a company name and collapse runs of whitespace."""
+    return ' '.join(str(name or '').lower().split())
+
+
+def normalize_website(website: str) -> str:
+    """Reduce a website to its host and path, without scheme, www. or trailing slash."""
+    website = str(website or '').strip().lower()
+    website = re.sub(r'^[a-z][a-z0-9+.-]*://', '', website)
+    if website.startswith('www.'):
+        website = website[4:]
+    return website.rstrip('/')
+
+
+def make_cache_key(company_name: str, website: str, model: str, prompt_hash: str) -> str:
+    """
+    Build the cache key for a company summary.
+
+    Args:
+        company_name (str): Company name as read from the sheet
+        website (str): Company website as read from the sheet
+        model (str): Model used to generate the summary
+        prompt_hash (str): Hash of the prompt template
+
+    Returns:
+        str: Hex digest identifying the summary
+    """
+    parts = [normalize_name(company_name), normalize_website(website), model, prompt_hash]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    """
+    SQLite-backed summary cache with TTL expiry and LRU eviction.
+
+    A single connection is shared between threads and guarded by a lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: Optional[float] = 30 * 24 * 3600,
+                 max_entries: Optional[int] = 100_000):
+        """
+        Args:
+            path (str): SQLite database file (created if missing)
+            ttl_seconds (Optional[float]): Entry lifetime; None disables expiry
+            max_entries (Optional[int]): Size bound; None disables eviction
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS summaries ('
+            ' key TEXT PRIMARY KEY,'
+            ' summary TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed_at)')
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional['SummaryCache']:
+        """
+        Build a cache from SUMMARY_CACHE_PATH / SUMMARY_CACHE_TTL_DAYS / SUMMARY_CACHE_MAX_ENTRIES.
+
+        Returns None when SUMMARY_CACHE_PATH is set to an empty string.
+        """
+        path = os.getenv('SUMMARY_CACHE_PATH', DEFAULT_CACHE_PATH)
+        if not path:
+            return None
+        ttl_days = float(os.getenv('SUMMARY_CACHE_TTL_DAYS', '30'))
+        max_entries = int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', '100000'))
+        return cls(
+            path,
+            ttl_seconds=ttl_days * 24 * 3600 if ttl_days > 0 else None,
+            max_entries=max_entries if max_entries > 0 else None
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a summary, refreshing its LRU position on a hit.
+
+        Args:
+            key (str): Key from make_cache_key
+
+        Returns:
+            Optional[str]: Cached summary, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT summary, created_at FROM summaries WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute('DELETE FROM summaries WHERE key = ?', (key,))
+                self._conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute('UPDATE summaries SET accessed_at = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def contains(self, key: str) -> bool:
+        """Check for an unexpired entry without touching hit counters or LRU order."""
+        with self._lock:
+            row = self._conn.execute('SELECT created_at FROM summaries WHERE key = ?', (key,)).fetchone()
+        return row is not None and (self.ttl_seconds is None or time.time() - row[0] <= self.ttl_seconds)
+
+    def put(self, key: str, summary: str):
+        """
+        Store a summary, evicting least recently used entries if over the size bound.
+
+        The entry count is read inside the write transaction rather than
+        tracked in memory, so the bound holds when several processes (e.g.
+        shard workers) share the cache file.
+
+        Args:
+            key (str): Key from make_cache_key
+            summary (str): Generated summary
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO summaries (key, summary, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, summary, now, now)
+            )
+
+            if self.max_entries is not None:
+                # The INSERT holds the database's write lock, so no other process can change the count now
+                excess = self._count() - self.max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        'DELETE FROM summaries WHERE key IN '
+                        '(SELECT key FROM summaries ORDER BY accessed_at LIMIT ?)',
+                        (excess,)
+                    )
+                    self.evictions += excess
+            self._conn.commit()
+
+    def _count(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current entry count."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': self._count()
+            }
+
+    def clear(self):
+        """Remove every cached summary."""
+        with self._lock:
+            self._conn.execute('DELETE FROM summaries')
+            self._conn.commit()
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,301 @@
+"""
+Local, searchable index of finished summaries.
+
+Without an index, a finished summary exists only as a cell in some output
+tab, and finding one company across many spreadsheets means paging through
+each of them over the Sheets API. SummaryIndex keeps a copy of every
+successful result in SQLite, one row per company and output tab: company
+name, domain, source, summary, model and processed date. It supports:
+
+- exact and prefix lookup by company name (canonicalized, so "Acme Inc."
+  finds "ACME") and by website domain, both backed by B-tree indexes
+- full-text search over summaries and names with SQLite's FTS5, ranked by
+  bm25 (a LIKE scan when the SQLite build lacks FTS5)
+- streaming export of the whole index to CSV or Parquet, chunk by chunk
+
+A later run that writes the same company to the same tab replaces its row,
+so the index holds the latest summary per company and tab.
+"""
+
+import csv
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+from canonicalize import canonical_domain, canonical_name
+from data_sources import _require, file_format
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join('.company_summarizer', 'summary_index.sqlite')
+
+# Columns returned by lookups and written by exports, in order
+INDEX_COLUMNS = ['Company Name', 'Domain', 'Website', 'Source', 'Summary', 'Model', 'Processed Date',
+                 'Spreadsheet', 'Worksheet']
+_SELECT = ('SELECT company, domain, website, source, summary, model, processed_at, spreadsheet, worksheet '
+           'FROM results')
+
+# Rows fetched per chunk by exports
+EXPORT_CHUNK_ROWS = 10_000
+
+# Columns written by add(), in order
+_ROW_COLUMNS = ('spreadsheet, worksheet, name_key, domain, company, website, source, summary, model, processed_at, '
+                'indexed_at')
+_SAME_KEY = ('results.spreadsheet = staged.spreadsheet AND results.worksheet = staged.worksheet '
+             'AND results.name_key = staged.name_key AND results.domain = staged.domain')
+
+# Greater than any character, so [prefix, prefix + _PREFIX_END) is a prefix range
+_PREFIX_END = '\U0010ffff'
+
+
+class SummaryIndex:
+    """
+    SQLite index of summaries with name/domain lookup and full-text search.
+
+    A single connection is shared between threads and guarded by a lock.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        """
+        Args:
+            path (str): SQLite database file (created if missing)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' id INTEGER PRIMARY KEY,'
+            ' spreadsheet TEXT NOT NULL,'
+            ' worksheet TEXT NOT NULL,'
+            ' name_key TEXT NOT NULL,'
+            ' domain TEXT NOT NULL,'
+            ' company TEXT NOT NULL,'
+            ' website TEXT NOT NULL,'
+            ' source TEXT NOT NULL,'
+            ' summary TEXT NOT NULL,'
+            ' model TEXT NOT NULL,'
+            ' processed_at TEXT NOT NULL,'
+            ' indexed_at REAL NOT NULL,'
+            ' UNIQUE (spreadsheet, worksheet, name_key, domain))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_name ON results (name_key)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS results_domain ON results (domain)')
+        self._conn.execute(f'CREATE TEMP TABLE staged ({_ROW_COLUMNS})')
+        self.full_text = self._create_full_text()
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional['SummaryIndex']:
+        """
+        Build an index from SUMMARY_INDEX_PATH.
+
+        Returns None when SUMMARY_INDEX_PATH is set to an empty string.
+        """
+        path = os.getenv('SUMMARY_INDEX_PATH', DEFAULT_INDEX_PATH)
+        return cls(path) if path else None
+
+    def _create_full_text(self) -> bool:
+        """Create the FTS5 table over names and summaries; False if this SQLite has no FTS5."""
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5("
+                "company, summary, content='results', content_rowid='id')"
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite has no FTS5 ({e}); summary search falls back to a slower LIKE scan")
+            return False
+        return True
+
+    def add(self, results: Iterable[Mapping], spreadsheet: str = '', worksheet: str = '', model: str = '',
+            status_ok: str = 'ok') -> int:
+        """
+        Index the successful rows of a result set.
+
+        Args:
+            results (Iterable[Mapping]): Result rows keyed by output header, e.g. a ResultStore
+            spreadsheet (str): Spreadsheet URL (or '' for files)
+            worksheet (str): Output worksheet name or file path
+            model (str): Model for rows that don't name the model that wrote them
+                (no ``Model`` value)
+            status_ok (str): Status value of successful rows; other rows are skipped
+
+        Returns:
+            int: Rows indexed
+        """
+        now = time.time()
+        rows = []
+        for result in results:
+            if result.get('Status', status_ok) != status_ok or not result.get('Summary'):
+                continue
+            company = str(result.get('Company Name') or '')
+            website = str(result.get('Website') or '')
+            rows.append((spreadsheet, worksheet, canonical_name(company), canonical_domain(website), company,
+                         website, str(result.get('Source') or ''), result['Summary'],
+                         str(result.get('Model') or model),
+                         str(result.get('Processed Date') or ''), now))
+        if not rows:
+            return 0
+        # Rows are staged and merged with set-based statements; the FTS
+        # entries of replaced rows are removed before the upsert and added
+        # back after it. Per-row triggers would make indexing several times slower.
+        replaced = f"SELECT results.id FROM staged JOIN results ON {_SAME_KEY}"
+        with self._lock:
+            try:
+                self._conn.executemany(f'INSERT INTO staged ({_ROW_COLUMNS}) VALUES ({", ".join("?" * 11)})', rows)
+                if self.full_text:
+                    self._conn.execute(
+                        "INSERT INTO results_fts (results_fts, rowid, company, summary)"
+                        f" SELECT 'delete', id, company, summary FROM results WHERE id IN ({replaced})"
+                    )
+                self._conn.execute(
+                    f'INSERT INTO results ({_ROW_COLUMNS}) SELECT {_ROW_COLUMNS} FROM staged WHERE true'
+                    ' ON CONFLICT (spreadsheet, worksheet, name_key, domain) DO UPDATE SET'
+                    ' company = excluded.company, website = excluded.website, source = excluded.source,'
+                    ' summary = excluded.summary, model = excluded.model, processed_at = excluded.processed_at,'
+                    ' indexed_at = excluded.indexed_at'
+                )
+                if self.full_text:
+                    self._conn.execute(
+                        "INSERT INTO results_fts (rowid, company, summary)"
+                        f" SELECT id, company, summary FROM results WHERE id IN ({replaced})"
+                    )
+                self._conn.execute('DELETE FROM staged')
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+        return len(rows)
+
+    def _query(self, sql: str, parameters) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, parameters).fetchall()
+        return [dict(zip(INDEX_COLUMNS, row)) for row in rows]
+
+    def lookup(self, name: Optional[str] = None, domain: Optional[str] = None, prefix: bool = False,
+               limit: int = 50) -> List[Dict]:
+        """
+        Find summaries by company name and/or website domain.
+
+        Args:
+            name (Optional[str]): Company name, canonicalized like duplicate detection
+            domain (Optional[str]): Website or domain, e.g. "https://www.acme.com" or "acme.com"
+            prefix (bool): Match names and domains starting with the given values
+            limit (int): Most rows returned
+
+        Returns:
+            List[Dict]: Matching rows keyed by INDEX_COLUMNS, most recently processed first
+        """
+        conditions, parameters = [], []
+        for column, value in (('name_key', canonical_name(name) if name else None),
+                              ('domain', canonical_domain(domain) if domain else None)):
+            if value is None:
+                continue
+            if prefix:
+                conditions.append(f'{column} >= ? AND {column} < ?')
+                parameters += [value, value + _PREFIX_END]
+            else:
+                conditions.append(f'{column} = ?')
+                parameters.append(value)
+        if not conditions:
+            raise ValueError("lookup needs a name or a domain")
+        return self._query(f"{_SELECT} WHERE {' AND '.join(conditions)} ORDER BY processed_at DESC LIMIT ?",
+                           parameters + [limit])
+
+    def search(self, text: str, limit: int = 50) -> List[Dict]:
+        """
+        Full-text search over company names and summaries.
+
+        Args:
+            text (str): Words to search for (FTS5 query syntax, e.g. ``solar OR wind``,
+                ``"battery recycling"`` or ``batter*``)
+            limit (int): Most rows returned
+
+        Returns:
+            List[Dict]: Matching rows keyed by INDEX_COLUMNS, best match first
+        """
+        if not self.full_text:
+            pattern = f"%{text}%"
+            return self._query(f"{_SELECT} WHERE summary LIKE ? OR company LIKE ? LIMIT ?", (pattern, pattern, limit))
+        return self._query(
+            f"{_SELECT} JOIN (SELECT rowid, rank FROM results_fts WHERE results_fts MATCH ? ORDER BY rank LIMIT ?)"
+            f" AS matches ON results.id = matches.rowid ORDER BY matches.rank",
+            (text, limit)
+        )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def iter_chunks(self, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[List[tuple]]:
+        """
+        Yield every indexed row, in INDEX_COLUMNS order, ``chunk_rows`` at a time.
+
+        Reads go through a separate connection, so an export doesn't hold
+        the lock (or block writers, thanks to WAL) while it runs.
+        """
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(f"{_SELECT} ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+
+    def export(self, path: str, chunk_rows: int = EXPORT_CHUNK_ROWS) -> int:
+        """
+        Write the whole index to a .csv or .parquet file, one chunk at a time.
+
+        Args:
+            path (str): Output file; the format follows its extension
+            chunk_rows (int): Rows held in memory at a time
+
+        Returns:
+            int: Rows written
+        """
+        kind = file_format(path)
+        if kind == 'csv':
+            return self._export_csv(path, chunk_rows)
+        if kind == 'parquet':
+            return self._export_parquet(path, chunk_rows)
+        raise ValueError(f"Cannot export to {path}; use a .csv or .parquet file")
+
+    def _export_csv(self, path: str, chunk_rows: int) -> int:
+        written = 0
+        with open(path, 'w', newline='', encoding='utf-8') as output_file:
+            writer = csv.writer(output_file)
+            writer.writerow(INDEX_COLUMNS)
+            for rows in self.iter_chunks(chunk_rows):
+                writer.writerows(rows)
+                written += len(rows)
+        return written
+
+    def _export_parquet(self, path: str, chunk_rows: int) -> int:
+        pa = _require('pyarrow', 'pyarrow', "Writing Parquet files")
+        parquet = _require('pyarrow.parquet', 'pyarrow', "Writing Parquet files")
+        schema = pa.schema([(name, pa.string()) for name in INDEX_COLUMNS])
+        written = 0
+        with parquet.ParquetWriter(path, schema) as writer:
+            for rows in self.iter_chunks(chunk_rows):
+                columns = list(zip(*rows))
+                writer.write_table(pa.Table.from_pydict(
+                    {name: list(values) for name, values in zip(INDEX_COLUMNS, columns)}, schema=schema
+                ))
+                written += len(rows)
+        return written
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
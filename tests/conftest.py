@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from company_summarizer import CompanySummarizer  # noqa: E402
+from provider_router import Completion  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+from retry import CircuitBreaker, RetryPolicy  # noqa: E402
+
+# A summary that passes SummaryValidator
+GOOD = "Acme builds industrial robots for car factories and sells them to manufacturers across Europe."
+
+
+class FakeEndpoint:
+    def __init__(self, name):
+        self.name = name
+        self.model = f"{name}-model"
+
+    def cost(self, prompt_tokens, completion_tokens):
+        return 0.0
+
+
+class FakeRouter:
+    """
+    Stands in for a ProviderRouter: answers every request with a fixed text,
+    or with ``answer(messages)``, after ``delay`` seconds.
+    """
+
+    def __init__(self, name, answer, delay=0.0):
+        self.endpoints = [FakeEndpoint(name)]
+        self.answer = answer
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, messages, max_tokens, reserved_tokens, description='request', max_retries=3,
+                 request_slot=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        answer = self.answer(messages) if callable(self.answer) else self.answer
+        return Completion(answer, self.endpoints[0].name, latency=self.delay or 0.01, prompt_tokens=10,
+                          completion_tokens=10, model=self.endpoints[0].model)
+
+
+def answer_with(summary_for):
+    """Answer single and batched prompts with ``summary_for(company name)``."""
+    def answer(messages):
+        prompt = messages[-1]['content']
+        entries = [json.loads(line) for line in prompt.splitlines() if line.startswith('{"id"')]
+        if not entries:
+            name = next(line.split(':', 1)[1].strip() for line in prompt.splitlines()
+                        if line.startswith('Company:'))
+            return summary_for(name)
+        return json.dumps([{'id': entry['id'], 'summary': summary_for(entry['company'])} for entry in entries])
+    return answer
+
+
+def make_summarizer(cascade=None, batch_size=5, **options):
+    """A CompanySummarizer that fails fast: no retries, no rate limiting, a breaker that never opens."""
+    return CompanySummarizer('credentials.json', 'key', max_workers=4, rate_limiter=RateLimiter(1000, 1e7),
+                             batch_size=batch_size, dedupe=False, cascade=cascade, retry_policy=RetryPolicy(0),
+                             circuit_breaker=CircuitBreaker(min_requests=1000), max_rate_limit_retries=0,
+                             **options)
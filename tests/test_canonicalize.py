@@ -0,0 +1,57 @@
+import pytest
+
+from canonicalize import canonical_domain, canonical_name, group_duplicates, name_aliases
+
+
+def rows(*pairs):
+    return [{'Company Name': name, 'Website': website} for name, website in pairs]
+
+
+def test_canonical_name_strips_legal_forms_and_punctuation():
+    assert canonical_name('Amazon.com, Inc.') == 'amazon'
+    assert canonical_name('The Coca-Cola Company') == 'coca cola'
+    assert canonical_name('Acme Inc. (ACME)') == 'acme'
+
+
+def test_name_aliases_include_parenthetical_names():
+    assert name_aliases('Alphabet Inc. (Google)') == ['alphabet', 'google']
+
+
+@pytest.mark.parametrize('website, expected', [
+    ('https://www.Apple.com/iphone/', 'apple.com'),
+    ('apple.com/', 'apple.com'),
+    ('shop.apple.com', 'apple.com'),
+    ('https://www.bbc.co.uk/news', 'bbc.co.uk'),
+    ('', ''),
+])
+def test_canonical_domain(website, expected):
+    assert canonical_domain(website) == expected
+
+
+@pytest.mark.parametrize('companies', [
+    rows(('Apple Inc.', 'https://www.apple.com'), ('Apple', 'apple.com/')),
+    rows(('Alphabet Inc. (Google)', 'https://www.google.com'), ('Google', 'google.com/about')),
+    rows(('Acme Corp', 'https://acme.com'), ('ACME', '')),
+])
+def test_same_company_is_merged(companies):
+    assert group_duplicates(companies) == [[0, 1]]
+
+
+@pytest.mark.parametrize('companies', [
+    rows(('Acme', 'https://acme.github.io'), ('Zeta', 'https://zeta.github.io')),
+    rows(('Foo', 'https://www.linkedin.com/company/foo'), ('Bar', 'https://www.linkedin.com/company/bar')),
+    rows(('Baz', 'https://baz.myshopify.com'), ('Qux', 'https://qux.myshopify.com')),
+    rows(('Delta', 'https://delta.com'), ('Delta', 'https://delta.org')),
+])
+def test_different_companies_are_not_merged(companies):
+    assert group_duplicates(companies) == [[0], [1]]
+
+
+def test_domainless_row_with_ambiguous_name_is_not_attached():
+    companies = rows(('Delta', 'https://delta.com'), ('Delta', 'https://delta.org'), ('Delta', ''))
+    assert group_duplicates(companies) == [[0], [1], [2]]
+
+
+def test_groups_are_in_order_of_first_appearance():
+    companies = rows(('Beta', 'beta.io'), ('Acme', 'acme.com'), ('Beta Inc', 'https://www.beta.io'))
+    assert group_duplicates(companies) == [[0, 2], [1]]
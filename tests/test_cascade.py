@@ -0,0 +1,62 @@
+import pytest
+
+from cascade import ModelCascade, SummaryValidator, Tier, count_sentences
+from company_summarizer import CompanySummarizer
+from conftest import GOOD, FakeRouter, answer_with, make_summarizer
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("Acme Inc. makes robots. It was founded by J. R. Smith in the U.S. in 1990.", 2),
+    ("Widget Corp. sells widgets to Foo Ltd. and Bar Co. worldwide.", 1),
+    ("Founded in 1990, it is a subsidiary of Acme Inc.", 1),
+    ("One. Two! Three? Four.", 4),
+    ('It calls itself "the robot company." It is based in St. Louis.', 2),
+    ("No final punctuation", 0),
+])
+def test_count_sentences(text, expected):
+    assert count_sentences(text) == expected
+
+
+def test_summary_about_an_incorporated_company_passes():
+    summary = ("Acme Inc. designs industrial robots for Foo Corp. and other U.S. manufacturers. "
+               "The company was founded in 1990 by Dr. Jane Smith. It sells worldwide.")
+    assert SummaryValidator().problems(summary) == []
+
+
+def test_long_summary_fails():
+    assert SummaryValidator().problems("This sentence has a few words. " * 5) == ['too_long']
+
+
+def test_batches_go_through_the_first_tier():
+    small, large = FakeRouter('small', answer_with(lambda name: GOOD)), FakeRouter('large', GOOD)
+    cascade = ModelCascade([Tier('small', small, max_concurrency=1), Tier('large', large)])
+    summarizer = make_summarizer(cascade)
+
+    results = summarizer._summarize_companies([{'Company Name': f"Company {i}"} for i in range(5)])
+
+    assert list(results.column('Summary')) == [GOOD] * 5
+    stats = cascade.stats()['tiers']
+    assert stats[0]['requests'] == 1 and stats[0]['accepted'] == 5 and stats[0]['hit_rate'] == 1.0
+    assert large.calls == 0
+
+
+def test_batch_entries_failing_validation_escalate():
+    fallback = "Information about this company is not readily available in public sources."
+    small = FakeRouter('small', answer_with(lambda name: fallback if 'Obscure' in name else GOOD))
+    large = FakeRouter('large', GOOD)
+    cascade = ModelCascade([Tier('small', small), Tier('large', large)])
+    summarizer = make_summarizer(cascade)
+
+    results = summarizer._summarize_companies([{'Company Name': 'Acme'}, {'Company Name': 'Obscure'}])
+
+    assert list(results.column('Summary')) == [GOOD, GOOD]
+    assert large.calls == 1
+    stats = cascade.stats()['tiers'][0]
+    assert stats['requests'] == 2 and stats['accepted'] == 1 and stats['escalation_reasons'] == {'fallback': 2}
+
+
+def test_cascade_replaces_router():
+    router = FakeRouter('other', GOOD)
+    cascade = ModelCascade([Tier('small', FakeRouter('small', GOOD))])
+    summarizer = CompanySummarizer('credentials.json', 'key', router=router, cascade=cascade)
+    assert summarizer.router is cascade.tiers[0].router
@@ -0,0 +1,94 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from provider_router import MIN_HEDGE_SAMPLES, Endpoint, ProviderRouter
+from rate_limiter import RateLimiter
+
+MESSAGES = [{'role': 'user', 'content': 'Summarize Acme'}]
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class FakeClient:
+    """The chat.completions.with_raw_response.create call of the groq/openai clients."""
+
+    def __init__(self, answer='ok', delay=0.0, error=None):
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.chat = self.completions = self.with_raw_response = self
+
+    def create(self, model, messages, max_tokens, temperature):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.answer), finish_reason='stop')],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        )
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+
+def make_endpoint(name, client):
+    return Endpoint(name, f"{name}-model", lambda: client, rate_limiter=RateLimiter(1000, 1e7))
+
+
+def complete(router, max_retries=3):
+    return router.complete(MESSAGES, 100, 200, max_retries=max_retries)
+
+
+def test_an_error_fails_over_to_the_next_endpoint():
+    broken, working = FakeClient(error=RuntimeError('boom')), FakeClient('from b')
+    router = ProviderRouter([make_endpoint('a', broken), make_endpoint('b', working)])
+
+    completion = complete(router)
+
+    assert (completion.content, completion.endpoint, completion.model) == ('from b', 'b', 'b-model')
+    assert router.failovers == 1 and router.endpoints[0].errors == 1 and broken.calls == 1
+
+
+def test_the_error_is_raised_once_every_endpoint_failed():
+    router = ProviderRouter([make_endpoint('a', FakeClient(error=RuntimeError('a down'))),
+                             make_endpoint('b', FakeClient(error=RuntimeError('b down')))])
+    with pytest.raises(RuntimeError, match='b down'):
+        complete(router)
+
+
+def test_a_429_is_retried_on_the_endpoint_expected_to_answer_first():
+    limited = FakeClient(error=ApiError(429, {'retry-after': '30'}))
+    router = ProviderRouter([make_endpoint('a', limited), make_endpoint('b', FakeClient('from b'))])
+
+    completion = complete(router)
+
+    first = router.endpoints[0]
+    assert completion.endpoint == 'b' and completion.retries == 1
+    assert first.rate_limited == 1 and first.errors == 0 and first.rate_limiter.scale == 0.5
+    assert router.failovers == 0
+
+
+def test_requests_are_hedged_only_once_the_primary_has_enough_latency_samples():
+    slow, fast = FakeClient('from a', delay=0.3), FakeClient('from b')
+    primary, backup = make_endpoint('a', slow), make_endpoint('b', fast)
+    router = ProviderRouter([primary, backup], hedge=True, hedge_min_delay=0.05, probe_interval=float('inf'))
+    # The backup looks slower, so the router keeps choosing the primary
+    backup._record_success(1.0)
+    for _ in range(MIN_HEDGE_SAMPLES - 1):
+        primary._record_success(0.01)
+
+    try:
+        unhedged = complete(router)
+        assert (unhedged.content, unhedged.hedged, router.hedges) == ('from a', False, 0)
+
+        hedged = complete(router)
+        assert (hedged.content, hedged.hedged, router.hedges) == ('from b', True, 1)
+    finally:
+        router.close()
@@ -0,0 +1,86 @@
+import pytest
+
+from rate_limiter import RateLimiter, parse_duration
+
+
+class FakeClock:
+    """A clock that only moves when something sleeps on it."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def make_limiter(clock, **options):
+    return RateLimiter(clock=clock, sleep=clock.sleep, **options)
+
+
+@pytest.mark.parametrize('value, seconds', [('12', 12.0), ('0.5', 0.5), ('2m59.5s', 179.5), ('120ms', 0.12),
+                                            ('1h2m', 3720.0), ('soon', None), (None, None)])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+def test_a_429_halves_the_rate():
+    limiter = make_limiter(FakeClock(), requests_per_minute=60, tokens_per_minute=60_000)
+    limiter.record_rate_limited()
+    assert limiter.scale == 0.5
+    assert limiter.requests.rate == pytest.approx(0.5)
+    limiter.record_rate_limited()
+    assert limiter.scale == 0.25
+
+
+def test_successes_raise_the_rate_additively_up_to_the_ceiling():
+    limiter = make_limiter(FakeClock(), increase_step=0.1)
+    limiter.record_rate_limited()
+    limiter.record_success()
+    assert limiter.scale == pytest.approx(0.6)
+    for _ in range(10):
+        limiter.record_success()
+    assert limiter.scale == 1.0
+
+
+def test_the_rate_never_drops_below_min_scale():
+    limiter = make_limiter(FakeClock(), min_scale=0.2)
+    for _ in range(10):
+        limiter.record_rate_limited()
+    assert limiter.scale == 0.2
+
+
+def test_retry_after_pauses_dispatch():
+    clock = FakeClock()
+    limiter = make_limiter(clock, requests_per_minute=600)
+    assert limiter.record_rate_limited({'Retry-After': '3'}) == 3.0
+    assert limiter.wait_time() == 3.0
+    assert limiter.acquire() == pytest.approx(3.0)
+    assert clock.now == pytest.approx(3.0)
+
+
+def test_an_empty_bucket_waits_for_its_refill():
+    clock = FakeClock()
+    limiter = make_limiter(clock, requests_per_minute=60)
+    for _ in range(60):
+        assert limiter.acquire() == 0.0
+    assert limiter.acquire() == pytest.approx(1.0)
+
+
+def test_unused_reserved_tokens_are_refunded():
+    clock = FakeClock()
+    limiter = make_limiter(clock, tokens_per_minute=1000)
+    limiter.acquire(800)
+    limiter.record_success(reserved_tokens=800, used_tokens=300)
+    assert limiter.tokens.level == pytest.approx(700)
+
+
+def test_exhausted_request_quota_header_pauses_until_the_reset():
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    limiter.record_success({'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': '1m30s'})
+    assert limiter.wait_time() == 90.0
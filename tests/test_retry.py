@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from retry import CircuitBreaker, RetryPolicy, RetryQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_breaker(clock):
+    return CircuitBreaker(error_rate=0.5, window=4, min_requests=4, cooldown_seconds=30.0, clock=clock)
+
+
+def test_breaker_opens_once_the_error_rate_is_crossed():
+    breaker = make_breaker(FakeClock())
+    # Below min_requests, even all-failures keep it closed
+    assert not breaker.record_failure()
+    breaker.record_success()
+    assert not breaker.record_failure()
+    assert breaker.state == 'closed'
+    # The fourth outcome makes 3 of 4 failures
+    assert breaker.record_failure()
+    assert (breaker.state, breaker.opened_count) == ('open', 1)
+
+
+def test_breaker_stays_closed_below_the_error_rate():
+    breaker = make_breaker(FakeClock())
+    # Every window of 4 outcomes holds at most one failure
+    for _ in range(10):
+        for _ in range(3):
+            breaker.record_success()
+        assert not breaker.record_failure()
+    assert breaker.state == 'closed'
+
+
+def test_breaker_goes_half_open_after_the_cooldown_and_closes_on_a_good_probe():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == 'open'
+
+    clock.now += 30.0
+    assert breaker.before_request() == 0.0
+    assert breaker.state == 'half_open'
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_a_failed_probe_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.now += 30.0
+    breaker.before_request()
+
+    assert breaker.record_failure()
+    assert (breaker.state, breaker.opened_count) == ('open', 2)
+
+
+def test_requests_wait_while_the_breaker_is_open():
+    breaker = CircuitBreaker(min_requests=1, cooldown_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.before_request() >= 0.04
+    assert breaker.state == 'half_open'
+
+
+def test_only_one_probe_is_let_through_while_half_open():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.now += 30.0
+    breaker.before_request()
+
+    waiter = threading.Thread(target=breaker.before_request)
+    waiter.start()
+    waiter.join(0.05)
+    assert waiter.is_alive()
+    breaker.record_success()
+    waiter.join(1.0)
+    assert not waiter.is_alive()
+
+
+@pytest.mark.parametrize('retry, low, high', [(0, 1.0, 2.0), (1, 2.0, 4.0), (5, 30.0, 60.0)])
+def test_backoff_uses_equal_jitter_capped_at_max_delay(retry, low, high):
+    assert RetryPolicy(base_delay=2.0, max_delay=60.0, rng=lambda: 0.0).delay(retry) == low
+    assert RetryPolicy(base_delay=2.0, max_delay=60.0, rng=lambda: 0.999999).delay(retry) == pytest.approx(high)
+
+
+def test_retry_queue_yields_items_when_due_and_drops_exhausted_ones():
+    clock = FakeClock()
+    queue = RetryQueue(RetryPolicy(max_retries=2, base_delay=2.0, rng=lambda: 0.0), clock=clock, sleep=clock.sleep)
+    assert queue.push('a', 0) and queue.push('b', 1)
+    assert not queue.push('c', 2)
+
+    assert list(queue.drain()) == [[('a', 1)], [('b', 2)]]
+    assert clock.now == 2.0
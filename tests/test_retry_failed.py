@@ -0,0 +1,29 @@
+from benchmarks.fake_sheets import FakeSheetsClient
+from conftest import FakeRouter, answer_with, make_summarizer
+
+HEADER = ['Company Name', 'Website', 'Source', 'Summary', 'Status', 'Processed Date']
+
+
+def test_only_the_failed_company_of_a_shared_name_is_retried():
+    requested = []
+
+    def summary_for(name):
+        requested.append(name)
+        return f"New summary of {name}"
+
+    summarizer = make_summarizer(router=FakeRouter('fake', answer_with(summary_for)), batch_size=1,
+                                 sheets_client=FakeSheetsClient())
+    summarizer.spreadsheet = summarizer.gc.create('retry')
+    summarizer.spreadsheet.data.load([['Company Name', 'Website'], ['Acme', 'acme.io'], ['Acme', 'acme.com']])
+    output = summarizer.spreadsheet.add_worksheet('Company Summaries', rows=10, cols=6)
+    output.load([HEADER,
+                 ['Acme', 'acme.io', '', '', 'failed', '2024-01-01 00:00:00'],
+                 ['Acme', 'https://www.acme.com', '', 'Old summary of Acme', 'ok', '2024-01-01 00:00:00']])
+
+    results = summarizer.retry_failed_companies('data', 'Company Summaries')
+
+    assert list(results.column('Website')) == ['acme.io']
+    assert requested == ['Acme']
+    rows = output.get_all_values()
+    assert [row[:5] for row in rows[1:]] == [['Acme', 'acme.io', '', 'New summary of Acme', 'ok'],
+                                             ['Acme', 'https://www.acme.com', '', 'Old summary of Acme', 'ok']]
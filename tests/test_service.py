@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from canonicalize import group_duplicates
+from conftest import FakeRouter, answer_with, make_summarizer
+from service import SummaryService, coalesce_key
+
+
+def make_service(window_seconds):
+    """A service over a real summarizer whose router answers after 0.1s; returns it and the names requested."""
+    requested = []
+
+    def summary_for(name):
+        requested.append(name)
+        return f"Summary of {name}"
+
+    summarizer = make_summarizer(router=FakeRouter('fake', answer_with(summary_for), delay=0.1))
+    return SummaryService(summarizer, window_seconds=window_seconds), requested
+
+
+def summarize_concurrently(service, companies):
+    with ThreadPoolExecutor(len(companies)) as pool:
+        return list(pool.map(service.summarize, companies))
+
+
+def test_coalesce_key_separates_companies_on_a_shared_host():
+    acme = {'Company Name': 'Acme', 'Website': 'https://acme.github.io'}
+    zeta = {'Company Name': 'Zeta', 'Website': 'https://zeta.github.io'}
+    assert coalesce_key(acme) != coalesce_key(zeta)
+    assert group_duplicates([acme, zeta]) == [[0], [1]]
+
+
+def test_coalesce_key_matches_the_same_company():
+    assert coalesce_key({'Company Name': 'Acme Inc.', 'Website': 'https://www.acme.com/about'}) == \
+        coalesce_key({'Company Name': 'ACME', 'Website': 'acme.com'})
+    assert coalesce_key({'Company Name': 'Acme Inc.'}) == coalesce_key({'Company Name': 'acme'})
+
+
+def test_different_companies_on_a_shared_host_get_their_own_summaries():
+    service, requested = make_service(window_seconds=0.01)
+    try:
+        results = summarize_concurrently(service, [{'Company Name': 'Acme', 'Website': 'https://acme.github.io'},
+                                                   {'Company Name': 'Zeta', 'Website': 'https://zeta.github.io'}])
+    finally:
+        service.close()
+    assert [result['Summary'] for result in results] == ['Summary of Acme', 'Summary of Zeta']
+    assert not any(result['coalesced'] for result in results)
+    assert sorted(requested) == ['Acme', 'Zeta']
+
+
+def test_concurrent_requests_for_one_company_share_a_call():
+    service, requested = make_service(window_seconds=0.05)
+    try:
+        results = summarize_concurrently(service, [{'Company Name': 'Acme', 'Website': 'acme.com'}] * 3)
+    finally:
+        service.close()
+    assert [result['Summary'] for result in results] == ['Summary of Acme'] * 3
+    assert requested == ['Acme']
+    assert service.health()['coalesced'] == 2
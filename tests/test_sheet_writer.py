@@ -0,0 +1,38 @@
+from benchmarks.fake_sheets import FakeSheetsClient
+from results import OUTPUT_HEADERS
+from sheet_writer import SheetWriter
+
+NAME, WEBSITE = OUTPUT_HEADERS.index('Company Name'), OUTPUT_HEADERS.index('Website')
+
+
+def make_writer(rows):
+    spreadsheet = FakeSheetsClient().create('test')
+    worksheet = spreadsheet.sheet1
+    worksheet.load([OUTPUT_HEADERS] + rows)
+    return SheetWriter(spreadsheet, worksheet, OUTPUT_HEADERS), worksheet
+
+
+def upsert(writer, rows):
+    return writer.upsert(rows, key_column=NAME, domain_column=WEBSITE,
+                         ignore_columns=[OUTPUT_HEADERS.index('Processed Date')])
+
+
+def test_upsert_updates_matching_row_and_appends_new():
+    writer, worksheet = make_writer([['Acme', 'https://acme.com', 's', 'old', 'ok', '2024-01-01']])
+    counts = upsert(writer, [['ACME', 'www.acme.com/about', 's', 'new', 'ok', '2024-02-01'],
+                             ['Beta', 'beta.io', 's', 'beta', 'ok', '2024-02-01']])
+    assert counts == {'updated': 1, 'appended': 1, 'unchanged': 0}
+    assert [row[3] for row in worksheet.get_all_values()[1:]] == ['new', 'beta']
+
+
+def test_upsert_keeps_same_name_with_different_websites_apart():
+    writer, worksheet = make_writer([['Delta', 'https://delta.com', 's', 'airline', 'ok', '2024-01-01']])
+    counts = upsert(writer, [['Delta', 'https://delta.org', 's', 'faucets', 'ok', '2024-02-01']])
+    assert counts == {'updated': 0, 'appended': 1, 'unchanged': 0}
+    assert [row[3] for row in worksheet.get_all_values()[1:]] == ['airline', 'faucets']
+
+
+def test_upsert_leaves_unchanged_rows_alone():
+    row = ['Acme', 'https://acme.com', 's', 'same', 'ok', '2024-01-01']
+    writer, _ = make_writer([row])
+    assert upsert(writer, [row[:5] + ['2024-03-01']]) == {'updated': 0, 'appended': 0, 'unchanged': 1}
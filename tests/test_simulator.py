@@ -0,0 +1,66 @@
+import random
+import time
+
+import pytest
+
+from company_summarizer import prompt_overhead_tokens
+from conftest import GOOD, FakeRouter, answer_with, make_summarizer
+from simulator import LatencyTrace, Simulation, TraceModel
+
+SINGLE, BATCHED, ENTRY = prompt_overhead_tokens()
+PER_COMPANY = 12
+
+
+def single_company_trace(requests=200):
+    rng = random.Random(7)
+    return [(1, rng.uniform(0.8, 1.2), SINGLE + PER_COMPANY, rng.randint(70, 90)) for _ in range(requests)]
+
+
+def test_recorded_size_is_replayed_as_is():
+    model = TraceModel([(1, 1.0, 250, 80)], prompt_overhead=(SINGLE, BATCHED, ENTRY))
+    assert model.sample(random.Random(1), 1) == (1.0, 250, 80)
+
+
+def test_batch_prompt_counts_the_fixed_prefix_once():
+    model = TraceModel(single_company_trace(), prompt_overhead=(SINGLE, BATCHED, ENTRY))
+    _, prompt_tokens, _ = model.sample(random.Random(1), 5)
+    assert prompt_tokens == BATCHED + 5 * (PER_COMPANY + ENTRY)
+    assert prompt_tokens < 5 * (SINGLE + PER_COMPANY)
+
+
+def test_single_prompt_is_scaled_down_from_a_batch_trace():
+    model = TraceModel([(5, 2.0, BATCHED + 5 * (PER_COMPANY + ENTRY), 400)], prompt_overhead=(SINGLE, BATCHED, ENTRY))
+    _, prompt_tokens, _ = model.sample(random.Random(1), 1)
+    assert prompt_tokens == SINGLE + PER_COMPANY
+
+
+def test_without_overhead_the_whole_prompt_is_scaled():
+    model = TraceModel([(1, 1.0, 200, 80)])
+    assert model.sample(random.Random(1), 4)[1] == 800
+
+
+def test_batching_saves_time_under_a_token_limit():
+    model = TraceModel(single_company_trace(), prompt_overhead=(SINGLE, BATCHED, ENTRY))
+    options = dict(max_workers=4, requests_per_minute=1000, tokens_per_minute=6000, provider_tpm=6000)
+    single = Simulation(model, 500, batch_size=1, **options).run()
+    batched = Simulation(model, 500, batch_size=5, **options).run()
+    assert batched['wall_seconds'] < single['wall_seconds'] * 0.75
+
+
+@pytest.mark.parametrize('max_workers, batch_size', [(1, 1), (4, 1), (4, 5)])
+def test_simulation_matches_a_real_run(tmp_path, max_workers, batch_size):
+    trace = LatencyTrace(str(tmp_path / 'trace.jsonl'))
+    summarizer = make_summarizer(batch_size=batch_size, trace=trace,
+                                 router=FakeRouter('groq', answer_with(lambda name: GOOD), delay=0.05))
+    summarizer.max_workers = max_workers
+    start = time.perf_counter()
+    summarizer._summarize_companies([{'Company Name': f"Company {i}"} for i in range(20)])
+    wall_seconds = time.perf_counter() - start
+    trace.close()
+
+    result = Simulation(TraceModel.load(trace.path), 20, max_workers=max_workers, batch_size=batch_size,
+                        requests_per_minute=1000, tokens_per_minute=1e7).run()
+
+    assert result['requests'] == summarizer.router.calls
+    assert result['failed_rows'] == 0
+    assert result['wall_seconds'] <= wall_seconds < result['wall_seconds'] * 1.5 + 0.05
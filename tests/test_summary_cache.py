@@ -0,0 +1,22 @@
+from summary_cache import SummaryCache
+
+
+def test_size_bound_holds_across_processes_sharing_the_file(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    # Two connections stand in for two shard workers
+    workers = [SummaryCache(path, max_entries=5), SummaryCache(path, max_entries=5)]
+    for number in range(20):
+        workers[number % 2].put(f"key-{number}", f"summary {number}")
+
+    assert all(worker.stats()['entries'] == 5 for worker in workers)
+    assert workers[0].get('key-19') == 'summary 19'
+    assert workers[0].get('key-0') is None
+    assert sum(worker.evictions for worker in workers) == 15
+
+
+def test_replacing_an_entry_does_not_evict(tmp_path):
+    cache = SummaryCache(str(tmp_path / 'cache.sqlite'), max_entries=2)
+    cache.put('a', 'one')
+    cache.put('b', 'two')
+    cache.put('a', 'three')
+    assert (cache.get('a'), cache.get('b'), cache.evictions) == ('three', 'two', 0)
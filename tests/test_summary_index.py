@@ -0,0 +1,37 @@
+from cascade import FALLBACK_PHRASE, ModelCascade, Tier
+from conftest import GOOD, FakeRouter, answer_with, make_summarizer
+from service import INDEX_WORKSHEET, SummaryService
+from summary_index import SummaryIndex
+
+
+def make_cascade():
+    # The small tier knows nothing about "Obscure", so that company goes up to the large tier
+    small = FakeRouter('small', answer_with(lambda name: f"Information is {FALLBACK_PHRASE}." if name == 'Obscure'
+                                            else GOOD))
+    return ModelCascade([Tier('small', small), Tier('large', FakeRouter('large', GOOD))])
+
+
+def test_rows_are_indexed_with_the_tier_that_answered(tmp_path):
+    summarizer = make_summarizer(make_cascade(), batch_size=2)
+    summarizer.index = SummaryIndex(str(tmp_path / 'index.sqlite'))
+    results = summarizer._summarize_companies([{'Company Name': 'Acme', 'Website': 'acme.com'},
+                                               {'Company Name': 'Obscure', 'Website': 'obscure.io'}])
+    assert results.column('Model') == ['small-model', 'large-model']
+
+    summarizer._index_results(results, 'out.csv')
+    assert summarizer.index.lookup('Acme')[0]['Model'] == 'small-model'
+    assert summarizer.index.lookup('Obscure')[0]['Model'] == 'large-model'
+
+
+def test_service_summaries_are_indexed(tmp_path):
+    summarizer = make_summarizer(make_cascade())
+    summarizer.index = SummaryIndex(str(tmp_path / 'index.sqlite'))
+    service = SummaryService(summarizer, window_seconds=0.01)
+    try:
+        result = service.summarize({'Company Name': 'Obscure', 'Website': 'obscure.io'})
+    finally:
+        service.close()
+    assert result['Summary'] == GOOD
+
+    [entry] = summarizer.index.lookup(domain='obscure.io')
+    assert (entry['Worksheet'], entry['Model'], entry['Summary']) == (INDEX_WORKSHEET, 'large-model', GOOD)
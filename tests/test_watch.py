@@ -0,0 +1,84 @@
+from benchmarks.fake_sheets import FakeSheetsClient
+from metrics import RunMetrics
+from results import ResultStore
+from watch import SheetWatcher
+
+
+class FakeSummarizer:
+    """The parts of CompanySummarizer used by SheetWatcher, on a fake spreadsheet whose writes bump its revision."""
+
+    def __init__(self, rows):
+        self.spreadsheet = FakeSheetsClient().create('watch')
+        self.spreadsheet.sheet1.load([['Company Name', 'Website', 'Source']] + rows)
+        self.revision = 1
+        self.spreadsheet.get_lastUpdateTime = lambda: str(self.revision)
+        self.metrics = RunMetrics()
+        self.reads = 0
+        self.summarized = []
+
+    def _input_columns(self, worksheet):
+        return worksheet.row_values(1)
+
+    def _read_rows(self, worksheet, columns, start, end):
+        self.reads += 1
+        return [(index, dict(zip(columns, values)))
+                for index, values in enumerate(worksheet.get_all_values()[1:], start)]
+
+    def _summarize_companies(self, companies):
+        self.summarized.extend(company['Company Name'] for company in companies)
+        results = ResultStore(len(companies))
+        stamp = results.stamp()
+        for index, company in enumerate(companies):
+            results.set(index, company, f"Summary of {company['Company Name']}", 'ok', stamp)
+        return results
+
+    def write_summaries_to_sheet(self, results, output_worksheet, mode):
+        self.revision += 1
+
+    def edit(self, rows):
+        self.spreadsheet.sheet1.load([['Company Name', 'Website', 'Source']] + rows)
+        self.revision += 1
+
+
+def make_watcher(summarizer, tmp_path):
+    return SheetWatcher(summarizer, summarizer.spreadsheet.sheet1.title, 'Out', str(tmp_path / 'state.json'))
+
+
+def test_own_output_write_does_not_trigger_a_reread(tmp_path):
+    summarizer = FakeSummarizer([['Acme', 'acme.com', 's']])
+    watcher = make_watcher(summarizer, tmp_path)
+    assert watcher.poll() == 1
+    assert watcher.poll() == 0
+    assert summarizer.reads == 1
+
+
+def test_only_edited_rows_are_summarized(tmp_path):
+    summarizer = FakeSummarizer([['Acme', 'acme.com', 's']])
+    watcher = make_watcher(summarizer, tmp_path)
+    watcher.poll()
+    summarizer.edit([['Acme', 'acme.com', 's'], ['Beta', 'beta.io', 's']])
+    assert watcher.poll() == 1
+    assert summarizer.summarized == ['Acme', 'Beta']
+
+
+def test_state_survives_a_restart(tmp_path):
+    summarizer = FakeSummarizer([['Acme', 'acme.com', 's']])
+    make_watcher(summarizer, tmp_path).poll()
+    assert make_watcher(summarizer, tmp_path).poll() == 0
+    assert summarizer.reads == 1
+
+
+def test_edit_during_a_poll_is_not_skipped(tmp_path):
+    summarizer = FakeSummarizer([['Acme', 'acme.com', 's']])
+    watcher = make_watcher(summarizer, tmp_path)
+    summarize = summarizer._summarize_companies
+
+    def summarize_while_edited(companies):
+        summarizer.edit([['Acme', 'acme.com', 's'], ['Beta', 'beta.io', 's']])
+        return summarize(companies)
+
+    summarizer._summarize_companies = summarize_while_edited
+    watcher.poll()
+    summarizer._summarize_companies = summarize
+    assert watcher.poll() == 1
+    assert summarizer.summarized == ['Acme', 'Beta']
@@ -0,0 +1,257 @@
+"""
+Shared, pooled HTTP transport for the LLM and Google Sheets clients.
+
+Without it every CompanySummarizer builds its own Groq client and its own
+authorized gspread client, so concurrent workers and jobs keep opening new
+TLS connections and fetching new Google access tokens. The functions here
+hand out one client per configuration and process, shared by every
+summarizer, worker thread and job:
+
+- llm_http_client: an httpx.Client with a tunable keep-alive pool, speaking
+  HTTP/2 when the h2 package is installed. It is passed to the Groq and
+  OpenAI SDKs as ``http_client``.
+- shared_sheets_client: a gspread client on an AuthorizedSession whose
+  connection pool is sized for the number of concurrent workers.
+- TokenCache: Google access tokens kept on disk and reused by later
+  processes until shortly before they expire, so short runs skip the token
+  exchange entirely.
+
+Settings come from HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE,
+HTTP_KEEPALIVE_SECONDS, HTTP2, SHEETS_POOL_SIZE and GOOGLE_TOKEN_CACHE_PATH.
+"""
+
+import calendar
+import datetime
+import functools
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_CACHE_PATH = os.path.join('.company_summarizer', 'google_tokens.json')
+
+_lock = threading.Lock()
+_llm_clients: Dict[Tuple, object] = {}
+_sheets_clients: Dict[Tuple, object] = {}
+
+
+def http2_available() -> bool:
+    """True if httpx can speak HTTP/2 (the h2 package is installed)."""
+    return importlib.util.find_spec('h2') is not None
+
+
+class TransportSettings:
+    """
+    Connection pool settings.
+    """
+
+    def __init__(self, max_connections: int = 32, max_keepalive: int = 16, keepalive_seconds: float = 30.0,
+                 http2: bool = True, sheets_pool_size: int = 16, timeout: float = 60.0):
+        """
+        Args:
+            max_connections (int): Most open connections to the LLM providers
+            max_keepalive (int): Idle LLM connections kept open for reuse
+            keepalive_seconds (float): How long an idle LLM connection is kept
+            http2 (bool): Use HTTP/2 for the LLM providers if h2 is installed
+            sheets_pool_size (int): Connections kept per host for the Sheets API
+            timeout (float): LLM request timeout in seconds
+        """
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_seconds = keepalive_seconds
+        self.http2 = http2
+        self.sheets_pool_size = sheets_pool_size
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls) -> 'TransportSettings':
+        """Build settings from HTTP_MAX_CONNECTIONS / HTTP_MAX_KEEPALIVE / HTTP_KEEPALIVE_SECONDS / HTTP2 / SHEETS_POOL_SIZE."""
+        return cls(
+            max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', '32')),
+            max_keepalive=int(os.getenv('HTTP_MAX_KEEPALIVE', '16')),
+            keepalive_seconds=float(os.getenv('HTTP_KEEPALIVE_SECONDS', '30')),
+            http2=os.getenv('HTTP2', '1') != '0',
+            sheets_pool_size=int(os.getenv('SHEETS_POOL_SIZE', '16'))
+        )
+
+    def _llm_key(self) -> Tuple:
+        return (self.max_connections, self.max_keepalive, self.keepalive_seconds, self.http2, self.timeout)
+
+
+def llm_http_client(settings: Optional[TransportSettings] = None):
+    """
+    Return the process-wide httpx.Client for LLM requests with these settings.
+
+    httpx clients are thread-safe, so one client (and its connection pool)
+    serves every worker.
+    """
+    settings = settings or TransportSettings.from_env()
+    key = settings._llm_key()
+    with _lock:
+        client = _llm_clients.get(key)
+        if client is None:
+            import httpx
+            http2 = settings.http2 and http2_available()
+            client = httpx.Client(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=settings.max_connections,
+                    max_keepalive_connections=settings.max_keepalive,
+                    keepalive_expiry=settings.keepalive_seconds
+                ),
+                timeout=httpx.Timeout(settings.timeout, connect=10.0),
+                follow_redirects=True
+            )
+            _llm_clients[key] = client
+            logger.debug(f"Created LLM connection pool ({settings.max_connections} connections, "
+                         f"{'HTTP/2' if http2 else 'HTTP/1.1'})")
+        return client
+
+
+class TokenCache:
+    """
+    Thread-safe on-disk cache of Google access tokens.
+
+    Tokens are keyed by service account and scopes, and handed out until
+    ``margin_seconds`` before they expire. The file holds live credentials,
+    so it is written with owner-only permissions.
+    """
+
+    def __init__(self, path: str = DEFAULT_TOKEN_CACHE_PATH, margin_seconds: float = 300):
+        """
+        Args:
+            path (str): JSON file for the tokens (created if missing)
+            margin_seconds (float): Tokens this close to expiry are not reused
+        """
+        self.path = path
+        self.margin_seconds = margin_seconds
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional['TokenCache']:
+        """Build a cache from GOOGLE_TOKEN_CACHE_PATH; None when it is set to an empty string."""
+        path = os.getenv('GOOGLE_TOKEN_CACHE_PATH', DEFAULT_TOKEN_CACHE_PATH)
+        return cls(path) if path else None
+
+    @staticmethod
+    def _key(credentials) -> str:
+        identity = f"{credentials.service_account_email} {' '.join(sorted(credentials.scopes or []))}"
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+
+    def load(self, credentials) -> bool:
+        """
+        Put a cached, still valid token on ``credentials``.
+
+        Returns:
+            bool: True if a token was found and applied
+        """
+        with self._lock:
+            entry = self._read().get(self._key(credentials))
+        if not entry:
+            return False
+        expiry = datetime.datetime.fromtimestamp(entry['expiry'], datetime.timezone.utc).replace(tzinfo=None)
+        remaining = (expiry - datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)).total_seconds()
+        if remaining <= self.margin_seconds:
+            return False
+        # google-auth keeps expiry as a naive UTC datetime
+        credentials.token = entry['token']
+        credentials.expiry = expiry
+        logger.debug(f"Reusing cached Google access token ({remaining / 60:.0f} minutes left)")
+        return True
+
+    def store(self, credentials):
+        """Save the token currently on ``credentials``, dropping expired entries."""
+        if not credentials.token or credentials.expiry is None:
+            return
+        now = calendar.timegm(datetime.datetime.now(datetime.timezone.utc).utctimetuple())
+        with self._lock:
+            tokens = {key: entry for key, entry in self._read().items() if entry.get('expiry', 0) > now}
+            tokens[self._key(credentials)] = {
+                'token': credentials.token,
+                'expiry': calendar.timegm(credentials.expiry.utctimetuple())
+            }
+            try:
+                _write_private(self.path, json.dumps(tokens))
+            except OSError as e:
+                logger.warning(f"Could not write Google token cache {self.path}: {e}")
+
+
+def _write_private(path: str, content: str):
+    """Write a file readable only by its owner, replacing it atomically."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as output_file:
+        output_file.write(content)
+    os.replace(temporary_path, path)
+
+
+@functools.lru_cache(maxsize=None)
+def _caching_credentials_class():
+    """Service account credentials that save every refreshed token to their ``token_cache``."""
+    from google.oauth2 import service_account
+
+    class CachingCredentials(service_account.Credentials):
+        token_cache: Optional[TokenCache] = None
+
+        def refresh(self, request):
+            super().refresh(request)
+            if self.token_cache is not None:
+                self.token_cache.store(self)
+
+    return CachingCredentials
+
+
+def shared_sheets_client(credentials_path: str, scopes: Sequence[str],
+                         settings: Optional[TransportSettings] = None, token_cache: Optional[TokenCache] = None):
+    """
+    Return the process-wide gspread client for a service account.
+
+    The first call authenticates; later calls with the same credentials
+    file and scopes return the same client, so workers share its session,
+    connection pool and access token.
+
+    Args:
+        credentials_path (str): Path to the service account JSON key file
+        scopes (Sequence[str]): OAuth scopes to request
+        settings (Optional[TransportSettings]): Pool settings; from the environment if omitted
+        token_cache (Optional[TokenCache]): Where access tokens are reused from and saved to
+
+    Returns:
+        gspread.Client: Authorized client
+    """
+    settings = settings or TransportSettings.from_env()
+    key = (os.path.abspath(credentials_path), tuple(scopes), settings.sheets_pool_size)
+    with _lock:
+        client = _sheets_clients.get(key)
+        if client is None:
+            import gspread
+            import requests
+            from google.auth.transport.requests import AuthorizedSession
+
+            credentials = _caching_credentials_class().from_service_account_file(credentials_path, scopes=scopes)
+            if token_cache is not None:
+                credentials.token_cache = token_cache
+                token_cache.load(credentials)
+
+            session = AuthorizedSession(credentials)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=settings.sheets_pool_size,
+                                                    pool_maxsize=settings.sheets_pool_size)
+            session.mount('https://', adapter)
+            client = gspread.Client(auth=credentials, session=session)
+            _sheets_clients[key] = client
+        return client
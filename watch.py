@@ -0,0 +1,171 @@
+"""
+Watch mode: keep an output tab current while the input tab is being edited.
+
+Instead of re-reading and re-summarizing the whole sheet on every refresh,
+SheetWatcher polls cheap metadata and only processes what changed:
+
+1. The spreadsheet's last-update time (one Drive API call). If it hasn't
+   moved since the last poll, nothing else is read.
+2. Otherwise, the input columns are read in one batch_get and every row is
+   hashed (run_journal.row_fingerprint). Rows whose hash was not seen
+   before, i.e. added or edited rows, are summarized.
+3. Only those rows are upserted into the output tab.
+
+Step 2 reads every input row on purpose. Sheets reports changes per
+spreadsheet, not per row, so an edited row can only be told apart by reading
+its cells. A stored hash column would have to live in the input tab, which
+the watcher doesn't write to, and would need the same cells to compute.
+Fetching just the name column first would miss edits to the website or
+source. One batch_get of the input columns is a single API call even for
+large tabs; what the watcher saves is summarizing and writing the unchanged
+rows.
+
+Writing the output tab moves the spreadsheet's last-update time as well. So
+that this doesn't cost a full re-read on the next poll, the revision right
+after the write is remembered as the watcher's own and skipped. This only
+happens when the revision didn't move between the start of the poll and the
+write, i.e. when nobody else edited the sheet meanwhile. An edit made while
+the output is being written (a window of a few API calls) is picked up with
+the next change after it.
+
+The hashes of successfully summarized rows are kept in a small state file
+under .company_summarizer/watch/, so a restarted watcher picks up where it
+left off. Rows that failed are not recorded and are tried again on the next
+change. Deleted input rows are not removed from the output tab, and a row
+whose company name was edited gets a new output row next to the old one.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from company_summarizer import STATUS_OK
+from run_journal import row_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_DIR = os.path.join('.company_summarizer', 'watch')
+
+
+class SheetWatcher:
+    """
+    Polls an input worksheet and summarizes added or edited rows into the output worksheet.
+    """
+
+    def __init__(self, summarizer, input_sheet: str, output_sheet: str, state_path: str):
+        """
+        Args:
+            summarizer (CompanySummarizer): Summarizer with the spreadsheet already open
+            input_sheet (str): Name of the input worksheet
+            output_sheet (str): Name of the output worksheet, updated with upsert
+            state_path (str): JSON file holding the last revision and row hashes
+        """
+        self.summarizer = summarizer
+        self.input_sheet = input_sheet
+        self.output_sheet = output_sheet
+        self.state_path = state_path
+        self.state = self._load()
+
+    @classmethod
+    def for_run(cls, summarizer, spreadsheet_url: str, input_sheet: str, output_sheet: str,
+                directory: str = DEFAULT_WATCH_DIR) -> 'SheetWatcher':
+        """Return a watcher whose state file is derived from the spreadsheet and tab names."""
+        run_id = hashlib.sha256(
+            '\x1f'.join([spreadsheet_url, input_sheet, output_sheet]).encode('utf-8')
+        ).hexdigest()[:16]
+        return cls(summarizer, input_sheet, output_sheet, os.path.join(directory, f"{run_id}.json"))
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return {'revision': None, 'own_revision': None, 'fingerprints': []}
+        return {'revision': state.get('revision'), 'own_revision': state.get('own_revision'),
+                'fingerprints': state.get('fingerprints', [])}
+
+    def _save(self):
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{self.state_path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as state_file:
+            json.dump(self.state, state_file)
+        os.replace(temporary_path, self.state_path)
+
+    def _revision(self) -> Optional[str]:
+        """The spreadsheet's last-update time, or None if it can't be read."""
+        spreadsheet = self.summarizer.spreadsheet
+        try:
+            # gspread 6 has a method, 5.x a property; both cost one Drive API call
+            getter = getattr(spreadsheet, 'get_lastUpdateTime', None)
+            return getter() if getter is not None else spreadsheet.lastUpdateTime
+        except Exception as e:
+            logger.debug(f"Could not read the spreadsheet's last update time: {e}")
+            return None
+
+    def poll(self) -> int:
+        """
+        Check the input worksheet once and process added or edited rows.
+
+        Returns:
+            int: Number of rows summarized
+        """
+        # Taken before reading, so an edit made while this poll runs shows up
+        # as a new revision next time
+        revision = self._revision()
+        if revision is not None and revision in (self.state['revision'], self.state['own_revision']):
+            return 0
+
+        # Every row is read: only its cells tell whether it changed (see the module docstring)
+        with self.summarizer.metrics.stage('read'):
+            worksheet = self.summarizer.spreadsheet.worksheet(self.input_sheet)
+            columns = self.summarizer._input_columns(worksheet)
+            rows = self.summarizer._read_rows(worksheet, columns, 2, max(worksheet.row_count, 2))
+
+        known = set(self.state['fingerprints'])
+        current = [(company, row_fingerprint(company)) for _, company in rows]
+        changed = [(company, fingerprint) for company, fingerprint in current if fingerprint not in known]
+        # Hashes of deleted rows are dropped, so a row that comes back is summarized again
+        done = known & {fingerprint for _, fingerprint in current}
+
+        own_revision = None
+        if changed:
+            logger.info(f"{len(changed)} of {len(current)} rows in {self.input_sheet} were added or edited")
+            with self.summarizer.metrics.stage('summarize'):
+                results = self.summarizer._summarize_companies([company for company, _ in changed])
+            unchanged_since_read = revision is not None and self._revision() == revision
+            self.summarizer.write_summaries_to_sheet(results, self.output_sheet, mode='upsert')
+            if unchanged_since_read:
+                own_revision = self._revision()
+            done.update(fingerprint for (_, fingerprint), status in zip(changed, results.column('Status'))
+                        if status == STATUS_OK)
+
+        self.state = {'revision': revision, 'own_revision': own_revision, 'fingerprints': sorted(done)}
+        self._save()
+        return len(changed)
+
+    def run(self, interval: float = 60.0, polls: Optional[int] = None):
+        """
+        Poll every ``interval`` seconds until interrupted.
+
+        Errors of a single poll (e.g. a Sheets API hiccup) are logged and the
+        watcher carries on with the next poll.
+
+        Args:
+            interval (float): Seconds between polls
+            polls (Optional[int]): Stop after this many polls (forever if None)
+        """
+        logger.info(f"Watching {self.input_sheet} every {interval:g}s; changes go to {self.output_sheet}")
+        count = 0
+        while polls is None or count < polls:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Watch poll failed: {e}")
+            count += 1
+            if polls is None or count < polls:
+                time.sleep(interval)